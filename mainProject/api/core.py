@@ -41,6 +41,12 @@ from ctypes import pointer, Structure, c_float, POINTER, cast, byref
 import enum
 import atexit
 from .utils import *
+from .frameTransport import FrameTransport
+
+# PackReadbacks of both eyes when BaseVrApp reads them back asynchronously
+eye_readbacks = None
+# Column range of each eye in its texture, see BaseVrApp.make_stereo_buffer
+eye_columns = ((0.0, 1.0), (0.0, 1.0))
 
 if sys.platform == "win32":
     import pyaudio
@@ -116,6 +122,10 @@ class BaseVrApp(ShowBase):
         autoControllerRotation=False,
         launchShowBase=True,
         wantVr=WANT_VR_INIT,
+        gpuCompositor=False,
+        xrRuntime=None,
+        asyncReadback=False,
+        stereoMode="dual",
     ):
         WANT_VR_INIT = wantVr
         # NVidia driver requires this env variable to be set to 0 to disable v-sync
@@ -138,7 +148,13 @@ class BaseVrApp(ShowBase):
         #         self.render, "src/scene-effect.yaml", {}, sort=250
         #     )
         if sys.platform == "win32" and WANT_VR_INIT:
-            _Thread(target=main.start, daemon=True).start()
+            if gpuCompositor:
+                # The OpenXR session lives on Panda's draw thread, see xrSwapchain.py
+                from .xrSwapchain import OpenXrRuntime
+
+                xrRuntime = OpenXrRuntime(main)
+            else:
+                _Thread(target=main.start, daemon=True).start()
         else:
             print("VR not supported or disabled on this platform.")
         self.disableMouse()
@@ -149,37 +165,88 @@ class BaseVrApp(ShowBase):
 
         self.camList = []
         self.view_left = True  # Flag to track which buffer to display
+        self.stereoMode = stereoMode
 
-        # Create the left camera buffer
         self.vrLens = PerspectiveLens()
-        self.buffer_left = self.make_buffer()
-        self.cam_left = self.makeCamera(
-            self.buffer_left, scene=self.render, lens=self.vrLens
-        )
-        self.cam_left.setPos(-0.25, 0, 0)  # Adjusted offset to the left
-        self.camList.append(self.cam_left)
+        if stereoMode == "dual":
+            # Create the left camera buffer
+            self.buffer_left = self.make_buffer()
+            self.cam_left = self.makeCamera(
+                self.buffer_left, scene=self.render, lens=self.vrLens
+            )
+            self.cam_left.setPos(-0.25, 0, 0)  # Adjusted offset to the left
+            self.camList.append(self.cam_left)
 
-        # Create the right camera buffer
-        self.buffer_right = self.make_buffer()
-        self.cam_right = self.makeCamera(
-            self.buffer_right, scene=self.render, lens=self.vrLens
-        )
-        self.cam_right.setPos(0.25, 0, 0)  # Adjusted offset to the right
-        self.camList.append(self.cam_right)
-
-        self.cam_left_tex = Texture()
-        self.cam_right_tex = Texture()
-        self.cam_left_tex.setKeepRamImage(True)
-        self.cam_right_tex.setKeepRamImage(True)
-        global cam_left_tex, cam_right_tex
+            # Create the right camera buffer
+            self.buffer_right = self.make_buffer()
+            self.cam_right = self.makeCamera(
+                self.buffer_right, scene=self.render, lens=self.vrLens
+            )
+            self.cam_right.setPos(0.25, 0, 0)  # Adjusted offset to the right
+            self.camList.append(self.cam_right)
+
+            self.cam_left_tex = Texture()
+            self.cam_right_tex = Texture()
+            # Column range of each eye in its texture, as fractions of the width
+            self.eye_columns = ((0.0, 1.0), (0.0, 1.0))
+        elif stereoMode in ("shared", "instanced"):
+            self.make_stereo_buffer(instanced=stereoMode == "instanced")
+        else:
+            raise ValueError(f"Unknown stereoMode {stereoMode!r}")
+        if gpuCompositor or asyncReadback:
+            # Eye images stay in video memory, Panda never copies them to RAM
+            render_mode = GraphicsOutput.RTMBindOrCopy
+        else:
+            render_mode = GraphicsOutput.RTMCopyRam
+            self.cam_left_tex.setKeepRamImage(True)
+            self.cam_right_tex.setKeepRamImage(True)
+        global cam_left_tex, cam_right_tex, eye_readbacks, eye_columns
+        if asyncReadback and not gpuCompositor:
+            # Read back through pixel-pack buffers a frame late, see pixelStreams.py
+            from .pixelStreams import PackReadback, PackedFrameTransport
+
+            if self.cam_left_tex is self.cam_right_tex:
+                eye_readbacks = (PackReadback(self.win, self.cam_left_tex),) * 2
+            else:
+                eye_readbacks = (
+                    PackReadback(self.win, self.cam_left_tex),
+                    PackReadback(self.win, self.cam_right_tex),
+                )
+            self.frames_left = PackedFrameTransport(
+                eye_readbacks[0], columns=self.eye_columns[0]
+            )
+            self.frames_right = PackedFrameTransport(
+                eye_readbacks[1], columns=self.eye_columns[1]
+            )
+        else:
+            # NumPy views over the eye textures' RAM images, see frameTransport.py
+            self.frames_left = FrameTransport(
+                self.cam_left_tex, columns=self.eye_columns[0]
+            )
+            self.frames_right = FrameTransport(
+                self.cam_right_tex, columns=self.eye_columns[1]
+            )
+        eye_columns = self.eye_columns
         cam_left_tex = self.cam_left_tex
         cam_right_tex = self.cam_right_tex
         self.buffer_left.addRenderTexture(
-            self.cam_left_tex, GraphicsOutput.RTMCopyRam, GraphicsOutput.RTPColor
-        )
-        self.buffer_right.addRenderTexture(
-            self.cam_right_tex, GraphicsOutput.RTMCopyRam, GraphicsOutput.RTPColor
+            self.cam_left_tex, render_mode, GraphicsOutput.RTPColor
         )
+        if self.buffer_right is not self.buffer_left:
+            self.buffer_right.addRenderTexture(
+                self.cam_right_tex, render_mode, GraphicsOutput.RTPColor
+            )
+        self.compositor = None
+        if gpuCompositor and xrRuntime is not None:
+            from .xrSwapchain import GpuEyeCompositor
+
+            self.compositor = GpuEyeCompositor(
+                self.win,
+                (self.cam_left_tex, self.cam_right_tex),
+                xrRuntime,
+                offsets=lambda: (-main.image_offset, main.image_offset),
+                columns=self.eye_columns,
+            )
         self.player = self.render.attachNewNode("vrCamRoot")
         self.vrCam = self.player.attachNewNode("vrCam")
         self.cam_left.reparentTo(self.vrCam)
@@ -217,13 +284,14 @@ class BaseVrApp(ShowBase):
             self.accept(
                 "p",
                 lambda: print(
-                    f"Lens FOV: {self.vrLens.getFov()}\nLens Distance: {self.cam_left.getX(), self.cam_right.getX()}\nImage Offset: {main.image_offset}"
+                    f"Lens FOV: {self.vrLens.getFov()}\nLens Distance: {self.get_eye_separation()}\nImage Offset: {main.image_offset}"
                 ),
             )
             self.accept(
                 "wheel_up",
                 lambda: (
                     self.vrLens.setFov(self.vrLens.getFov() + 0.5),
+                    self.update_stereo_cull(),
                     print("FOV: ", self.vrLens.getFov()),
                 ),
             )
@@ -231,6 +299,7 @@ class BaseVrApp(ShowBase):
                 "wheel_down",
                 lambda: (
                     self.vrLens.setFov(self.vrLens.getFov() - 0.5),
+                    self.update_stereo_cull(),
                     print("FOV: ", self.vrLens.getFov()),
                 ),
             )
@@ -251,29 +320,20 @@ class BaseVrApp(ShowBase):
             self.accept(
                 "alt-wheel_up",
                 lambda: (
-                    self.cam_left.setPos(self.cam_left.getX() - 0.01, 0, 0),
-                    self.cam_right.setPos(self.cam_right.getX() + 0.01, 0, 0),
-                    print(
-                        "Lens Distance: ", (self.cam_left.getX(), self.cam_right.getX())
-                    ),
+                    self.set_eye_separation(self.get_eye_separation() + 0.02),
+                    print("Lens Distance: ", self.get_eye_separation()),
                 ),
             )
             self.accept(
                 "alt-wheel_down",
                 lambda: (
-                    self.cam_left.setPos(self.cam_left.getX() + 0.01, 0, 0),
-                    self.cam_right.setPos(self.cam_right.getX() - 0.01, 0, 0),
-                    print(
-                        "Lens Distance: ", (self.cam_left.getX(), self.cam_right.getX())
-                    ),
+                    self.set_eye_separation(self.get_eye_separation() - 0.02),
+                    print("Lens Distance: ", self.get_eye_separation()),
                 ),
             )
             self.accept("r", self.reset_view_orientation)
 
-        self.vrLens.setFov(FOV)
-        self.vrLens.setAspectRatio(self.lensResolution[0] / self.lensResolution[1])
-        self.cam_left.setPos(-0.25, 0, 0)
-        self.cam_right.setPos(0.25, 0, 0)
+        self.resetView()
         self.vrCamPos = (0, 0, 0)
         self.vrCamHpr = (0, 0, 0)
         if sys.platform == "win32":
@@ -424,8 +484,40 @@ class BaseVrApp(ShowBase):
     def resetView(self):
         self.vrLens.setFov(self.FOV)
         self.vrLens.setAspectRatio(self.lensResolution[0] / self.lensResolution[1])
-        self.cam_left.setPos(-0.25, 0, 0)
-        self.cam_right.setPos(0.25, 0, 0)
+        self.set_eye_separation(0.5)
+
+    def get_eye_separation(self):
+        if self.stereoMode == "dual":
+            return self.cam_right.getX() - self.cam_left.getX()
+        return self.vrLens.getInterocularDistance()
+
+    def set_eye_separation(self, separation):
+        if self.stereoMode == "dual":
+            self.cam_left.setPos(-separation / 2, 0, 0)
+            self.cam_right.setPos(separation / 2, 0, 0)
+        else:
+            self.vrLens.setInterocularDistance(separation)
+            self.update_stereo_cull()
+            if self.stereoMode == "instanced":
+                self.instancedStereo.set_separation(separation)
+
+    def update_stereo_cull(self):
+        """
+        Widen the stereo camera's cull volume to cover both eyes. Panda culls
+        with the lens's centre frustum, which misses a strip at the outer edge
+        of each eye; the same frustum moved back until it holds both eyes
+        does not.
+        """
+        if self.stereoMode == "dual":
+            return
+        lens = self.vrLens.makeCopy()
+        lens.setInterocularDistance(0)
+        back = (
+            self.vrLens.getInterocularDistance() / 2 / tan(radians(lens.getHfov() / 2))
+        )
+        bounds = lens.makeBounds()
+        bounds.xform(Mat4.translateMat(0, -back, 0))
+        self.cam_left.node().setCullBounds(bounds)
 
     def reset_view_orientation(self):
         self.vrCamPosOffset = (
@@ -440,6 +532,46 @@ class BaseVrApp(ShowBase):
         )
         self.resetView()
 
+    def make_stereo_buffer(self, instanced=False):
+        """
+        One side-by-side buffer for both eyes, left half and right half.
+        Both display regions share a camera, so Panda culls and sorts the scene
+        once per frame and reuses the result for the second eye. The eyes are
+        separated by the lens's interocular distance instead of camera offsets.
+        buffer_left/buffer_right, cam_left/cam_right and cam_left_tex/
+        cam_right_tex all name the shared objects; eye_columns locates each
+        eye in the texture.
+
+        With instanced, a single display region covers the buffer and every Geom
+        is drawn once for both eyes, see instancedStereo.py.
+        """
+        self.buffer_left = self.buffer_right = self.make_buffer(
+            (self.lensResolution[0] * 2, self.lensResolution[1])
+        )
+        # Parallel eyes, as the offset cameras of the dual mode
+        self.vrLens.setConvergenceDistance(float("inf"))
+        self.cam_left = self.cam_right = self.makeCamera(
+            self.buffer_left,
+            scene=self.render,
+            lens=self.vrLens,
+            displayRegion=(0, 0.5, 0, 1),
+        )
+        self.camList.append(self.cam_left)
+        if instanced:
+            from .instancedStereo import InstancedStereo
+
+            # Both halves from one region, the lens keeps the aspect of one eye
+            self.cam_left.node().getDisplayRegion(0).setDimensions(0, 1, 0, 1)
+            self.instancedStereo = InstancedStereo(self.cam_left)
+        else:
+            left = self.cam_left.node().getDisplayRegion(0)
+            right = self.buffer_left.makeDisplayRegion(0.5, 1, 0, 1)
+            right.setCamera(self.cam_left)
+            left.setStereoChannel(Lens.SC_left)
+            right.setStereoChannel(Lens.SC_right)
+        self.cam_left_tex = self.cam_right_tex = Texture()
+        self.eye_columns = ((0.0, 0.5), (0.5, 1.0))
+
     def make_buffer(self, lensResolution=None):
         if lensResolution is None:
             lensResolution = self.lensResolution
@@ -449,6 +581,8 @@ class BaseVrApp(ShowBase):
         )
         fbprops = FrameBufferProperties()
         fbprops.setRgbColor(True)
+        # 4 byte BGRA pixels, uploaded to the compositor without conversion
+        fbprops.setAlphaBits(8)
         fbprops.setDepthBits(1)
         buffer = self.graphicsEngine.makeOutput(
             self.pipe,
@@ -463,18 +597,18 @@ class BaseVrApp(ShowBase):
         return buffer
 
     def toggle_dev_win_view(self):
+        if self.compositor is not None:
+            print("Lens buffer view needs RAM eye images, not kept with gpuCompositor.")
+            return
+
         def update_frames():
             while True:
                 try:
-                    frame_left = self.get_camera_image(self.cam_left_tex)
-                    frame_right = self.get_camera_image(self.cam_right_tex)
-
-                    frame_data_left = np.flipud(
-                        np.array(frame_left, dtype=np.uint8)[:, :, ::-1]
-                    )
-                    frame_data_right = np.flipud(
-                        np.array(frame_right, dtype=np.uint8)[:, :, ::-1]
-                    )
+                    self.frames_left.wait()
+                    self.frames_right.wait()
+                    # Ring slots, the frames are shown after Panda moved on
+                    frame_data_left = np.flipud(self.frames_left.read())
+                    frame_data_right = np.flipud(self.frames_right.read())
 
                     # Create or update windows to display the frames
                     left_window_name = "Left Lens Buffer"
@@ -508,7 +642,7 @@ class BaseVrApp(ShowBase):
 
 
 class main:
-    def start(self):
+    def init_state(self):
         self.image_offset = 0.1225
         self.lastException = ""
         self.lastExceptionTime = 0
@@ -520,6 +654,10 @@ class main:
         self.input = InputState()
         self.HandControl: HandControl = HandControl()
 
+    def start(self):
+        from .pixelStreams import FrameLatency, PackedFrameTransport, StreamingTexture
+
+        self.init_state()
         while True:
             try:
                 cam_left_tex
@@ -530,11 +668,22 @@ class main:
                 print("\n")
                 sleep(0.1)
 
-        frame_left = self.get_camera_image(cam_left_tex)
-        frame_right = self.get_camera_image(cam_right_tex)
-
-        frame_data_left = np.array(frame_left, np.uint8)
-        frame_data_right = np.array(frame_right, np.uint8)
+        if eye_readbacks is None:
+            self.frames_left = FrameTransport(cam_left_tex, columns=eye_columns[0])
+            self.frames_right = FrameTransport(cam_right_tex, columns=eye_columns[1])
+        else:
+            self.frames_left = PackedFrameTransport(
+                eye_readbacks[0], columns=eye_columns[0]
+            )
+            self.frames_right = PackedFrameTransport(
+                eye_readbacks[1], columns=eye_columns[1]
+            )
+        # Panda frames and ms from rendering an eye to uploading it
+        self.latency = FrameLatency()
+        for frames in (self.frames_left, self.frames_right):
+            frames.wait()
+            image = frames.view()
+            frames.size = self.eye_size(image.shape[1], image.shape[0])
 
         # ContextObject is a high level pythonic class meant to keep simple cases simple.
         with xr.ContextObject(
@@ -549,22 +698,11 @@ class main:
             self.session = context.session
             self.context = context
             self.instance = context.instance
-            texture_id_left = GL.glGenTextures(1)
-            texture_id_right = GL.glGenTextures(1)
+            # Storage allocated once, fed through mapped unpack buffers
+            upload_left = StreamingTexture()
+            upload_right = StreamingTexture()
             self.initialize_actions()
 
-            def setup_texture(texture_id):
-                GL.glBindTexture(GL.GL_TEXTURE_2D, texture_id)
-                GL.glTexParameteri(
-                    GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MIN_FILTER, GL.GL_LINEAR
-                )
-                GL.glTexParameteri(
-                    GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MAG_FILTER, GL.GL_LINEAR
-                )
-
-            setup_texture(texture_id_left)
-            setup_texture(texture_id_right)
-
             VERTEX_SHADER_SOURCE = """
             #version 330 core
             layout(location = 0) in vec3 position;
@@ -681,39 +819,17 @@ class main:
                 else:
                     self.pose = None
 
-                frame = self.get_camera_image(cam_left_tex)
-                if frame is not None:
-                    frame_left = self.get_camera_image(cam_left_tex)
-                    frame_right = self.get_camera_image(cam_right_tex)
-
-                    frame_data_left = np.array(frame_left, np.uint8)
-                    frame_data_right = np.array(frame_right, np.uint8)
-
-                    GL.glBindTexture(GL.GL_TEXTURE_2D, texture_id_left)
-                    GL.glTexImage2D(
-                        GL.GL_TEXTURE_2D,
-                        0,
-                        GL.GL_RGB,
-                        frame_left.shape[1],
-                        frame_left.shape[0],
-                        0,
-                        GL.GL_RGB,
-                        GL.GL_UNSIGNED_BYTE,
-                        frame_data_left,
-                    )
-
-                    GL.glBindTexture(GL.GL_TEXTURE_2D, texture_id_right)
-                    GL.glTexImage2D(
-                        GL.GL_TEXTURE_2D,
-                        0,
-                        GL.GL_RGB,
-                        frame_right.shape[1],
-                        frame_right.shape[0],
-                        0,
-                        GL.GL_RGB,
-                        GL.GL_UNSIGNED_BYTE,
-                        frame_data_right,
-                    )
+                # Views straight into Panda's RAM images or pack buffers,
+                # copied into an unpack buffer before Panda renders again
+                frame_left = self.frames_left.frame()
+                frame_right = self.frames_right.frame()
+                if frame_left is not None and frame_right is not None:
+                    upload_left.upload(frame_left)
+                    upload_right.upload(frame_right)
+                    if self.frames_left.frame_number is not None:
+                        self.latency.record(
+                            self.frames_left.frame_number, self.frames_left.frame_time
+                        )
 
                 for view_index, view in enumerate(context.view_loop(frame_state)):
                     GL.glClear(GL.GL_COLOR_BUFFER_BIT | GL.GL_DEPTH_BUFFER_BIT)
@@ -722,14 +838,14 @@ class main:
                     )  # Ensure the shader program is active
 
                     if view_index == 0:  # Left eye
-                        GL.glBindTexture(GL.GL_TEXTURE_2D, texture_id_left)
+                        GL.glBindTexture(GL.GL_TEXTURE_2D, upload_left.texture)
                         GL.glUniform2f(
                             GL.glGetUniformLocation(shader_program, "offset"),
                             -self.image_offset,
                             0.0,
                         )
                     else:  # Right eye
-                        GL.glBindTexture(GL.GL_TEXTURE_2D, texture_id_right)
+                        GL.glBindTexture(GL.GL_TEXTURE_2D, upload_right.texture)
                         GL.glUniform2f(
                             GL.glGetUniformLocation(shader_program, "offset"),
                             self.image_offset,
@@ -743,48 +859,32 @@ class main:
                     GL.glDisable(GL.GL_BLEND)
                 if context.session_state == xr.SessionState.FOCUSED:
                     self.poll_actions()
-                    action_spaces = [
-                        self.input.hand_space[Side.LEFT],
-                        self.input.hand_space[Side.RIGHT],
-                    ]
-                    for index, space in enumerate(action_spaces):
-                        space_location = xr.locate_space(
-                            space=space,
-                            base_space=context.space,
-                            time=frame_state.predicted_display_time,
-                        )
-                        if (
-                            space_location.location_flags
-                            & xr.SPACE_LOCATION_POSITION_VALID_BIT
-                        ):
-
-                            if index == 0:
-                                self.controller["left"] = space_location.pose
-                            elif index == 1:
-                                self.controller["right"] = space_location.pose
+                    self.locate_hands(context.space, frame_state.predicted_display_time)
         exit()
 
-    def get_camera_image(self, texture):
-        while True:
-            try:
-                while not texture.hasRamImage():
-                    sleep(0.01)
-                break
-            except:
-                pass
-            sleep(0.01)
-        image = np.array(texture.getRamImageAs("RGB"), dtype=np.uint8)
-        image = image.reshape((texture.getYSize(), texture.getXSize(), 3))
-        if (texture.getXSize(), texture.getYSize()) != (2064, 2208):
-            image = cv2.resize(
-                image,
-                (
-                    texture.getXSize(),
-                    texture.getYSize() * 2064 // 2208,
-                ),
-                interpolation=cv2.INTER_CUBIC,
+    def locate_hands(self, base_space, time):
+        action_spaces = [
+            self.input.hand_space[Side.LEFT],
+            self.input.hand_space[Side.RIGHT],
+        ]
+        for index, space in enumerate(action_spaces):
+            space_location = xr.locate_space(
+                space=space,
+                base_space=base_space,
+                time=time,
             )
-        return image
+            if space_location.location_flags & xr.SPACE_LOCATION_POSITION_VALID_BIT:
+
+                if index == 0:
+                    self.controller["left"] = space_location.pose
+                elif index == 1:
+                    self.controller["right"] = space_location.pose
+
+    def eye_size(self, width, height):
+        # Frames not rendered at the headset's 2064x2208 are squashed to its aspect
+        if (width, height) == (2064, 2208):
+            return None
+        return (width, height * 2064 // 2208)
 
     def initialize_actions(self):
         # Create an action set.
@@ -0,0 +1,133 @@
+"""
+Eye frame handoff from Panda's render-to-RAM textures to the XR compositor thread.
+
+Eye buffers are created with an alpha channel, so Panda keeps their RAM images
+as 4 byte BGRA rows. Those can be uploaded with GL_BGRA as they are, without
+reordering, padding fixes or an RGB conversion. A FrameTransport exposes the RAM
+image as a NumPy view over the texture's memory (no copy), or copies it once
+into a preallocated ring slot for consumers that hold on to frames. Frames are
+only resized when the texture size differs from the requested one. When both
+eyes share a side-by-side texture, each transport covers its own columns.
+"""
+
+import cv2
+import numpy as np
+from time import sleep
+
+
+class FrameTransport:
+    """
+    Zero-copy access to one eye texture's RAM image.
+
+    Parameters:
+    texture (Texture): Render-to-RAM texture of an eye buffer.
+    size (tuple): (width, height) frames are handed out at, None for the texture size.
+    slots (int): Number of ring slots read() cycles through.
+    columns (tuple): (first, last) fraction of the texture width the frames
+        cover, None for the whole width.
+    """
+
+    def __init__(self, texture, size=None, slots=3, columns=None):
+        self.texture = texture
+        self.columns: tuple = columns
+        self.size: tuple = size
+        self.slots: list = []
+        self.slot_count: int = slots
+        self._next: int = 0
+        # The CPTA the last view points into, kept so Panda cannot free it
+        self._image = None
+        # Panda frame count and perf_counter() the last view was rendered at,
+        # unknown for RAM images
+        self.frame_number: int = None
+        self.frame_time: float = None
+
+    def wait(self, delay=0.01):
+        """
+        Block until the texture has a RAM image, i.e. its buffer rendered once.
+        """
+        while True:
+            try:
+                if self.texture.hasRamImage():
+                    return
+            except Exception:
+                # Texture still being set up on the render thread
+                pass
+            sleep(delay)
+
+    def _crop(self, image: np.ndarray) -> np.ndarray:
+        if self.columns is None or self.columns == (0.0, 1.0):
+            return image
+        width = image.shape[1]
+        first, last = self.columns
+        return image[:, int(round(first * width)) : int(round(last * width))]
+
+    def view(self) -> np.ndarray:
+        """
+        The current RAM image as a (height, width, 4) BGRA view, without copying.
+        Rows run bottom to top, as OpenGL expects them. Panda may render the next
+        frame into the same memory, so finish with the view before then or use read().
+
+        Returns:
+        numpy.ndarray: The view, or None if the texture has no RAM image yet.
+        """
+        texture = self.texture
+        if not texture.hasRamImage():
+            return None
+        if texture.getNumComponents() == 4:
+            image = texture.getRamImage()
+        else:
+            # Buffers without alpha: one conversion pass in C++ instead
+            image = texture.getRamImageAs("BGRA")
+        self._image = image
+        image = np.frombuffer(memoryview(image), dtype=np.uint8).reshape(
+            texture.getYSize(), texture.getXSize(), 4
+        )
+        return self._crop(image)
+
+    def _slot(self, shape) -> np.ndarray:
+        if not self.slots or self.slots[0].shape != shape:
+            self.slots = [
+                np.empty(shape, dtype=np.uint8) for _ in range(self.slot_count)
+            ]
+            self._next = 0
+        slot = self.slots[self._next]
+        self._next = (self._next + 1) % len(self.slots)
+        return slot
+
+    def frame(self) -> np.ndarray:
+        """
+        The frame for an immediate upload: the view itself when no resize is needed,
+        otherwise the view resized into the next ring slot.
+        """
+        image = self.view()
+        if image is None or self.size is None:
+            return image
+        width, height = self.size
+        if image.shape[1] == width and image.shape[0] == height:
+            return image
+        return cv2.resize(
+            image,
+            (width, height),
+            dst=self._slot((height, width, 4)),
+            interpolation=cv2.INTER_CUBIC,
+        )
+
+    def read(self) -> np.ndarray:
+        """
+        A frame that stays valid while the next len(slots) - 1 frames are read,
+        copied (and resized if needed) once into the next ring slot.
+        """
+        image = self.view()
+        if image is None:
+            return None
+        if self.size is None:
+            width, height = image.shape[1], image.shape[0]
+        else:
+            width, height = self.size
+        slot = self._slot((height, width, 4))
+        if image.shape[:2] == slot.shape[:2]:
+            np.copyto(slot, image)
+            return slot
+        return cv2.resize(
+            image, (width, height), dst=slot, interpolation=cv2.INTER_CUBIC
+        )
@@ -0,0 +1,127 @@
+"""
+Single-pass stereo: every Geom is drawn once with an instance count of 2.
+
+The stereo camera's display region spans the whole side-by-side eye buffer.
+Its initial state carries a shader with instance count 2, so each draw call
+renders both eyes. The vertex shader moves vertices into the eye picked by
+gl_InstanceID, using the per-eye view matrices in the eye_view input, and
+squeezes that eye into its half of the buffer. A clip distance cuts geometry
+at the inner edge of each half, so it does not spill into the other eye.
+
+Panda's generated shaders (setShaderAuto) cannot be extended from Python, so
+the stereo shader overrides them at a higher priority. It covers textures,
+vertex colours, colour scale, ambient light and up to 4 diffuse lights, but
+not normal maps, specular highlights, shadows or fog.
+"""
+
+from OpenGL import GL
+from panda3d.core import Mat4, PTA_LMatrix4f, RenderState, Shader, ShaderAttrib
+
+STEREO_VERTEX = """
+#version 150
+uniform mat4 p3d_ModelViewMatrix;
+uniform mat4 p3d_ProjectionMatrix;
+uniform mat3 p3d_NormalMatrix;
+uniform mat4 eye_view[2];
+
+in vec4 p3d_Vertex;
+in vec3 p3d_Normal;
+in vec4 p3d_Color;
+in vec2 p3d_MultiTexCoord0;
+
+out vec3 view_position;
+out vec3 view_normal;
+out vec4 vertex_color;
+out vec2 texcoord;
+
+void main() {
+    vec4 view = p3d_ModelViewMatrix * p3d_Vertex;
+    view_position = view.xyz;
+    view_normal = p3d_NormalMatrix * p3d_Normal;
+    vertex_color = p3d_Color;
+    texcoord = p3d_MultiTexCoord0;
+
+    // Instance 0 is the left eye, instance 1 the right one
+    vec4 clip = p3d_ProjectionMatrix * (eye_view[gl_InstanceID] * view);
+    float side = gl_InstanceID == 0 ? -1.0 : 1.0;
+    gl_ClipDistance[0] = clip.w + side * clip.x;
+    clip.x = 0.5 * (clip.x + side * clip.w);
+    gl_Position = clip;
+}
+"""
+
+STEREO_FRAGMENT = """
+#version 150
+uniform sampler2D p3d_Texture0;
+uniform vec4 p3d_ColorScale;
+uniform struct {
+    vec4 ambient;
+} p3d_LightModel;
+uniform struct {
+    vec4 color;
+    vec4 position;
+} p3d_LightSource[4];
+
+in vec3 view_position;
+in vec3 view_normal;
+in vec4 vertex_color;
+in vec2 texcoord;
+
+out vec4 p3d_FragColor;
+
+void main() {
+    vec3 light = vec3(1.0);
+    if (length(view_normal) > 0.0) {
+        vec3 normal = normalize(view_normal);
+        light = p3d_LightModel.ambient.rgb;
+        for (int i = 0; i < 4; ++i) {
+            // w is 0 for directional lights, their position is a direction
+            vec3 to_light = p3d_LightSource[i].position.xyz
+                - view_position * p3d_LightSource[i].position.w;
+            if (length(to_light) > 0.0) {
+                light += p3d_LightSource[i].color.rgb
+                    * max(dot(normal, normalize(to_light)), 0.0);
+            }
+        }
+    }
+    p3d_FragColor = texture(p3d_Texture0, texcoord) * vertex_color * p3d_ColorScale;
+    p3d_FragColor.rgb *= light;
+}
+"""
+
+
+class InstancedStereo:
+    """
+    Draws a camera's scene for both eyes in one pass.
+
+    Parameters:
+    camera (NodePath): Camera whose display region covers both eyes, left half
+        and right half.
+    separation (float): Distance between the eyes, in scene units.
+    priority (int): Priority of the stereo shader over shaders set in the scene.
+    """
+
+    def __init__(self, camera, separation=0.5, priority=1000):
+        self.camera = camera
+        # Read by Panda every frame, so set_separation only writes the matrices
+        self.eye_views: PTA_LMatrix4f = PTA_LMatrix4f([Mat4.ident_mat()] * 2)
+        shader = Shader.make(Shader.SL_GLSL, STEREO_VERTEX, STEREO_FRAGMENT)
+        attrib = ShaderAttrib.make(shader, priority)
+        attrib = attrib.set_instance_count(2).set_shader_input(
+            "eye_view", self.eye_views
+        )
+        camera.node().set_initial_state(RenderState.make(attrib))
+        self.region = camera.node().get_display_region(0)
+        self.region.set_draw_callback(self._draw)
+        self.set_separation(separation)
+
+    def set_separation(self, separation: float):
+        # Moving an eye left moves the scene right in its view
+        self.eye_views[0] = Mat4.translate_mat(separation / 2, 0, 0)
+        self.eye_views[1] = Mat4.translate_mat(-separation / 2, 0, 0)
+
+    def _draw(self, cbdata):
+        # gl_ClipDistance is only honoured while enabled, Panda leaves it off
+        GL.glEnable(GL.GL_CLIP_DISTANCE0)
+        cbdata.upcall()
+        GL.glDisable(GL.GL_CLIP_DISTANCE0)
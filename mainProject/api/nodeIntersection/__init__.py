@@ -3,20 +3,64 @@
 from .intersection import (
     do_meshes_intersect,
     compute_intersection_points,
+    intersecting_triangle_pairs,
+    triangle_intersection_points,
     panda_mesh_to_numpy,
 )
+from .broadphase import UniformGrid
+from .pandaBackend import TraverserBackend
+from .contacts import CollisionReport, CollisionListener, ContactStore
+from .scheduler import (
+    Layout,
+    Snapshot,
+    SnapshotBuffer,
+    SolveResult,
+    RestingState,
+    Mailbox,
+    FixedStepClock,
+)
+from .bvh import MeshBVH
+from .narrowphase import NarrowPhasePool
+from .gjk import ConvexHullShape, collide
+from .sdf import SDF_CACHE_DIR, SignedDistanceField, load_or_bake
+from .cache import load_mesh_data
+from .shapes import SPHERE, CAPSULE, BOX, refine_pairs
+from .sweep import sweep_spheres
+from .proxies import load_or_build as load_or_build_proxy, pieces_mesh
+from .layers import (
+    DEFAULT_LAYER,
+    ALL_LAYERS,
+    LayerRegistry,
+    allowed_pairs,
+    filter_pairs,
+)
+from .queries import (
+    RaycastHit,
+    normalize_rays,
+    ray_spheres,
+    ray_triangles,
+    nearest_per_ray,
+)
+from .pandaToNumpy import column_view
 from panda3d.core import (
     NodePath,
     Geom,
+    GeomEnums,
     GeomNode,
     GeomTriangles,
     GeomVertexFormat,
     GeomVertexData,
     GeomVertexWriter,
 )
-from time import sleep
+from collections import deque
+from itertools import count
+from math import ceil
+from threading import Event, Thread
 import numpy as np
 
+# Unique body ids, used to key contacts between frames
+_body_ids = count(1)
+
 
 @staticmethod
 def Sphere(radius, lat, lon):
@@ -27,56 +71,68 @@ def Sphere(radius, lat, lon):
     # Create vertex data format
     format = GeomVertexFormat.get_v3n3c4t2()
     vdata = GeomVertexData("vertices", format, Geom.UH_static)
-
-    # Create vertex writer
-    vertex_writer = GeomVertexWriter(vdata, "vertex")
-    normal_writer = GeomVertexWriter(vdata, "normal")
-    color_writer = GeomVertexWriter(vdata, "color")
-    texcoord_writer = GeomVertexWriter(vdata, "texcoord")
+    vdata.set_num_rows((lat + 1) * (lon + 1))
 
     # Generate vertices
-    for i in range(lat + 1):
-        lat_angle = np.pi * i / lat
-        for j in range(lon + 1):
-            lon_angle = 2 * np.pi * j / lon
-            x = radius * np.sin(lat_angle) * np.cos(lon_angle)
-            y = radius * np.sin(lat_angle) * np.sin(lon_angle)
-            z = radius * np.cos(lat_angle)
-            vertex_writer.add_data3f(x, y, z)
-            normal_writer.add_data3f(x / radius, y / radius, z / radius)
-            color_writer.add_data4f(1.0, 1.0, 1.0, 1.0)
-            texcoord_writer.add_data2f(j / lon, i / lat)
+    lat_angle = np.pi * np.arange(lat + 1) / lat
+    lon_angle = 2 * np.pi * np.arange(lon + 1) / lon
+    lat_angle, lon_angle = np.meshgrid(lat_angle, lon_angle, indexing="ij")
+    normals = np.stack(
+        (
+            np.sin(lat_angle) * np.cos(lon_angle),
+            np.sin(lat_angle) * np.sin(lon_angle),
+            np.cos(lat_angle),
+        ),
+        axis=-1,
+    ).reshape(-1, 3)
+    texcoords = np.stack(
+        np.meshgrid(np.arange(lon + 1) / lon, np.arange(lat + 1) / lat), axis=-1
+    ).reshape(-1, 2)
+
+    column_view(vdata, "vertex", writable=True)[:] = normals * radius
+    column_view(vdata, "normal", writable=True)[:] = normals
+    column_view(vdata, "color", writable=True)[:] = 255
+    column_view(vdata, "texcoord", writable=True)[:] = texcoords
 
     # Create triangles
-    tris = []
-    for i in range(lat):
-        for j in range(lon):
-            tris.append(
-                (
-                    i * (lon + 1) + j,
-                    (i + 1) * (lon + 1) + j,
-                    (i + 1) * (lon + 1) + (j + 1),
-                )
-            )
-            tris.append(
-                (
-                    i * (lon + 1) + j,
-                    (i + 1) * (lon + 1) + (j + 1),
-                    i * (lon + 1) + (j + 1),
-                )
-            )
+    row, col = np.meshgrid(np.arange(lat), np.arange(lon), indexing="ij")
+    top = (row * (lon + 1) + col).reshape(-1)
+    bottom = top + lon + 1
+    tris = np.stack(
+        (
+            np.stack((top, bottom, bottom + 1), axis=1),
+            np.stack((top, bottom + 1, top + 1), axis=1),
+        ),
+        axis=1,
+    ).reshape(-1)
 
     # Create geom and add triangles
     geom = Geom(vdata)
     triangles = GeomTriangles(Geom.UH_static)
-    for tri in tris:
-        triangles.add_vertices(*tri)
+    triangles.set_index_type(GeomEnums.NT_uint32)
+    handle = triangles.modify_vertices()
+    handle.set_num_rows(len(tris))
+    np.frombuffer(memoryview(handle).cast("B"), np.uint32)[:] = tris
     geom.add_primitive(triangles)
     node = GeomNode("sphere")
     node.add_geom(geom)
     return node
 
 
+# Unit spheres shared by every debug visual, keyed by (lat, lon)
+_sphere_cache: dict = {}
+
+
+def get_unit_sphere(lat: int = 30, lon: int = 30) -> GeomNode:
+    """
+    Return the shared unit sphere GeomNode for a resolution, building it on first use.
+    """
+    node = _sphere_cache.get((lat, lon))
+    if node is None:
+        node = _sphere_cache[(lat, lon)] = Sphere(1.0, lat, lon)
+    return node
+
+
 @staticmethod
 def Cube(pointArray):
     """
@@ -130,11 +186,12 @@ def Cube(pointArray):
 @staticmethod
 def create_uv_sphere(radius, resolution: tuple = (30, 30)):
     """
-    Create a UV sphere mesh with the given radius and position.
+    Create a UV sphere with the given radius. The geometry is an instance of the
+    cached unit sphere, scaled to size.
     """
-    sphere = Sphere(radius, resolution[0], resolution[0])
     sphereNode = NodePath("sphere")
-    sphereNode.attach_new_node(sphere)
+    sphereNode.attach_new_node(get_unit_sphere(resolution[0], resolution[1]))
+    sphereNode.set_scale(radius)
     return sphereNode
 
 
@@ -376,76 +433,236 @@ class CubeGenerator:
         )
 
 
-class BaseActor:
+class BaseBody:
+    """
+    Sphere-level body. The debug sphere is only created the first time it is used.
+    Capsules and boxes are base bodies too: radius is then their bounding sphere,
+    which the sphere pass uses before their exact test, see Mgr.add_capsule_actor.
+    """
+
     def __init__(
-        self, radius: float, position: tuple, name: str, mesh=None, nodePath=None
+        self,
+        radius: float,
+        position: tuple,
+        name: str,
+        mesh=None,
+        nodePath=None,
+        category: int = DEFAULT_LAYER,
+        mask: int = ALL_LAYERS,
     ):
         self.radius: float = radius
         self.position: tuple = position
-        self.sphere = create_uv_sphere(radius)
         self.mesh: GeomNode = mesh
         self.nodePath: NodePath = nodePath
         self.name: str = name
-        self.collision_report: CollisionReport = None
+        self.collision_report: list[CollisionReport] = None
+        self.id: int = next(_body_ids)
+        # Layers this body belongs to and layers it collides with, see Mgr.layer()
+        self.category: int = category
+        self.mask: int = mask
+        self._sphere: NodePath = None
+        # Net transform at the last snapshot, kept alive so its pointer stays unique
+        self._transform = None
+        self.shape: int = SPHERE
+        # (radius, 0, 0), (radius, half height, 0) or box half extents, see shapes.py
+        self.extents: tuple = (radius, 0.0, 0.0)
+        # World rotation of a capsule or box, rows are its axes in world space
+        self.rotation: np.ndarray = np.identity(3)
+        # Rotation and center of the shape in its NodePath's space
+        self.local_rotation: np.ndarray = np.identity(3)
+        self.local_center: np.ndarray = np.zeros(3)
+
+    def follow(self, node_path: NodePath):
+        """
+        Place a capsule or box on its NodePath. Touches the scene graph, main thread only.
+        """
+        matrix = np.array(node_path.get_mat(base.render))  # type: ignore
+        axes = matrix[:3, :3]
+        # Scale is baked into the extents when the body is added, only rotate here
+        axes = axes / np.linalg.norm(axes, axis=1)[:, None]
+        self.rotation = self.local_rotation @ axes
+        self.position = tuple(
+            (self.local_center @ matrix[:3, :3] + matrix[3, :3]).tolist()
+        )
+
+    @property
+    def sphere(self) -> NodePath:
+        if self._sphere is None:
+            self._sphere = create_uv_sphere(self.radius)
+        return self._sphere
+
+    def has_sphere(self) -> bool:
+        return self._sphere is not None
+
+
+class BaseActor(BaseBody):
+    pass
+
 
+class BaseCollider(BaseBody):
+    pass
+
+
+class ComplexBody:
+    """
+    Mesh-level body. The triangles are kept in the mesh's local space together with
+    a BVH that is refit whenever the NodePath's world transform changes.
+    Convex bodies also keep their convex hull: a pair of two convex bodies is
+    tested with GJK/EPA instead of triangle against triangle.
+    Meshes loaded from a model file keep this data in a collision file next to
+    the model and map it from there on later launches.
+    """
 
-class BaseCollider:
     def __init__(
-        self, radius: float, position: tuple, name: str, mesh=None, nodePath=None
+        self, mesh: NodePath, name: str, convex: bool = False, cache: bool = True
     ):
-        self.radius: float = radius
-        self.position: tuple = position
-        self.sphere: NodePath = create_uv_sphere(radius)
-        self.mesh: GeomNode = mesh
-        self.nodePath: NodePath = nodePath
-        self.name: str = name
-        self.collision_report: CollisionReport = None
+        self._setup(mesh, name, *load_mesh_data(mesh, convex, cache))
 
-
-class ComplexActor:
-    def __init__(self, mesh: NodePath, name: str):
+    def _setup(self, mesh, name, array, indices, bvh, hull):
         self.mesh: NodePath = mesh
-        self.array = panda_mesh_to_numpy(mesh)
+        self.array: np.ndarray = array
+        self.indices: np.ndarray = indices
+        self.bvh: MeshBVH = bvh
+        self.hull: ConvexHullShape = hull
+        # Convex pieces of a CompoundCollider
+        self.pieces: tuple = None
         self.name: str = name
-        self.collision_report: CollisionReport = None
+        self.collision_report: list[CollisionReport] = None
+        self.id: int = next(_body_ids)
+        self.category: int = DEFAULT_LAYER
+        self.mask: int = ALL_LAYERS
+        self._matrix: np.ndarray = None
+
+    @property
+    def hulls(self) -> tuple:
+        """
+        Convex shapes GJK tests this body with, None for triangle-only bodies.
+        """
+        if self.pieces is not None:
+            return self.pieces
+        return None if self.hull is None else (self.hull,)
+
+    def world_matrix(self) -> np.ndarray:
+        """
+        Read the mesh's world transform. Touches the scene graph, main thread only.
+        """
+        if not isinstance(self.mesh, NodePath):
+            return None
+        return np.array(self.mesh.get_mat(base.render))  # type: ignore
+
+    def refit(self, matrix: np.ndarray) -> bool:
+        """
+        Refit the BVH to a world transform. Safe to call off the main thread.
+
+        Returns:
+        bool: True if the transform changed since the last refit.
+        """
+        if matrix is None:
+            return False
+        if self._matrix is not None and np.array_equal(matrix, self._matrix):
+            return False
+        self._matrix = matrix
+        self.bvh.refit(self.array @ matrix[:3, :3] + matrix[3, :3])
+        return True
+
+    def refresh(self) -> bool:
+        """
+        Refit the BVH to the mesh's current world transform.
+
+        Returns:
+        bool: True if the transform changed since the last refresh.
+        """
+        return self.refit(self.world_matrix())
+
+    def refitted(self, matrix: np.ndarray) -> MeshBVH:
+        """
+        A copy of the BVH fit to a world transform. Neither the body's BVH nor its
+        transform change, so it is safe while another thread refits the body.
+        """
+        if matrix is None:
+            return self.bvh
+        return self.bvh.refitted(self.array @ matrix[:3, :3] + matrix[3, :3])
+
+
+class ComplexActor(ComplexBody):
+    pass
+
+
+class ComplexCollider(ComplexBody):
+    pass
+
+
+class CompoundCollider(ComplexCollider):
+    """
+    Complex collider made of convex pieces, e.g. a simplified proxy of a render mesh.
+    Convex actors test every piece with GJK/EPA, other complex actors test the
+    triangles of the pieces' hulls.
+    """
 
+    def __init__(self, mesh: NodePath, name: str, pieces: list):
+        vertices, indices = pieces_mesh(pieces)
+        self._setup(mesh, name, vertices, indices, MeshBVH(vertices, indices), None)
+        self.pieces = tuple(ConvexHullShape.from_vertices(piece) for piece in pieces)
 
-class ComplexCollider:
-    def __init__(self, mesh: NodePath, name: str):
-        self.mesh: NodePath = mesh
-        self.array = panda_mesh_to_numpy(mesh)
-        self.name: str = name
-        self.collision_report: CollisionReport = None
 
+class SdfCollider:
+    """
+    Static collider answered from a baked signed distance field of its mesh.
+    The field is baked (or loaded from the cache) in the mesh's local space and the
+    world transform is read when the collider is added. Call refresh() after
+    moving the mesh. Only uniform scales keep the distances exact.
+    """
 
-class CollisionReport:
     def __init__(
         self,
-        actor: BaseActor,
-        collider: BaseCollider,
-        actor_position: tuple,
-        collider_position: tuple,
+        mesh: NodePath,
+        name: str,
+        resolution: int = 64,
+        padding: float = 0.1,
+        cache_dir: str = SDF_CACHE_DIR,
     ):
-        self.actor = actor
-        self.collider = collider
-        self.actorStr = actor.name
-        self.colliderStr = collider.name
-        self.actor_position = actor_position
-        self.collider_position = collider_position
-        self.report = {
-            "actor": actor,
-            "collider": collider,
-            "actor_position": actor_position,
-            "collider_position": collider_position,
-        }
-
-    def __str__(self):
-        return f"CollisionReport(actor: {self.actorStr}, collider: {self.colliderStr}, actor_position: {self.actor_position}, collider_position: {self.collider_position})"
-
-    def __repr__(self):
-        return self.__str__()
-
-    def randThingy(): ...
+        self.mesh: NodePath = mesh
+        self.name: str = name
+        self.collision_report: list[CollisionReport] = None
+        self.id: int = next(_body_ids)
+        self.category: int = DEFAULT_LAYER
+        self.mask: int = ALL_LAYERS
+        vertices, indices = panda_mesh_to_numpy(mesh, with_indices=True)
+        self.field: SignedDistanceField = load_or_bake(
+            vertices, indices, resolution, padding, cache_dir
+        )
+        self._matrix: np.ndarray = np.identity(4)
+        self._inverse: np.ndarray = np.identity(4)
+        self._scale: float = 1.0
+        self.refresh()
+
+    def refresh(self):
+        """
+        Read the mesh's world transform. Touches the scene graph, main thread only.
+        """
+        if not isinstance(self.mesh, NodePath):
+            return
+        self._matrix = np.array(self.mesh.get_mat(base.render))  # type: ignore
+        self._inverse = np.linalg.inv(self._matrix)
+        self._scale = float(abs(np.linalg.det(self._matrix[:3, :3])) ** (1 / 3))
+
+    def distance(self, points: np.ndarray):
+        """
+        Signed distance and outward unit normal of the surface at world space points.
+
+        Returns:
+        tuple: Distances (k,), negative behind the surface, and normals (k, 3).
+        """
+        local = points @ self._inverse[:3, :3] + self._inverse[3, :3]
+        distances, normals = self.field.sample(local)
+        # Normals transform with the inverse transpose, in row-vector form that is
+        # the inverse's transpose on the right
+        normals = normals @ self._inverse[:3, :3].T
+        length = np.linalg.norm(normals, axis=1)
+        return (
+            distances * self._scale,
+            normals / np.where(length > 0, length, 1.0)[:, None],
+        )
 
 
 class Mgr:
@@ -455,58 +672,530 @@ class Mgr:
         self.base_colliders: list[BaseCollider] = []
         self.complex_colliders: list[ComplexCollider] = []
         self.reportedCollisions: list[CollisionReport] = []
+        self.contacts: ContactStore = ContactStore()
+        self.listeners: list[CollisionListener] = []
+
+        # Struct-of-arrays mirror of the base bodies. Radii are rebuilt whenever a
+        # body is added or removed, positions are refreshed once per update().
+        self.actor_positions: np.ndarray = np.zeros((0, 3))
+        self.actor_radii: np.ndarray = np.zeros(0)
+        self.collider_positions: np.ndarray = np.zeros((0, 3))
+        self.collider_radii: np.ndarray = np.zeros(0)
+        self._arrays_dirty: bool = True
+        self._layout: Layout = None
+        self._frame: int = 0
+
+        # Threaded mode: the render thread publishes snapshots and applies results,
+        # the collision thread only ever sees snapshots. See start().
+        self.threaded: bool = False
+        self._snapshots: SnapshotBuffer = SnapshotBuffer()
+        self._results: Mailbox = Mailbox()
+        self._stop_event: Event = Event()
+        self._thread: Thread = None
+        self.clock: FixedStepClock = None
+        # Grid insertions/removals, replayed by whichever thread solves next
+        self._grid_ops: deque = deque()
+        # Threaded casts run on the main thread while the solver refits the BVHs and
+        # rebuckets the grid, so they use private copies, see _grid_for_casts()
+        self._cast_grid: UniformGrid = None
+        self._cast_frame: int = None
+        self._cast_bvhs: dict = {}
+        # Last solve's results, so bodies that did not move can sleep
+        self._resting: RestingState = None
+        self._complex_resting: dict = {}
+        # Last GJK search direction per convex pair, GJK's warm start
+        self._gjk_directions: dict = {}
+        # Static colliders queried through baked distance fields, see sphere_distance
+        self.sdf_colliders: list[SdfCollider] = []
+        self._convex_hits: list = []
+
+        # "all_pairs" tests every actor against every collider, "grid" only tests
+        # pairs that share a cell of the uniform grid, "panda" hands the sphere
+        # pass to Panda's CollisionTraverser. See set_broadphase().
+        self.broadphase: str = "all_pairs"
+        self.grid: UniformGrid = None
+        self.traverser: TraverserBackend = None
+
+        # Continuous collision of base bodies, see set_continuous(). Holds the
+        # layout and positions of the last solve, where this solve's motion starts
+        self.continuous: bool = False
+        self._swept_from: tuple = None
+        self.collisions_visible: bool = False
+
+        # Optional process pool for complex pairs, see enable_process_pool()
+        self.pool: NarrowPhasePool = None
+
+        # Collision layers and pairs that are never tested, see layer() and ignore_pair()
+        self.layers: LayerRegistry = LayerRegistry()
+        self.ignored_pairs: set = set()
+
+    def set_broadphase(self, mode: str = "all_pairs", cell_size: float = 2.0):
+        """
+        Choose how candidate actor/collider pairs are found.
+
+        Parameters:
+        mode (str): "all_pairs" for small scenes, "grid" for scenes with many bodies,
+            "panda" to test bounding spheres with Panda's native CollisionTraverser.
+        cell_size (float): Edge length of a grid cell, ideally around the typical collider diameter.
+        """
+        if mode not in ("all_pairs", "grid", "panda"):
+            raise ValueError(f"Unknown broadphase mode: {mode}")
+        self.broadphase = mode
+        self.traverser = TraverserBackend() if mode == "panda" else None
+        if mode == "grid":
+            grid = UniformGrid(cell_size)
+            for actor in self.base_actors:
+                grid.insert("actor", actor, actor.position, actor.radius)
+            for collider in self.base_colliders:
+                grid.insert("collider", collider, collider.position, collider.radius)
+            self._grid_ops.clear()
+            self.grid = grid
+        else:
+            self.grid = None
+        self._arrays_dirty = True
+
+    def set_continuous(self, enabled: bool = True):
+        """
+        Sweep base bodies from their last solved position to the current one, so
+        fast bodies cannot pass through thin ones between two collision ticks and
+        collision can tick below the render rate. Pairs that only touched during the
+        sweep are reported with a time_of_impact and their positions at that moment.
+        Works for every pair where at least one side is a sphere; pairs of two
+        capsules or boxes keep the discrete test.
+        """
+        self.continuous = enabled
+        self._swept_from = None
+
+    def enable_process_pool(self, max_workers: int = None) -> NarrowPhasePool:
+        """
+        Test complex actor/collider pairs on a process pool instead of in update().
+        Complex collisions are then reported one collision tick late.
+
+        Parameters:
+        max_workers (int): Number of worker processes. Defaults to the CPU count.
+
+        Returns:
+        NarrowPhasePool: The pool, already holding every registered complex mesh.
+        """
+        self.disable_process_pool()
+        pool = NarrowPhasePool(max_workers)
+        for body in self.complex_actors + self.complex_colliders:
+            pool.register(body)
+        self.pool = pool
+        return pool
+
+    def disable_process_pool(self):
+        pool, self.pool = self.pool, None
+        if pool is not None:
+            pool.shutdown()
+
+    def layer(self, name: str) -> int:
+        """
+        Get the bit of a named collision layer, creating it on first use.
+        Categories and masks accept layer names, bits, or lists of either.
+        """
+        return self.layers.bit(name)
+
+    def enable_layers(self, *layers):
+        self.layers.enabled |= self.layers.bits_of(layers)
+
+    def disable_layers(self, *layers):
+        self.layers.enabled &= ~self.layers.bits_of(layers)
+
+    def set_active_layers(self, *layers):
+        """
+        Enable only the given layers, e.g. when switching scene phase.
+        Bodies whose category has no enabled layer are skipped entirely.
+        """
+        self.layers.enabled = self.layers.bits_of(layers)
+
+    def set_body_layers(self, body: BaseBody, category=None, mask=None) -> BaseBody:
+        """
+        Change which layers a base or complex body belongs to and collides with.
+        """
+        if category is not None:
+            body.category = self.layers.bits_of(category)
+        if mask is not None:
+            body.mask = self.layers.bits_of(mask)
+        self._arrays_dirty = True
+        return body
+
+    def ignore_pair(self, actor: BaseBody, collider: BaseBody, ignore: bool = True):
+        """
+        Never test this actor against this collider, whatever their layers.
+        """
+        key = ContactStore.key(actor.id, collider.id)
+        if ignore:
+            self.ignored_pairs.add(key)
+        else:
+            self.ignored_pairs.discard(key)
+        self._arrays_dirty = True
 
     def showCollisions(self):
-        for actor in self.base_actors:
-            actor.sphere.show()
-        for collider in self.base_colliders:
-            actor.sphere.show()
+        """
+        Show a debug sphere for every base body, creating the spheres on first use.
+        """
+        self.collisions_visible = True
+        for body in self.base_actors + self.base_colliders:
+            self._show_sphere(body)
 
     def hideCollisions(self):
-        for actor in self.base_actors:
-            actor.sphere.hide()
-        for collider in self.base_colliders:
-            collider.sphere.hide()
+        self.collisions_visible = False
+        for body in self.base_actors + self.base_colliders:
+            if body.has_sphere():
+                body.sphere.hide()
+
+    def _show_sphere(self, body: BaseBody):
+        sphere = body.sphere
+        if not sphere.has_parent():
+            sphere.reparent_to(base.render)  # type: ignore
+        sphere.set_pos(body.position)
+        sphere.show()
 
     def add_base_actor(
-        self, radius, position, name, mesh=None, nodePath=None
+        self,
+        radius,
+        position,
+        name,
+        mesh=None,
+        nodePath=None,
+        category=DEFAULT_LAYER,
+        mask=ALL_LAYERS,
     ) -> BaseActor:
-        actor = BaseActor(radius, position, name, mesh, nodePath)
+        actor = BaseActor(
+            radius,
+            position,
+            name,
+            mesh,
+            nodePath,
+            self.layers.bits_of(category),
+            self.layers.bits_of(mask),
+        )
         self.base_actors.append(actor)
+        self._queue_grid_op("insert", "actor", actor)
         return actor
 
-    def add_complex_actor(self, name, mesh) -> ComplexActor:
-        actor = ComplexActor(mesh, name)
+    def _add_shape(self, body, shape, extents, nodePath):
+        """
+        Turn a base body into a capsule or box. Extents of None are fit to the
+        NodePath's tight bounds, in its own space, scaled to world units.
+        """
+        body.shape = shape
+        if extents is None:
+            if nodePath is None:
+                raise ValueError(f"{body.name}: give the size or a NodePath to fit")
+            bounds = nodePath.get_tight_bounds(nodePath)
+            if bounds is None:
+                raise ValueError(f"{body.name}: {nodePath} has no geometry to fit")
+            low, high = (np.array(point) for point in bounds)
+            scale = np.linalg.norm(
+                np.array(nodePath.get_mat(base.render))[:3, :3], axis=1  # type: ignore
+            )
+            half = (high - low) / 2 * scale
+            body.local_center = (low + high) / 2
+            if shape == BOX:
+                extents = tuple(half.tolist())
+            else:
+                # Along the longest side, a cyclic reorder keeps the frame right-handed
+                axis = int(np.argmax(half))
+                order = [(axis + 1) % 3, (axis + 2) % 3, axis]
+                body.local_rotation = np.identity(3)[order]
+                radius = float(max(half[order[0]], half[order[1]]))
+                extents = (radius, max(float(half[axis]) - radius, 0.0), 0.0)
+        body.extents = tuple(float(value) for value in extents)
+        if shape == BOX:
+            body.radius = float(np.linalg.norm(body.extents))
+        else:
+            body.radius = body.extents[0] + body.extents[1]
+        if nodePath is not None:
+            body.follow(nodePath)
+        return body
+
+    def add_capsule_actor(
+        self,
+        radius,
+        half_height,
+        position,
+        name,
+        nodePath=None,
+        category=DEFAULT_LAYER,
+        mask=ALL_LAYERS,
+    ) -> BaseActor:
+        """
+        Add a capsule: a segment along the local Z axis, grown by radius.
+
+        Parameters:
+        radius (float): Capsule radius, or None (with half_height None) to fit the
+            capsule to nodePath's bounds along their longest side.
+        half_height (float): Half the length of the segment, without the caps.
+        position (tuple): Center, replaced by the NodePath's while one is given.
+        nodePath (NodePath): The capsule follows this node's position and rotation.
+
+        Returns:
+        BaseActor: The body. Ray and sphere casts still see it as its bounding sphere.
+        """
+        actor = BaseActor(
+            0.0,
+            position,
+            name,
+            None,
+            nodePath,
+            self.layers.bits_of(category),
+            self.layers.bits_of(mask),
+        )
+        extents = None if radius is None else (radius, half_height, 0.0)
+        self._add_shape(actor, CAPSULE, extents, nodePath)
+        self.base_actors.append(actor)
+        self._queue_grid_op("insert", "actor", actor)
+        return actor
+
+    def add_box_actor(
+        self,
+        half_extents,
+        position,
+        name,
+        nodePath=None,
+        category=DEFAULT_LAYER,
+        mask=ALL_LAYERS,
+    ) -> BaseActor:
+        """
+        Add an oriented box.
+
+        Parameters:
+        half_extents (tuple): Half size along the local axes, or None to fit the
+            box to nodePath's bounds.
+        position (tuple): Center, replaced by the NodePath's while one is given.
+        nodePath (NodePath): The box follows this node's position and rotation.
+
+        Returns:
+        BaseActor: The body. Ray and sphere casts still see it as its bounding sphere.
+        """
+        actor = BaseActor(
+            0.0,
+            position,
+            name,
+            None,
+            nodePath,
+            self.layers.bits_of(category),
+            self.layers.bits_of(mask),
+        )
+        self._add_shape(actor, BOX, half_extents, nodePath)
+        self.base_actors.append(actor)
+        self._queue_grid_op("insert", "actor", actor)
+        return actor
+
+    def add_complex_actor(
+        self,
+        name,
+        mesh,
+        convex=False,
+        cache=True,
+        category=DEFAULT_LAYER,
+        mask=ALL_LAYERS,
+    ) -> ComplexActor:
+        """
+        Parameters:
+        convex (bool): The mesh is convex (or close enough), test it against other
+            convex bodies with GJK/EPA and report a contact normal and depth.
+        cache (bool): Keep the collision data of meshes loaded from a model file in
+            a "<model>.<part>.collision" file next to it, built once per model version.
+        category: Layers the actor belongs to, as names, bits or a list of either.
+        mask: Layers the actor collides with.
+        """
+        actor = ComplexActor(mesh, name, convex, cache)
+        actor.category = self.layers.bits_of(category)
+        actor.mask = self.layers.bits_of(mask)
         self.complex_actors.append(actor)
+        if self.pool is not None:
+            self.pool.register(actor)
+        self._arrays_dirty = True
         return actor
 
     def add_base_collider(
-        self, radius, position, name, mesh=None, nodePath=None
+        self,
+        radius,
+        position,
+        name,
+        mesh=None,
+        nodePath=None,
+        category=DEFAULT_LAYER,
+        mask=ALL_LAYERS,
+    ) -> BaseCollider:
+        collider = BaseCollider(
+            radius,
+            position,
+            name,
+            mesh,
+            nodePath,
+            self.layers.bits_of(category),
+            self.layers.bits_of(mask),
+        )
+        self.base_colliders.append(collider)
+        self._queue_grid_op("insert", "collider", collider)
+        return collider
+
+    def add_capsule_collider(
+        self,
+        radius,
+        half_height,
+        position,
+        name,
+        nodePath=None,
+        category=DEFAULT_LAYER,
+        mask=ALL_LAYERS,
+    ) -> BaseCollider:
+        """
+        Add a capsule collider, see add_capsule_actor.
+        """
+        collider = BaseCollider(
+            0.0,
+            position,
+            name,
+            None,
+            nodePath,
+            self.layers.bits_of(category),
+            self.layers.bits_of(mask),
+        )
+        extents = None if radius is None else (radius, half_height, 0.0)
+        self._add_shape(collider, CAPSULE, extents, nodePath)
+        self.base_colliders.append(collider)
+        self._queue_grid_op("insert", "collider", collider)
+        return collider
+
+    def add_box_collider(
+        self,
+        half_extents,
+        position,
+        name,
+        nodePath=None,
+        category=DEFAULT_LAYER,
+        mask=ALL_LAYERS,
     ) -> BaseCollider:
-        collider = BaseCollider(radius, position, name, mesh, nodePath)
+        """
+        Add an oriented box collider, see add_box_actor.
+        """
+        collider = BaseCollider(
+            0.0,
+            position,
+            name,
+            None,
+            nodePath,
+            self.layers.bits_of(category),
+            self.layers.bits_of(mask),
+        )
+        self._add_shape(collider, BOX, half_extents, nodePath)
         self.base_colliders.append(collider)
+        self._queue_grid_op("insert", "collider", collider)
+        return collider
+
+    def add_proxy_collider(
+        self,
+        mesh,
+        name,
+        vertex_budget=256,
+        max_pieces=16,
+        tolerance=0.05,
+        cache_dir=SDF_CACHE_DIR,
+        category=DEFAULT_LAYER,
+        mask=ALL_LAYERS,
+    ) -> CompoundCollider:
+        """
+        Collide with a simplified stand-in for a dense render mesh: the mesh is
+        decimated and split into convex pieces, which are registered as one compound
+        collider. Proxies are cached on disk by the mesh's geometry and the settings.
+
+        Parameters:
+        vertex_budget (int): Hull vertices of all pieces together, at most.
+        max_pieces (int): Number of convex pieces, at most.
+        tolerance (float): How far a piece may bulge past the mesh, as a fraction
+            of the mesh's longest side.
+        cache_dir (str): Directory of the cached proxies, None to build every time.
+        """
+        vertices, indices = panda_mesh_to_numpy(mesh, with_indices=True)
+        pieces = load_or_build_proxy(
+            vertices, indices, vertex_budget, max_pieces, tolerance, cache_dir
+        )
+        collider = CompoundCollider(mesh, name, pieces)
+        collider.category = self.layers.bits_of(category)
+        collider.mask = self.layers.bits_of(mask)
+        self.complex_colliders.append(collider)
+        if self.pool is not None:
+            self.pool.register(collider)
+        self._arrays_dirty = True
         return collider
 
-    def add_complex_collider(self, mesh, name) -> ComplexCollider:
-        collider = ComplexCollider(mesh, name)
+    def add_complex_collider(
+        self,
+        mesh,
+        name,
+        convex=False,
+        cache=True,
+        category=DEFAULT_LAYER,
+        mask=ALL_LAYERS,
+    ) -> ComplexCollider:
+        """
+        Parameters:
+        convex (bool): See add_complex_actor.
+        cache (bool): See add_complex_actor.
+        category: Layers the collider belongs to, as names, bits or a list of either.
+        mask: Layers the collider collides with.
+        """
+        collider = ComplexCollider(mesh, name, convex, cache)
+        collider.category = self.layers.bits_of(category)
+        collider.mask = self.layers.bits_of(mask)
         self.complex_colliders.append(collider)
+        if self.pool is not None:
+            self.pool.register(collider)
+        self._arrays_dirty = True
+        return collider
+
+    def add_sdf_collider(
+        self,
+        mesh,
+        name,
+        resolution=64,
+        padding=0.1,
+        cache_dir=SDF_CACHE_DIR,
+        category=DEFAULT_LAYER,
+        mask=ALL_LAYERS,
+    ) -> SdfCollider:
+        """
+        Bake a static mesh into a signed distance field for sphere_distance queries.
+        The bake is cached on disk by the mesh's content, later launches load it.
+
+        Parameters:
+        resolution (int): Grid cells along the mesh's longest side.
+        padding (float): Margin around the mesh, as a fraction of its longest side.
+        cache_dir (str): Directory of the baked fields, None to bake every time.
+        """
+        collider = SdfCollider(mesh, name, resolution, padding, cache_dir)
+        collider.category = self.layers.bits_of(category)
+        collider.mask = self.layers.bits_of(mask)
+        self.sdf_colliders.append(collider)
+        return collider
+
+    def remove_sdf_collider(self, collider):
+        self.sdf_colliders.remove(collider)
         return collider
 
     def remove_base_actor(self, actor):
         self.base_actors.remove(actor)
-        self.complex_actors.remove(actor)
+        self._queue_grid_op("remove", "actor", actor)
         return actor
 
     def remove_complex_actor(self, actor):
         self.complex_actors.remove(actor)
+        self._arrays_dirty = True
         return actor
 
     def remove_base_collider(self, collider):
         self.base_colliders.remove(collider)
+        self._queue_grid_op("remove", "collider", collider)
         return collider
 
     def remove_complex_collider(self, collider):
         self.complex_colliders.remove(collider)
+        self._arrays_dirty = True
         return collider
 
     def setActorPosition(self, actor: BaseActor, position: tuple) -> BaseActor:
@@ -530,8 +1219,13 @@ class Mgr:
     def transformActorType(self, actor: BaseActor) -> ComplexActor:
         if isinstance(actor, BaseActor):
             new_actor = ComplexActor(actor.mesh, actor.name)
+            new_actor.category = actor.category
+            new_actor.mask = actor.mask
             self.complex_actors.append(new_actor)
+            if self.pool is not None:
+                self.pool.register(new_actor)
             self.base_actors.remove(actor)
+            self._queue_grid_op("remove", "actor", actor)
             return new_actor
         elif isinstance(actor, ComplexActor):
             new_actor = BaseActor(
@@ -539,104 +1233,1137 @@ class Mgr:
                 position=actor.mesh.getPos(base.render),  # type: ignore
                 name=actor.name,
                 mesh=actor.mesh,
+                category=actor.category,
+                mask=actor.mask,
             )
             self.base_actors.append(new_actor)
             self.complex_actors.remove(actor)
+            self._queue_grid_op("insert", "actor", new_actor)
             return new_actor
 
     def clear(self):
+        """
+        Remove every body. Listeners get on_exit for the contacts still alive.
+        """
         self.base_actors.clear()
         self.complex_actors.clear()
         self.base_colliders.clear()
         self.complex_colliders.clear()
+        self.sdf_colliders.clear()
         self.reportedCollisions.clear()
+        self.contacts.clear()
+        if self.listeners:
+            self._dispatch_events()
+        self.contacts.release()
+        self._grid_ops.clear()
+        self._grid_ops.append(("clear", None, None))
+        self._results.clear()
+        self._arrays_dirty = True
 
     def get_reported_collisions(self) -> list:
         return self.reportedCollisions
 
+    def add_collision_listener(
+        self, on_enter=None, on_stay=None, on_exit=None, actor=None, collider=None
+    ) -> CollisionListener:
+        """
+        Register callbacks for pairs starting, continuing or ending contact.
+
+        Parameters:
+        on_enter (callable): Called with the CollisionReport when a pair starts touching.
+        on_stay (callable): Called every update while the pair keeps touching.
+        on_exit (callable): Called once the pair separates or a body is removed.
+        actor: Only report pairs involving this actor. None matches any actor.
+        collider: Only report pairs involving this collider. None matches any collider.
+
+        Returns:
+        CollisionListener: Handle for remove_collision_listener().
+        """
+        listener = CollisionListener(on_enter, on_stay, on_exit, actor, collider)
+        self.listeners.append(listener)
+        return listener
+
+    def remove_collision_listener(self, listener: CollisionListener):
+        self.listeners.remove(listener)
+        return listener
+
+    def raycast(
+        self, origin, direction, max_dist=np.inf, mask=ALL_LAYERS
+    ) -> RaycastHit:
+        """
+        Find the nearest body hit by a ray.
+
+        Parameters:
+        origin (tuple): Start of the ray in render space.
+        direction (tuple): Direction of the ray, any length.
+        max_dist (float): Ignore hits further away than this.
+        mask: Layers to hit, as names, bits or a list of either.
+
+        Returns:
+        RaycastHit: The nearest hit, or None. Bodies containing the origin are skipped.
+        """
+        return self.raycast_batch([(*origin, *direction)], max_dist, mask)[0]
+
+    def segment_cast(self, start, end, mask=ALL_LAYERS) -> RaycastHit:
+        """
+        Find the body hit first along the segment from start to end.
+        """
+        start = np.asarray(start, dtype=np.float64)
+        direction = np.asarray(end, dtype=np.float64) - start
+        return self.raycast(start, direction, np.linalg.norm(direction), mask)
+
+    def sphere_cast(
+        self, origin, direction, radius, max_dist=np.inf, mask=ALL_LAYERS
+    ) -> RaycastHit:
+        """
+        Sweep a sphere along a ray and find the first body it touches.
+        The hit's distance is how far the center travelled, its point the contact point.
+        """
+        return self.raycast_batch(
+            [(*origin, *direction)], max_dist, mask, radius=radius
+        )[0]
+
+    def sphere_distance(self, center, radius=0.0, mask=ALL_LAYERS) -> RaycastHit:
+        """
+        Find the nearest static surface to a sphere, using the baked distance fields.
+
+        Parameters:
+        center (tuple): Center of the sphere in render space.
+        radius (float): Radius of the sphere, 0 for a point.
+        mask: Layers to test, as names, bits or a list of either.
+
+        Returns:
+        RaycastHit: The nearest surface, or None without SDF colliders. The distance
+            is negative while the sphere penetrates, the point lies on the surface
+            and the normal points from the surface toward the sphere.
+        """
+        return self.sphere_distance_batch([center], radius, mask)[0]
+
+    def sphere_distance_batch(self, centers, radii=0.0, mask=ALL_LAYERS) -> list:
+        """
+        sphere_distance for many spheres at once.
+
+        Parameters:
+        centers (numpy.ndarray): Sphere centers of shape (N, 3).
+        radii (float or numpy.ndarray): Radius, shared or one per sphere.
+
+        Returns:
+        list: One RaycastHit or None per sphere.
+        """
+        centers = np.asarray(centers, dtype=np.float64).reshape(-1, 3)
+        radii = np.broadcast_to(np.asarray(radii, dtype=np.float64), len(centers))
+        mask = self.layers.bits_of(mask) & self.layers.enabled
+        best = np.full(len(centers), np.inf)
+        normals = np.zeros((len(centers), 3))
+        bodies = [None] * len(centers)
+        for collider in self.sdf_colliders:
+            if not collider.category & mask:
+                continue
+            distances, collider_normals = collider.distance(centers)
+            closer = distances < best
+            best = np.where(closer, distances, best)
+            normals[closer] = collider_normals[closer]
+            for index in np.nonzero(closer)[0].tolist():
+                bodies[index] = collider
+        points = centers - normals * np.where(np.isfinite(best), best, 0.0)[:, None]
+        return [
+            (
+                None
+                if body is None
+                else RaycastHit(
+                    body,
+                    float(best[index] - radii[index]),
+                    tuple(points[index].tolist()),
+                    tuple(normals[index].tolist()),
+                )
+            )
+            for index, body in enumerate(bodies)
+        ]
+
+    def raycast_batch(
+        self, rays, max_dist=np.inf, mask=ALL_LAYERS, radius: float = 0.0
+    ) -> list:
+        """
+        Cast many rays (or swept spheres) in one vectorized pass.
+
+        Parameters:
+        rays (numpy.ndarray): Array of shape (N, 6) holding origin and direction per ray.
+        max_dist (float or numpy.ndarray): Maximum distance, shared or one per ray.
+        mask: Layers to hit, as names, bits or a list of either.
+        radius (float): Radius of the swept sphere, 0 for plain rays.
+
+        Returns:
+        list: One RaycastHit or None per ray.
+        """
+        origins, directions, max_dists = normalize_rays(rays, max_dist)
+        mask = self.layers.bits_of(mask) & self.layers.enabled
+        snapshot = self._snapshots.latest()
+        if snapshot is None or self._arrays_dirty:
+            snapshot = self.publish_snapshot()
+        layout = snapshot.layout
+
+        ray_indices, distances, points, normals, bodies = [], [], [], [], []
+        for ray_index, distance, point, normal, hit_bodies in self._cast_spheres(
+            snapshot, origins, directions, max_dists, mask, radius
+        ) + self._cast_meshes(snapshot, origins, directions, max_dists, mask, radius):
+            ray_indices.append(ray_index)
+            distances.append(distance)
+            points.append(point)
+            normals.append(normal)
+            bodies.append(hit_bodies)
+        hits = [None] * len(origins)
+        if not ray_indices:
+            return hits
+        ray_indices = np.concatenate(ray_indices)
+        distances = np.concatenate(distances)
+        points = np.concatenate(points)
+        normals = np.concatenate(normals)
+        bodies = [body for group in bodies for body in group]
+        for ray, candidate in enumerate(
+            nearest_per_ray(len(origins), ray_indices, distances).tolist()
+        ):
+            if candidate >= 0:
+                hits[ray] = RaycastHit(
+                    bodies[candidate],
+                    float(distances[candidate]),
+                    tuple(points[candidate].tolist()),
+                    tuple(normals[candidate].tolist()),
+                )
+        return hits
+
+    def _cast_spheres(self, snapshot, origins, directions, max_dists, mask, radius):
+        """
+        Cast against base bodies. The grid, when enabled, only hands over the
+        bodies stored in cells the rays cross.
+        """
+        layout = snapshot.layout
+        kinds = (
+            (
+                layout.base_actors,
+                layout.actor_rows,
+                snapshot.actor_positions,
+                layout.actor_radii,
+                layout.actor_categories,
+            ),
+            (
+                layout.base_colliders,
+                layout.collider_rows,
+                snapshot.collider_positions,
+                layout.collider_radii,
+                layout.collider_categories,
+            ),
+        )
+        grid = self._grid_for_casts(snapshot)
+        if grid is not None:
+            pad = ceil(radius / grid.cell_size)
+            found = [
+                grid.bodies_along(origin, direction, max_dist, pad)
+                for origin, direction, max_dist in zip(
+                    origins.tolist(), directions.tolist(), max_dists.tolist()
+                )
+            ]
+
+        results = []
+        for kind, (bodies, rows, positions, radii, categories) in enumerate(kinds):
+            allowed = (categories & mask) != 0
+            if grid is not None:
+                pairs = [
+                    (ray, rows[body])
+                    for ray, candidates in enumerate(found)
+                    for body in candidates[kind]
+                    if body in rows
+                ]
+                if not pairs:
+                    continue
+                ray_index, row_index = np.array(pairs, dtype=np.int64).T
+                keep = allowed[row_index]
+                ray_index, row_index = ray_index[keep], row_index[keep]
+            else:
+                allowed_rows = np.nonzero(allowed)[0]
+                ray_index = np.repeat(np.arange(len(origins)), len(allowed_rows))
+                row_index = np.tile(allowed_rows, len(origins))
+            if len(ray_index) == 0:
+                continue
+
+            distance = ray_spheres(
+                origins[ray_index],
+                directions[ray_index],
+                positions[row_index],
+                radii[row_index] + radius,
+            )
+            distance[distance > max_dists[ray_index]] = np.inf
+            hit = np.isfinite(distance)
+            ray_index, row_index, distance = (
+                ray_index[hit],
+                row_index[hit],
+                distance[hit],
+            )
+            normal = (
+                origins[ray_index]
+                + distance[:, None] * directions[ray_index]
+                - positions[row_index]
+            ) / (radii[row_index] + radius)[:, None]
+            point = positions[row_index] + normal * radii[row_index][:, None]
+            results.append(
+                (
+                    ray_index,
+                    distance,
+                    point,
+                    normal,
+                    [bodies[row] for row in row_index.tolist()],
+                )
+            )
+        return results
+
+    def _cast_meshes(self, snapshot, origins, directions, max_dists, mask, radius):
+        """
+        Cast against complex bodies through their BVHs.
+        """
+        layout = snapshot.layout
+        results = []
+        for body, matrix in zip(
+            layout.complex_actors + layout.complex_colliders,
+            snapshot.complex_matrices,
+        ):
+            if not body.category & mask:
+                continue
+            if self.threaded:
+                bvh = self._bvh_for_casts(body, matrix)
+            else:
+                # A no-op when the solver already refit to this snapshot
+                body.refit(matrix)
+                bvh = body.bvh
+            candidates = bvh.ray_candidates(origins, directions, max_dists, radius)
+            if len(candidates) == 0:
+                continue
+            ray_index, triangle_index = candidates.T
+            distance, normal = ray_triangles(
+                origins[ray_index],
+                directions[ray_index],
+                bvh.triangles[triangle_index],
+                radius,
+            )
+            hit = np.isfinite(distance) & (distance <= max_dists[ray_index])
+            if not np.any(hit):
+                continue
+            ray_index, distance, normal = ray_index[hit], distance[hit], normal[hit]
+            point = (
+                origins[ray_index]
+                + distance[:, None] * directions[ray_index]
+                - normal * radius
+            )
+            results.append((ray_index, distance, point, normal, [body] * len(distance)))
+        return results
+
+    def _grid_for_casts(self, snapshot: Snapshot) -> UniformGrid:
+        """
+        The grid casts walk. In threaded mode the solver thread rebuckets self.grid
+        while casts run, so they walk a grid of their own, refreshed from the
+        snapshot they cast against.
+        """
+        grid = self.grid
+        if grid is None or not self.threaded:
+            return grid
+        if self._cast_grid is None:
+            self._cast_grid = UniformGrid(grid.cell_size)
+            self._cast_frame = None
+        if self._cast_frame != snapshot.frame:
+            layout = snapshot.layout
+            self._cast_grid.refresh(
+                "actor",
+                layout.base_actors,
+                snapshot.actor_positions,
+                layout.actor_radii,
+            )
+            self._cast_grid.refresh(
+                "collider",
+                layout.base_colliders,
+                snapshot.collider_positions,
+                layout.collider_radii,
+            )
+            self._cast_frame = snapshot.frame
+        return self._cast_grid
+
+    def _bvh_for_casts(self, body: ComplexBody, matrix: np.ndarray) -> MeshBVH:
+        """
+        A copy of a complex body's BVH fit to a snapshot's transform, for threaded
+        casts. Kept until the body moves, so repeated casts do not refit again.
+        """
+        cached = self._cast_bvhs.get(body)
+        if cached is not None and (
+            cached[0] is matrix or np.array_equal(cached[0], matrix)
+        ):
+            return cached[1]
+        bvh = body.refitted(matrix)
+        self._cast_bvhs[body] = (matrix, bvh)
+        return bvh
+
+    def _dispatch_events(self):
+        contacts = self.contacts
+        for listener in self.listeners:
+            for callback, reports in (
+                (listener.on_exit, contacts.exited),
+                (listener.on_enter, contacts.entered),
+                (listener.on_stay, contacts.stayed),
+            ):
+                if callback is None:
+                    continue
+                for report in reports:
+                    if listener.matches(report):
+                        callback(report)
+
+    def _queue_grid_op(self, op: str, kind: str, body):
+        if self.grid is not None:
+            self._grid_ops.append((op, kind, body))
+        self._arrays_dirty = True
+
+    def _apply_grid_ops(self, grid: UniformGrid):
+        while self._grid_ops:
+            op, kind, body = self._grid_ops.popleft()
+            if op == "insert":
+                grid.insert(kind, body, body.position, body.radius)
+            elif op == "remove":
+                grid.remove(kind, body)
+            else:
+                grid.clear()
+
+    def _rebuild_layout(self):
+        """
+        Freeze the registered bodies into a new Layout.
+        """
+        self._layout = Layout(
+            self.base_actors,
+            self.base_colliders,
+            self.complex_actors,
+            self.complex_colliders,
+            self.ignored_pairs,
+        )
+        self.actor_radii = self._layout.actor_radii
+        self.collider_radii = self._layout.collider_radii
+        self._arrays_dirty = False
+        self._cast_grid = None
+        self._cast_bvhs = {}
+        if self.pool is not None:
+            # Release the shared meshes of removed complex bodies
+            self.pool.retain(self.complex_actors + self.complex_colliders)
+
+    def publish_snapshot(self) -> Snapshot:
+        """
+        Read every body's world transform once and publish it for the solver.
+        Touches the scene graph, so it must run on the main thread.
+        """
+        if self._arrays_dirty:
+            self._rebuild_layout()
+        layout = self._layout
+        previous = self._snapshots.latest()
+        snapshot = self._snapshots.back()
+        snapshot.fit(layout)
+        reuse = previous is not None and previous.layout is layout
+        for bodies, positions, previous_positions, rotations, shaped_rows in (
+            (
+                layout.base_actors,
+                snapshot.actor_positions,
+                previous.actor_positions if reuse else None,
+                snapshot.actor_rotations,
+                layout.actor_shaped_rows,
+            ),
+            (
+                layout.base_colliders,
+                snapshot.collider_positions,
+                previous.collider_positions if reuse else None,
+                snapshot.collider_rotations,
+                layout.collider_shaped_rows,
+            ),
+        ):
+            if reuse:
+                positions[:] = previous_positions
+            for index, body in enumerate(bodies):
+                node_path = body.nodePath
+                if node_path is not None:
+                    # Panda hands back the same cached TransformState while nothing
+                    # along the path changed, so an unchanged pointer means no move
+                    transform = node_path.get_net_transform()
+                    if reuse and body._transform is not None:
+                        if transform.this == body._transform.this:
+                            continue
+                    body._transform = transform
+                    if body.shape == SPHERE:
+                        body.position = node_path.getPos(base.render)  # type: ignore
+                    else:
+                        body.follow(node_path)
+                positions[index] = body.position
+            for index in shaped_rows.tolist():
+                rotations[index] = bodies[index].rotation
+        snapshot.complex_matrices = [
+            body.world_matrix()
+            for body in layout.complex_actors + layout.complex_colliders
+        ]
+        snapshot.enabled_layers = self.layers.enabled
+        self._frame += 1
+        snapshot.frame = self._frame
+        self._snapshots.publish(snapshot)
+
+        self.actor_positions = snapshot.actor_positions
+        self.collider_positions = snapshot.collider_positions
+        if self.collisions_visible:
+            for body in layout.base_actors + layout.base_colliders:
+                self._show_sphere(body)
+        return snapshot
+
+    def _solve(self, snapshot: Snapshot) -> SolveResult:
+        """
+        Find every collision in a snapshot. Pure NumPy, safe off the main thread.
+        """
+        layout = snapshot.layout
+        grid = self.grid
+        if grid is not None:
+            # Kept current even without pairs to test, casts walk it too
+            self._refresh_grid(snapshot, grid)
+        if len(layout.base_actors) != 0 and len(layout.base_colliders) != 0:
+            actor_indices, collider_indices = self._find_overlaps(snapshot)
+            if layout.shaped and len(actor_indices):
+                # Bounding spheres touch, now test the capsules and boxes themselves
+                keep = refine_pairs(
+                    (
+                        layout.actor_shapes,
+                        snapshot.actor_positions,
+                        snapshot.actor_rotations,
+                        layout.actor_extents,
+                    ),
+                    (
+                        layout.collider_shapes,
+                        snapshot.collider_positions,
+                        snapshot.collider_rotations,
+                        layout.collider_extents,
+                    ),
+                    actor_indices,
+                    collider_indices,
+                )
+                actor_indices = actor_indices[keep]
+                collider_indices = collider_indices[keep]
+        else:
+            actor_indices = collider_indices = np.zeros(0, dtype=np.int64)
+        swept_hits = []
+        if self.continuous:
+            swept_hits = self._sweep(snapshot, actor_indices, collider_indices)
+        complex_hits = []
+        if len(layout.complex_actors) != 0 and len(layout.complex_colliders) != 0:
+            if self.pool is not None:
+                complex_hits = self._solve_complex_pooled(snapshot, self.pool)
+            else:
+                complex_hits = self._solve_complex(snapshot)
+        return SolveResult(
+            snapshot.frame,
+            layout,
+            actor_indices,
+            collider_indices,
+            complex_hits,
+            swept_hits,
+        )
+
+    def _sweep(self, snapshot: Snapshot, actor_indices, collider_indices) -> list:
+        """
+        Find base pairs that touched between the last solve and this one without
+        overlapping now.
+
+        Returns:
+        list: (actor_row, collider_row, time_of_impact, actor_position,
+            collider_position, normal) per swept pair.
+        """
+        layout = snapshot.layout
+        previous = self._swept_from
+        self._swept_from = (
+            layout,
+            snapshot.actor_positions.copy(),
+            snapshot.collider_positions.copy(),
+        )
+        if previous is None or previous[0] is not layout:
+            return []
+        _, actor_starts, collider_starts = previous
+        actor_motions = snapshot.actor_positions - actor_starts
+        collider_motions = snapshot.collider_positions - collider_starts
+        actor_awake = np.any(actor_motions != 0, axis=1)
+        collider_awake = np.any(collider_motions != 0, axis=1)
+        if not actor_awake.any() and not collider_awake.any():
+            return []
+
+        # Pairs with a moving side whose swept bounding spheres overlap
+        awake_actors = np.nonzero(actor_awake)[0]
+        asleep_actors = np.nonzero(~actor_awake)[0]
+        awake_colliders = np.nonzero(collider_awake)[0]
+        collider_count = len(layout.base_colliders)
+        rows_a = np.concatenate(
+            (
+                np.repeat(awake_actors, collider_count),
+                np.repeat(asleep_actors, len(awake_colliders)),
+            )
+        )
+        rows_c = np.concatenate(
+            (
+                np.tile(np.arange(collider_count), len(awake_actors)),
+                np.tile(awake_colliders, len(asleep_actors)),
+            )
+        )
+        middle = (
+            actor_starts[rows_a]
+            + actor_motions[rows_a] / 2
+            - collider_starts[rows_c]
+            - collider_motions[rows_c] / 2
+        )
+        reach = (
+            layout.actor_radii[rows_a]
+            + layout.collider_radii[rows_c]
+            + np.linalg.norm(actor_motions[rows_a], axis=1) / 2
+            + np.linalg.norm(collider_motions[rows_c], axis=1) / 2
+        )
+        keep = np.einsum("pd,pd->p", middle, middle) <= reach * reach
+        actor_shapes = layout.actor_shapes[rows_a]
+        collider_shapes = layout.collider_shapes[rows_c]
+        keep &= (actor_shapes == SPHERE) | (collider_shapes == SPHERE)
+        # Pairs overlapping now are already reported by the discrete test
+        keep &= ~np.isin(
+            rows_a * collider_count + rows_c,
+            actor_indices * collider_count + collider_indices,
+        )
+        rows_a = rows_a[keep]
+        rows_c = rows_c[keep]
+        if layout.filtered or snapshot.enabled_layers != ALL_LAYERS:
+            keep = filter_pairs(layout, snapshot.enabled_layers, rows_a, rows_c)
+            rows_a = rows_a[keep]
+            rows_c = rows_c[keep]
+        if len(rows_a) == 0:
+            return []
+
+        # Sweep the sphere side relative to the other side, which is held at its
+        # current pose; the actor is the sphere unless it is a capsule or box
+        actor_sphere = layout.actor_shapes[rows_a] == SPHERE
+        relative = actor_motions[rows_a] - collider_motions[rows_c]
+        sphere = actor_sphere[:, None]
+        origins = np.where(
+            sphere,
+            snapshot.actor_positions[rows_a] - relative,
+            snapshot.collider_positions[rows_c] + relative,
+        )
+        times, normals = sweep_spheres(
+            origins,
+            np.where(sphere, relative, -relative),
+            np.where(
+                actor_sphere,
+                layout.actor_radii[rows_a],
+                layout.collider_radii[rows_c],
+            ),
+            np.where(
+                actor_sphere,
+                layout.collider_shapes[rows_c],
+                layout.actor_shapes[rows_a],
+            ),
+            np.where(
+                sphere,
+                snapshot.collider_positions[rows_c],
+                snapshot.actor_positions[rows_a],
+            ),
+            np.where(
+                sphere[:, :, None],
+                snapshot.collider_rotations[rows_c],
+                snapshot.actor_rotations[rows_a],
+            ),
+            np.where(
+                sphere, layout.collider_extents[rows_c], layout.actor_extents[rows_a]
+            ),
+        )
+        hit = np.nonzero(np.isfinite(times))[0]
+        if len(hit) == 0:
+            return []
+        times = times[hit]
+        rows_a = rows_a[hit]
+        rows_c = rows_c[hit]
+        actor_points = actor_starts[rows_a] + times[:, None] * actor_motions[rows_a]
+        collider_points = (
+            collider_starts[rows_c] + times[:, None] * collider_motions[rows_c]
+        )
+        # Normals point from the swept shape toward the sphere, reports use actor to collider
+        normals = np.where(actor_sphere[hit][:, None], -normals[hit], normals[hit])
+        return list(
+            zip(
+                rows_a.tolist(),
+                rows_c.tolist(),
+                times.tolist(),
+                map(tuple, actor_points.tolist()),
+                map(tuple, collider_points.tolist()),
+                normals,
+            )
+        )
+
+    def _find_overlaps(self, snapshot: Snapshot):
+        """
+        Test base actors against base colliders, retesting only pairs where one side
+        moved since the last solve. Pairs of sleeping bodies keep their last result.
+
+        Returns:
+        tuple: Index arrays (actor_indices, collider_indices) of overlapping pairs.
+        """
+        if self.traverser is not None:
+            # The traverser tests every pair natively, sleeping saves nothing there
+            self._resting = None
+            return self._find_traverser_overlaps(snapshot)
+        resting = self._resting
+        if resting is None or not resting.matches(snapshot):
+            actor_indices, collider_indices = self._find_all_overlaps(snapshot)
+        else:
+            actor_awake = np.any(
+                snapshot.actor_positions != resting.actor_positions, axis=1
+            )
+            collider_awake = np.any(
+                snapshot.collider_positions != resting.collider_positions, axis=1
+            )
+            actor_indices = resting.actor_indices
+            collider_indices = resting.collider_indices
+            if actor_awake.any() or collider_awake.any():
+                asleep = ~actor_awake[actor_indices] & ~collider_awake[collider_indices]
+                awake_actor_indices, awake_collider_indices = self._find_awake_overlaps(
+                    snapshot, actor_awake, collider_awake
+                )
+                actor_indices = np.concatenate(
+                    (actor_indices[asleep], awake_actor_indices)
+                )
+                collider_indices = np.concatenate(
+                    (collider_indices[asleep], awake_collider_indices)
+                )
+        self._resting = RestingState(snapshot, actor_indices, collider_indices)
+        return actor_indices, collider_indices
+
+    def _find_all_overlaps(self, snapshot: Snapshot):
+        """
+        Test every base actor against every base collider in one vectorized pass.
+        """
+        grid = self.grid
+        if grid is not None:
+            return self._find_overlaps_grid(snapshot, grid)
+        layout = snapshot.layout
+        if layout.filtered or snapshot.enabled_layers != ALL_LAYERS:
+            # Prune by layer first, then only measure the surviving pairs
+            actor_indices, collider_indices = allowed_pairs(
+                layout, snapshot.enabled_layers
+            )
+            return self._measure_pairs(snapshot, actor_indices, collider_indices)
+        delta = (
+            snapshot.actor_positions[:, None, :]
+            - snapshot.collider_positions[None, :, :]
+        )
+        distance_sq = np.einsum("acd,acd->ac", delta, delta)
+        reach = layout.actor_radii[:, None] + layout.collider_radii[None, :]
+        return np.nonzero(distance_sq <= reach * reach)
+
+    def _find_traverser_overlaps(self, snapshot: Snapshot):
+        """
+        One CollisionTraverser pass over the mirrored bounding spheres.
+        """
+        layout = snapshot.layout
+        actor_indices, collider_indices = self.traverser.overlaps(snapshot)
+        if layout.filtered or snapshot.enabled_layers != ALL_LAYERS:
+            keep = filter_pairs(
+                layout, snapshot.enabled_layers, actor_indices, collider_indices
+            )
+            actor_indices = actor_indices[keep]
+            collider_indices = collider_indices[keep]
+        return actor_indices, collider_indices
+
+    def _find_overlaps_grid(self, snapshot: Snapshot, grid: UniformGrid):
+        """
+        Only test pairs that share a cell of the uniform grid.
+        """
+        return self._measure_grid_pairs(snapshot, grid.candidate_pairs())
+
+    def _refresh_grid(self, snapshot: Snapshot, grid: UniformGrid):
+        layout = snapshot.layout
+        self._apply_grid_ops(grid)
+        grid.refresh(
+            "actor", layout.base_actors, snapshot.actor_positions, layout.actor_radii
+        )
+        grid.refresh(
+            "collider",
+            layout.base_colliders,
+            snapshot.collider_positions,
+            layout.collider_radii,
+        )
+
+    def _find_awake_overlaps(self, snapshot: Snapshot, actor_awake, collider_awake):
+        """
+        Test only the pairs with at least one awake (moved) side.
+        """
+        layout = snapshot.layout
+        grid = self.grid
+        if grid is not None:
+            pairs = grid.candidate_pairs_for(
+                [layout.base_actors[row] for row in np.nonzero(actor_awake)[0]],
+                [layout.base_colliders[row] for row in np.nonzero(collider_awake)[0]],
+            )
+            return self._measure_grid_pairs(snapshot, pairs)
+
+        # Awake actors against every collider, sleeping actors against awake colliders
+        awake_actors = np.nonzero(actor_awake)[0]
+        asleep_actors = np.nonzero(~actor_awake)[0]
+        awake_colliders = np.nonzero(collider_awake)[0]
+        collider_count = len(layout.base_colliders)
+        actor_indices = np.concatenate(
+            (
+                np.repeat(awake_actors, collider_count),
+                np.repeat(asleep_actors, len(awake_colliders)),
+            )
+        )
+        collider_indices = np.concatenate(
+            (
+                np.tile(np.arange(collider_count), len(awake_actors)),
+                np.tile(awake_colliders, len(asleep_actors)),
+            )
+        )
+        if layout.filtered or snapshot.enabled_layers != ALL_LAYERS:
+            keep = filter_pairs(
+                layout, snapshot.enabled_layers, actor_indices, collider_indices
+            )
+            actor_indices = actor_indices[keep]
+            collider_indices = collider_indices[keep]
+        return self._measure_pairs(snapshot, actor_indices, collider_indices)
+
+    def _measure_grid_pairs(self, snapshot: Snapshot, candidates: set):
+        """
+        Turn grid candidate pairs into row indices, filter them by layer and measure them.
+        """
+        layout = snapshot.layout
+        # Bodies removed after this layout was frozen may still sit in the grid
+        pairs = [
+            (actor, collider)
+            for actor, collider in candidates
+            if actor in layout.actor_rows and collider in layout.collider_rows
+        ]
+        if not pairs:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty
+        actor_rows = layout.actor_rows
+        collider_rows = layout.collider_rows
+        actor_indices = np.fromiter(
+            (actor_rows[actor] for actor, _ in pairs), dtype=np.int64, count=len(pairs)
+        )
+        collider_indices = np.fromiter(
+            (collider_rows[collider] for _, collider in pairs),
+            dtype=np.int64,
+            count=len(pairs),
+        )
+        if layout.filtered or snapshot.enabled_layers != ALL_LAYERS:
+            keep = filter_pairs(
+                layout, snapshot.enabled_layers, actor_indices, collider_indices
+            )
+            actor_indices = actor_indices[keep]
+            collider_indices = collider_indices[keep]
+        return self._measure_pairs(snapshot, actor_indices, collider_indices)
+
+    def _measure_pairs(self, snapshot: Snapshot, actor_indices, collider_indices):
+        """
+        Sphere test for an explicit list of candidate pairs.
+        """
+        layout = snapshot.layout
+        delta = (
+            snapshot.actor_positions[actor_indices]
+            - snapshot.collider_positions[collider_indices]
+        )
+        distance_sq = np.einsum("pd,pd->p", delta, delta)
+        reach = (
+            layout.actor_radii[actor_indices] + layout.collider_radii[collider_indices]
+        )
+        hits = distance_sq <= reach * reach
+        return actor_indices[hits], collider_indices[hits]
+
+    def _solve_complex(self, snapshot: Snapshot) -> list:
+        """
+        Refit every complex body's BVH and test actor/collider pairs tree against tree.
+        """
+        layout = snapshot.layout
+        moved = {
+            body
+            for body, matrix in zip(
+                layout.complex_actors + layout.complex_colliders,
+                snapshot.complex_matrices,
+            )
+            if body.refit(matrix)
+        }
+        previous = self._complex_resting
+        resting = {}
+        directions = {}
+        hits = []
+        for pair in self._complex_pairs(snapshot):
+            actor, collider = pair
+            if pair in previous and actor not in moved and collider not in moved:
+                # Neither mesh moved, the last result still holds
+                hit = previous[pair]
+                resting[pair] = hit
+                if pair in self._gjk_directions:
+                    directions[pair] = self._gjk_directions[pair]
+                if hit is not None:
+                    hits.append(hit)
+                continue
+            resting[pair] = None
+            if actor.hulls is not None and collider.hulls is not None:
+                hit = self._collide_convex(
+                    actor, collider, actor._matrix, collider._matrix, directions
+                )
+                resting[pair] = hit
+                if hit is not None:
+                    hits.append(hit)
+                continue
+            candidates = actor.bvh.overlapping_triangle_pairs(collider.bvh)
+            pairs = intersecting_triangle_pairs(
+                actor.bvh.triangles, collider.bvh.triangles, pairs=candidates
+            )
+            if len(pairs) == 0:
+                continue
+            intersection_points = triangle_intersection_points(
+                actor.bvh.triangles, collider.bvh.triangles, pairs
+            )
+            hit = (actor, collider, intersection_points, None)
+            resting[pair] = hit
+            hits.append(hit)
+        self._complex_resting = resting
+        self._gjk_directions = directions
+        return hits
+
+    def _complex_pairs(self, snapshot: Snapshot) -> list:
+        """
+        Complex actor/collider pairs that pass the layer filter, like base pairs.
+        """
+        layout = snapshot.layout
+        actor_rows, collider_rows = allowed_pairs(
+            layout.complex_layers, snapshot.enabled_layers
+        )
+        return [
+            (layout.complex_actors[actor_row], layout.complex_colliders[collider_row])
+            for actor_row, collider_row in zip(
+                actor_rows.tolist(), collider_rows.tolist()
+            )
+        ]
+
+    def _collide_convex(
+        self, actor, collider, actor_matrix, collider_matrix, directions
+    ):
+        """
+        GJK/EPA for a pair of convex bodies or compounds, every piece against every
+        piece, each warm started from its last direction.
+
+        Returns:
+        tuple: (actor, collider, intersection_points, deepest contact) or None.
+        """
+        identity = np.identity(4)
+        actor_matrix = identity if actor_matrix is None else actor_matrix
+        collider_matrix = identity if collider_matrix is None else collider_matrix
+        pair = (actor, collider)
+        previous = self._gjk_directions.get(pair)
+        pair_directions = []
+        contacts = []
+        for actor_hull in actor.hulls:
+            for collider_hull in collider.hulls:
+                contact, direction = collide(
+                    actor_hull,
+                    actor_matrix,
+                    collider_hull,
+                    collider_matrix,
+                    None if previous is None else previous[len(pair_directions)],
+                )
+                pair_directions.append(direction)
+                if contact is not None:
+                    contacts.append(contact)
+        directions[pair] = pair_directions
+        if not contacts:
+            return None
+        deepest = max(contacts, key=lambda contact: contact.depth)
+        points = [
+            point
+            for contact in contacts
+            for point in (contact.point_a, contact.point_b)
+        ]
+        return actor, collider, np.array(points), deepest
+
+    def _solve_complex_pooled(self, snapshot: Snapshot, pool: NarrowPhasePool) -> list:
+        """
+        Collect the pool's last finished tick and, if it is idle, hand it this one.
+        While a tick is still in flight its previous hits are reported again.
+        """
+        layout = snapshot.layout
+        allowed = self._complex_pairs(snapshot)
+        if not pool.busy():
+            pool.collect()
+            matrices = dict(
+                zip(
+                    layout.complex_actors + layout.complex_colliders,
+                    snapshot.complex_matrices,
+                )
+            )
+            identity = np.identity(4)
+            pairs = []
+            convex_hits = []
+            directions = {}
+            for actor, collider in allowed:
+                actor_matrix = matrices[actor]
+                collider_matrix = matrices[collider]
+                if actor.hulls is not None and collider.hulls is not None:
+                    # A few microseconds each, not worth a round trip to a worker
+                    hit = self._collide_convex(
+                        actor, collider, actor_matrix, collider_matrix, directions
+                    )
+                    if hit is not None:
+                        convex_hits.append(hit)
+                    continue
+                pairs.append(
+                    (
+                        actor,
+                        collider,
+                        identity if actor_matrix is None else actor_matrix,
+                        identity if collider_matrix is None else collider_matrix,
+                    )
+                )
+            pool.submit(pairs)
+            self._gjk_directions = directions
+            self._convex_hits = convex_hits
+        # Drops hits of removed bodies and of pairs filtered out since the submit
+        allowed = set(allowed)
+        return [hit for hit in pool.hits + self._convex_hits if hit[:2] in allowed]
+
+    def _apply(self, result: SolveResult):
+        """
+        Turn a solve result into contacts, reports and events. Main thread only.
+        """
+        layout = result.layout
+        contacts = self.contacts
+        contacts.begin()
+        keys = (layout.actor_ids[result.actor_indices] << 32) | layout.collider_ids[
+            result.collider_indices
+        ]
+        for key, actor_index, collider_index in zip(
+            keys.tolist(),
+            result.actor_indices.tolist(),
+            result.collider_indices.tolist(),
+        ):
+            actor = layout.base_actors[actor_index]
+            collider = layout.base_colliders[collider_index]
+            contacts.touch(key, actor, collider, actor.position, collider.position)
+        for (
+            actor_index,
+            collider_index,
+            time_of_impact,
+            actor_position,
+            collider_position,
+            normal,
+        ) in result.swept_hits:
+            actor = layout.base_actors[actor_index]
+            collider = layout.base_colliders[collider_index]
+            contacts.touch(
+                ContactStore.key(actor.id, collider.id),
+                actor,
+                collider,
+                actor_position,
+                collider_position,
+                normal,
+                0.0,
+                time_of_impact,
+            )
+        for actor, collider, intersection_points, contact in result.complex_hits:
+            if contact is None:
+                contacts.touch(
+                    ContactStore.key(actor.id, collider.id),
+                    actor,
+                    collider,
+                    intersection_points,
+                    intersection_points,
+                )
+            else:
+                contacts.touch(
+                    ContactStore.key(actor.id, collider.id),
+                    actor,
+                    collider,
+                    contact.point_a,
+                    contact.point_b,
+                    contact.normal,
+                    contact.depth,
+                )
+        contacts.end()
+
+        self.reportedCollisions[:] = contacts.reports.values()
+        if self.listeners:
+            self._dispatch_events()
+        contacts.release()
+
     def update(self):
-        del self.reportedCollisions[:]
-        for actor in self.base_actors:
-            actor.collision_report = None
-        for collider in self.base_colliders:
-            collider.collision_report = None
-
-        if len(self.base_actors) == 0 and len(self.complex_actors) == 0:
-            pass
-        if len(self.base_colliders) != 0:
-            collider: BaseCollider
-            for collider in self.base_colliders:
-                if collider.nodePath is not None:
-                    collider.position = collider.nodePath.getPos(base.render)  # type: ignore
-                    collider.sphere.setPos(collider.position)
-                actor: BaseActor
-                for actor in self.base_actors:
-                    if actor.nodePath is not None:
-                        actor.position = actor.nodePath.getPos(base.render)  # type: ignore
-                        actor.sphere.setPos(actor.position)
-                    for positionIndex in range(len(actor.position)):
-                        if (
-                            getTotalDistance(actor, collider)
-                            <= actor.radius + collider.radius
-                        ):
-                            colReport = CollisionReport(
-                                actor,
-                                collider,
-                                actor.position,
-                                collider.position,
-                            )
-                            self.reportedCollisions.append(colReport)
-                            if actor.collision_report is None:
-                                actor.collision_report = [colReport]
-                            else:
-                                actor.collision_report += [colReport]
-                            if collider.collision_report is None:
-                                collider.collision_report = [colReport]
-                            else:
-                                collider.collision_report += [colReport]
-        if len(self.complex_colliders) != 0:
-            for actor in self.complex_actors:
-                for collider in self.complex_colliders:
-                    if do_meshes_intersect(actor.array, collider.array):
-                        intersection_points = compute_intersection_points(
-                            actor.array, collider.array
-                        )
-                        print(intersection_points)
-                        self.reportedCollisions.append(
-                            CollisionReport(
-                                actor,
-                                collider,
-                                intersection_points,
-                                intersection_points,
-                            )
-                        )
-                        actor.collision_report = CollisionReport(
-                            actor,
-                            collider,
-                            intersection_points,
-                            intersection_points,
-                        )
-                        collider.collision_report = CollisionReport(
-                            collider,
-                            actor,
-                            intersection_points,
-                            intersection_points,
-                        )
+        self._apply(self._solve(self.publish_snapshot()))
 
     def execute(self, frame_rate=60):
-        while True:
+        """
+        Run update() on this thread at a fixed rate until stop() is called.
+        """
+        self.clock = FixedStepClock(frame_rate)
+        self._stop_event.clear()
+        while self.clock.wait(self._stop_event):
             self.update()
-            sleep(1 / frame_rate)
 
-    def start(self, frame_rate=60, threaded=True):
-        if threaded:
-            from threading import Thread
+    def _run_solver(self, frame_rate):
+        self.clock = FixedStepClock(frame_rate)
+        last_frame = None
+        while self.clock.wait(self._stop_event):
+            snapshot = self._snapshots.acquire()
+            if snapshot is None or snapshot.frame == last_frame:
+                continue
+            last_frame = snapshot.frame
+            self._results.post(self._solve(snapshot))
+
+    def _publish_task(self, task):
+        self.publish_snapshot()
+        return task.cont
+
+    def _apply_task(self, task):
+        result = self._results.take()
+        if result is not None:
+            self._apply(result)
+        return task.cont
 
-            thread = Thread(target=self.execute, args=(frame_rate,))
-            thread.start()
-            return thread
-        else:
+    def start(self, frame_rate=60, threaded=True):
+        """
+        Run collision detection continuously.
+
+        Parameters:
+        frame_rate (float): Collision ticks per second.
+        threaded (bool): Solve on a background thread. Two tasks on base.taskMgr
+            publish transform snapshots after the game logic and apply results before
+            it, so the scene graph is only ever touched from the main thread.
+            Without threading, update() runs on the calling thread and blocks.
+        """
+        if not threaded:
             self.execute(frame_rate)
+            return None
+        self.stop()
+        self.threaded = True
+        self._stop_event.clear()
+        self._results.clear()
+        taskMgr = base.taskMgr  # type: ignore
+        taskMgr.add(self._apply_task, "NodeIntersection-apply", sort=-10)
+        taskMgr.add(self._publish_task, "NodeIntersection-publish", sort=49)
+        self._thread = Thread(
+            target=self._run_solver,
+            args=(frame_rate,),
+            name="NodeIntersection",
+            daemon=True,
+        )
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        """
+        Stop a loop started with start().
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.threaded:
+            base.taskMgr.remove("NodeIntersection-apply")  # type: ignore
+            base.taskMgr.remove("NodeIntersection-publish")  # type: ignore
+            self.threaded = False
 
 
 Mgr = Mgr()
@@ -0,0 +1,253 @@
+# Broadphase acceleration structures used by the NodeIntersection manager.
+# The uniform grid buckets base actors and colliders into cubic cells so that
+# only bodies sharing a cell are handed to the vectorized sphere test.
+#
+
+from math import floor, inf
+import numpy as np
+
+
+class UniformGrid:
+    """
+    Spatial hash of base actors and colliders bucketed into cubic cells.
+    """
+
+    KINDS = ("actor", "collider")
+
+    def __init__(self, cell_size: float = 2.0):
+        if cell_size <= 0:
+            raise ValueError("cell_size must be positive")
+        self.cell_size: float = float(cell_size)
+        # cell (ix, iy, iz) -> set of bodies overlapping that cell
+        self.cells: dict = {kind: {} for kind in self.KINDS}
+        # body -> (lo, hi) inclusive cell range it is currently stored under
+        self.ranges: dict = {kind: {} for kind in self.KINDS}
+        # Last cell ranges per array row, used to skip bodies that stayed put
+        self._rows: dict = {
+            kind: np.zeros((0, 6), dtype=np.int64) for kind in self.KINDS
+        }
+        # Inclusive cell range that has ever held a body, bounds ray walks
+        self.bounds: tuple = None
+
+    def cell_ranges(self, positions: np.ndarray, radii: np.ndarray) -> np.ndarray:
+        """
+        Compute the inclusive cell range covered by each sphere.
+
+        Returns:
+        numpy.ndarray: Array of shape (n, 6) holding (lo_x, lo_y, lo_z, hi_x, hi_y, hi_z).
+        """
+        radii = radii[:, None]
+        lo = np.floor((positions - radii) / self.cell_size)
+        hi = np.floor((positions + radii) / self.cell_size)
+        return np.hstack((lo, hi)).astype(np.int64)
+
+    def insert(self, kind: str, body, position, radius: float):
+        """
+        Insert a body into every cell its bounding sphere touches.
+        """
+        cell_range = self.cell_ranges(
+            np.asarray(position, dtype=np.float64).reshape(1, 3),
+            np.array([radius], dtype=np.float64),
+        )[0].tolist()
+        self._store(kind, body, tuple(cell_range[:3]), tuple(cell_range[3:]))
+
+    def remove(self, kind: str, body):
+        """
+        Remove a body from the grid. Unknown bodies are ignored.
+        """
+        cell_range = self.ranges[kind].pop(body, None)
+        if cell_range is None:
+            return
+        cells = self.cells[kind]
+        for cell in self._iter_cells(*cell_range):
+            bucket = cells.get(cell)
+            if bucket is not None:
+                bucket.discard(body)
+                if not bucket:
+                    del cells[cell]
+
+    def move(self, kind: str, body, lo: tuple, hi: tuple):
+        """
+        Re-bucket a body whose cell range changed.
+        """
+        if self.ranges[kind].get(body) == (lo, hi):
+            return
+        self.remove(kind, body)
+        self._store(kind, body, lo, hi)
+
+    def clear(self):
+        for kind in self.KINDS:
+            self.cells[kind].clear()
+            self.ranges[kind].clear()
+        self.bounds = None
+        self.invalidate()
+
+    def invalidate(self):
+        """
+        Forget the per-row cache, forcing the next refresh to compare every body.
+        """
+        for kind in self.KINDS:
+            self._rows[kind] = np.zeros((0, 6), dtype=np.int64)
+
+    def refresh(
+        self, kind: str, bodies: list, positions: np.ndarray, radii: np.ndarray
+    ):
+        """
+        Incrementally update the grid from this frame's position snapshot.
+        Only bodies whose cell range changed since the last refresh are touched.
+        """
+        rows = self.cell_ranges(positions, radii)
+        previous = self._rows[kind]
+        if previous.shape == rows.shape:
+            changed = np.nonzero(np.any(rows != previous, axis=1))[0]
+        else:
+            changed = np.arange(len(bodies))
+        for index in changed.tolist():
+            row = rows[index].tolist()
+            self.move(kind, bodies[index], tuple(row[:3]), tuple(row[3:]))
+        self._rows[kind] = rows
+
+    def candidate_pairs(self) -> set:
+        """
+        Collect every (actor, collider) pair that shares at least one cell.
+        """
+        pairs = set()
+        collider_cells = self.cells["collider"]
+        for cell, actors in self.cells["actor"].items():
+            colliders = collider_cells.get(cell)
+            if not colliders:
+                continue
+            for actor in actors:
+                for collider in colliders:
+                    pairs.add((actor, collider))
+        return pairs
+
+    def candidate_pairs_for(self, actors, colliders) -> set:
+        """
+        Collect the pairs that share a cell and involve one of the given bodies.
+        Cost depends on how many bodies are given, not on how many are stored.
+        """
+        pairs = set()
+        for kind, bodies, others in (
+            ("actor", actors, self.cells["collider"]),
+            ("collider", colliders, self.cells["actor"]),
+        ):
+            ranges = self.ranges[kind]
+            for body in bodies:
+                cell_range = ranges.get(body)
+                if cell_range is None:
+                    continue
+                for cell in self._iter_cells(*cell_range):
+                    bucket = others.get(cell)
+                    if not bucket:
+                        continue
+                    if kind == "actor":
+                        pairs.update((body, other) for other in bucket)
+                    else:
+                        pairs.update((other, body) for other in bucket)
+        return pairs
+
+    def bodies_along(self, origin, direction, max_dist: float, pad: int = 0) -> tuple:
+        """
+        Walk the cells a ray crosses (3D DDA) and collect the bodies stored in them.
+
+        Parameters:
+        origin (tuple): Ray origin.
+        direction (tuple): Unit ray direction.
+        max_dist (float): Length of the ray, may be inf.
+        pad (int): Also visit cells this many steps around each crossed cell,
+            for casts with a thickness.
+
+        Returns:
+        tuple: Sets of (actors, colliders) that may be hit.
+        """
+        actors, colliders = set(), set()
+        if self.bounds is None:
+            return actors, colliders
+        size = self.cell_size
+        lo, hi = self.bounds
+        # Clip the ray to the occupied region, anything outside it is empty
+        enter, leave = 0.0, max_dist
+        for axis in range(3):
+            low = (lo[axis] - pad) * size
+            high = (hi[axis] + pad + 1) * size
+            if direction[axis] == 0:
+                if not low <= origin[axis] <= high:
+                    return actors, colliders
+                continue
+            near = (low - origin[axis]) / direction[axis]
+            far = (high - origin[axis]) / direction[axis]
+            if near > far:
+                near, far = far, near
+            enter = max(enter, near)
+            leave = min(leave, far)
+        if enter > leave:
+            return actors, colliders
+
+        cell = [0, 0, 0]
+        step = [0, 0, 0]
+        next_t = [inf, inf, inf]
+        delta_t = [inf, inf, inf]
+        for axis in range(3):
+            position = origin[axis] + direction[axis] * enter
+            cell[axis] = min(
+                max(floor(position / size), lo[axis] - pad), hi[axis] + pad
+            )
+            if direction[axis] > 0:
+                step[axis] = 1
+                next_t[axis] = ((cell[axis] + 1) * size - origin[axis]) / direction[
+                    axis
+                ]
+                delta_t[axis] = size / direction[axis]
+            elif direction[axis] < 0:
+                step[axis] = -1
+                next_t[axis] = (cell[axis] * size - origin[axis]) / direction[axis]
+                delta_t[axis] = -size / direction[axis]
+
+        actor_cells = self.cells["actor"]
+        collider_cells = self.cells["collider"]
+        seen = set()
+        while True:
+            x, y, z = cell
+            for visit in self._iter_cells(
+                (x - pad, y - pad, z - pad), (x + pad, y + pad, z + pad)
+            ):
+                if visit in seen:
+                    continue
+                seen.add(visit)
+                bucket = actor_cells.get(visit)
+                if bucket:
+                    actors.update(bucket)
+                bucket = collider_cells.get(visit)
+                if bucket:
+                    colliders.update(bucket)
+            axis = next_t.index(min(next_t))
+            if next_t[axis] > leave:
+                return actors, colliders
+            cell[axis] += step[axis]
+            next_t[axis] += delta_t[axis]
+
+    def _store(self, kind: str, body, lo: tuple, hi: tuple):
+        if self.bounds is None:
+            self.bounds = (lo, hi)
+        else:
+            bounds_lo, bounds_hi = self.bounds
+            self.bounds = (
+                tuple(map(min, bounds_lo, lo)),
+                tuple(map(max, bounds_hi, hi)),
+            )
+        cells = self.cells[kind]
+        for cell in self._iter_cells(lo, hi):
+            bucket = cells.get(cell)
+            if bucket is None:
+                cells[cell] = {body}
+            else:
+                bucket.add(body)
+        self.ranges[kind][body] = (lo, hi)
+
+    @staticmethod
+    def _iter_cells(lo: tuple, hi: tuple):
+        for x in range(lo[0], hi[0] + 1):
+            for y in range(lo[1], hi[1] + 1):
+                for z in range(lo[2], hi[2] + 1):
+                    yield (x, y, z)
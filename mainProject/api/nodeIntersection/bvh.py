@@ -0,0 +1,288 @@
+# Bounding volume hierarchy over the triangles of a complex actor or collider.
+# The tree is built once in the mesh's local space and stored as flat numpy
+# arrays. When the mesh moves only the boxes are refit, the topology is kept.
+#
+
+from copy import copy
+import numpy as np
+
+
+class MeshBVH:
+    """
+    Axis aligned bounding box tree over an indexed triangle mesh.
+    """
+
+    # Arrays that define the tree, everything else is derived from them
+    ARRAYS = (
+        "indices",
+        "triangle_order",
+        "node_left",
+        "node_right",
+        "node_start",
+        "node_count",
+        "node_depth",
+    )
+
+    def __init__(self, vertices: np.ndarray, indices: np.ndarray, leaf_size: int = 4):
+        """
+        Build the tree.
+
+        Parameters:
+        vertices (numpy.ndarray): Vertex positions of shape (n, 3).
+        indices (numpy.ndarray): Triangle indices of shape (t, 3).
+        leaf_size (int): Maximum number of triangles stored in a leaf.
+        """
+        vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1, 3)
+        self.leaf_size: int = max(1, int(leaf_size))
+
+        order, nodes = self._build(vertices[indices].mean(axis=1))
+        # Triangles are stored in leaf order so every leaf owns a contiguous range
+        self.indices: np.ndarray = indices[order]
+        self.triangle_order: np.ndarray = order
+
+        left, right, start, count, depth = (np.array(column) for column in zip(*nodes))
+        self.node_left: np.ndarray = left.astype(np.int64)
+        self.node_right: np.ndarray = right.astype(np.int64)
+        self.node_start: np.ndarray = start.astype(np.int64)
+        self.node_count: np.ndarray = count.astype(np.int64)
+        self.node_depth: np.ndarray = depth.astype(np.int64)
+        self._prepare(vertices)
+
+    def to_arrays(self) -> dict:
+        """
+        The tree's topology as named arrays, e.g. to store it on disk.
+        """
+        arrays = {name: getattr(self, name) for name in self.ARRAYS}
+        arrays["leaf_size"] = np.array(self.leaf_size)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: dict, vertices: np.ndarray) -> "MeshBVH":
+        """
+        Restore a tree stored with to_arrays() without building it again.
+        The topology arrays are used as given, so read-only memory maps are fine.
+
+        Parameters:
+        arrays (dict): Arrays returned by to_arrays().
+        vertices (numpy.ndarray): Vertex positions the tree was built over.
+        """
+        bvh = cls.__new__(cls)
+        bvh.leaf_size = int(arrays["leaf_size"])
+        for name in cls.ARRAYS:
+            setattr(bvh, name, arrays[name])
+        bvh._prepare(vertices)
+        return bvh
+
+    def _prepare(self, vertices: np.ndarray):
+        """
+        Derive the refit order from the topology and fit the boxes to vertices.
+        """
+        self.node_min: np.ndarray = np.zeros((len(self.node_left), 3))
+        self.node_max: np.ndarray = np.zeros((len(self.node_left), 3))
+
+        is_leaf = self.node_left < 0
+        self._leaves: np.ndarray = np.nonzero(is_leaf)[0]
+        leaf_order = np.argsort(self.node_start[self._leaves])
+        self._leaves = self._leaves[leaf_order]
+        # Internal nodes grouped by depth, deepest first, for bottom-up refits
+        internal = np.nonzero(~is_leaf)[0]
+        self._levels: list = [
+            internal[self.node_depth[internal] == level]
+            for level in range(int(self.node_depth.max(initial=0)), -1, -1)
+        ]
+        self._levels = [level for level in self._levels if len(level)]
+
+        self.triangles: np.ndarray = np.zeros((len(self.indices), 3, 3))
+        self.refit(vertices)
+
+    def __len__(self):
+        return len(self.node_left)
+
+    def _build(self, centroids: np.ndarray):
+        """
+        Top-down median split along the longest axis of the centroid bounds.
+
+        Returns:
+        tuple: Triangle permutation and a list of (left, right, start, count, depth) rows.
+        """
+        order = np.arange(len(centroids))
+        nodes = [[-1, -1, 0, len(centroids), 0]]
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            _, _, start, count, depth = nodes[node]
+            if count <= self.leaf_size:
+                continue
+            members = order[start : start + count]
+            points = centroids[members]
+            axis = int(np.argmax(points.max(axis=0) - points.min(axis=0)))
+            half = count // 2
+            split = np.argpartition(points[:, axis], half)
+            order[start : start + count] = members[split]
+
+            nodes.append([-1, -1, start, half, depth + 1])
+            nodes.append([-1, -1, start + half, count - half, depth + 1])
+            nodes[node][0] = len(nodes) - 2
+            nodes[node][1] = len(nodes) - 1
+            stack.extend((len(nodes) - 2, len(nodes) - 1))
+        return order, nodes
+
+    def refit(self, vertices: np.ndarray):
+        """
+        Recompute every box from new vertex positions without rebuilding the tree.
+
+        Parameters:
+        vertices (numpy.ndarray): Vertex positions of shape (n, 3), same order as at build time.
+        """
+        self.triangles = np.asarray(vertices, dtype=np.float64)[self.indices]
+        if len(self.triangles) == 0:
+            return
+        triangle_min = self.triangles.min(axis=1)
+        triangle_max = self.triangles.max(axis=1)
+
+        leaves = self._leaves
+        starts = self.node_start[leaves]
+        self.node_min[leaves] = np.minimum.reduceat(triangle_min, starts, axis=0)
+        self.node_max[leaves] = np.maximum.reduceat(triangle_max, starts, axis=0)
+        for level in self._levels:
+            left = self.node_left[level]
+            right = self.node_right[level]
+            self.node_min[level] = np.minimum(self.node_min[left], self.node_min[right])
+            self.node_max[level] = np.maximum(self.node_max[left], self.node_max[right])
+
+    def refitted(self, vertices: np.ndarray) -> "MeshBVH":
+        """
+        A copy sharing this tree's topology with its own boxes fit to other vertices.
+        This tree is left untouched, so another thread may keep refitting it.
+        """
+        bvh = copy(self)
+        bvh.node_min = np.zeros_like(self.node_min)
+        bvh.node_max = np.zeros_like(self.node_max)
+        bvh.refit(vertices)
+        return bvh
+
+    def overlapping_triangle_pairs(self, other: "MeshBVH") -> np.ndarray:
+        """
+        Traverse two trees together and collect the triangle pairs whose leaf boxes overlap.
+
+        Returns:
+        numpy.ndarray: Array of shape (p, 2) indexing self.triangles and other.triangles.
+        """
+        if len(self.triangles) == 0 or len(other.triangles) == 0:
+            return np.zeros((0, 2), dtype=np.int64)
+
+        nodes_a = np.zeros(1, dtype=np.int64)
+        nodes_b = np.zeros(1, dtype=np.int64)
+        leaf_pairs = []
+        while len(nodes_a):
+            overlap = np.all(
+                (self.node_min[nodes_a] <= other.node_max[nodes_b])
+                & (other.node_min[nodes_b] <= self.node_max[nodes_a]),
+                axis=1,
+            )
+            nodes_a = nodes_a[overlap]
+            nodes_b = nodes_b[overlap]
+
+            leaf_a = self.node_left[nodes_a] < 0
+            leaf_b = other.node_left[nodes_b] < 0
+            both = leaf_a & leaf_b
+            leaf_pairs.append((nodes_a[both], nodes_b[both]))
+
+            # Descend into the larger box unless it is already a leaf
+            size_a = np.prod(self.node_max[nodes_a] - self.node_min[nodes_a], axis=1)
+            size_b = np.prod(other.node_max[nodes_b] - other.node_min[nodes_b], axis=1)
+            split_a = ~both & ~leaf_a & (leaf_b | (size_a >= size_b))
+            split_b = ~both & ~split_a
+
+            nodes_a = np.concatenate(
+                (
+                    self.node_left[nodes_a[split_a]],
+                    self.node_right[nodes_a[split_a]],
+                    nodes_a[split_b],
+                    nodes_a[split_b],
+                )
+            )
+            nodes_b = np.concatenate(
+                (
+                    nodes_b[split_a],
+                    nodes_b[split_a],
+                    other.node_left[nodes_b[split_b]],
+                    other.node_right[nodes_b[split_b]],
+                )
+            )
+
+        leaves_a = np.concatenate([pair[0] for pair in leaf_pairs])
+        leaves_b = np.concatenate([pair[1] for pair in leaf_pairs])
+        return _expand_leaf_pairs(
+            self.node_start[leaves_a],
+            self.node_count[leaves_a],
+            other.node_start[leaves_b],
+            other.node_count[leaves_b],
+        )
+
+    def ray_candidates(
+        self, origins, directions, max_dist, inflate: float = 0.0
+    ) -> np.ndarray:
+        """
+        Walk the tree with a batch of rays and collect the triangles of every leaf they cross.
+
+        Parameters:
+        origins (numpy.ndarray): Ray origins of shape (n, 3).
+        directions (numpy.ndarray): Unit ray directions of shape (n, 3).
+        max_dist (numpy.ndarray): Maximum distance per ray, shape (n,).
+        inflate (float): Grow every box by this much, e.g. the radius of a swept sphere.
+
+        Returns:
+        numpy.ndarray: Array of shape (p, 2) holding (ray index, triangle index).
+        """
+        if len(self.triangles) == 0 or len(origins) == 0:
+            return np.zeros((0, 2), dtype=np.int64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            inverse = 1.0 / directions
+
+        rays = np.arange(len(origins))
+        nodes = np.zeros(len(origins), dtype=np.int64)
+        leaf_pairs = []
+        while len(rays):
+            with np.errstate(invalid="ignore"):
+                near = (self.node_min[nodes] - inflate - origins[rays]) * inverse[rays]
+                far = (self.node_max[nodes] + inflate - origins[rays]) * inverse[rays]
+            # fmin/fmax skip the NaN of a ray lying exactly in a slab plane
+            enter = np.fmax.reduce(np.fmin(near, far), axis=1)
+            leave = np.fmin.reduce(np.fmax(near, far), axis=1)
+            crossed = (leave >= np.maximum(enter, 0.0)) & (enter <= max_dist[rays])
+            rays = rays[crossed]
+            nodes = nodes[crossed]
+
+            leaf = self.node_left[nodes] < 0
+            leaf_pairs.append((rays[leaf], nodes[leaf]))
+            rays = np.tile(rays[~leaf], 2)
+            nodes = np.concatenate(
+                (self.node_left[nodes[~leaf]], self.node_right[nodes[~leaf]])
+            )
+
+        leaf_rays = np.concatenate([pair[0] for pair in leaf_pairs])
+        leaves = np.concatenate([pair[1] for pair in leaf_pairs])
+        counts = self.node_count[leaves]
+        total = int(counts.sum())
+        if total == 0:
+            return np.zeros((0, 2), dtype=np.int64)
+        offset = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        triangles = np.repeat(self.node_start[leaves], counts) + offset
+        return np.stack((np.repeat(leaf_rays, counts), triangles), axis=1)
+
+
+def _expand_leaf_pairs(start_a, count_a, start_b, count_b) -> np.ndarray:
+    """
+    Turn overlapping leaf pairs into every triangle pair they contain.
+    """
+    per_pair = count_a * count_b
+    total = int(per_pair.sum())
+    if total == 0:
+        return np.zeros((0, 2), dtype=np.int64)
+    pair = np.repeat(np.arange(len(per_pair)), per_pair)
+    offset = np.arange(total) - np.repeat(np.cumsum(per_pair) - per_pair, per_pair)
+    triangle_a = start_a[pair] + offset // count_b[pair]
+    triangle_b = start_b[pair] + offset % count_b[pair]
+    return np.stack((triangle_a, triangle_b), axis=1)
@@ -0,0 +1,202 @@
+# Collision data persisted next to the model it was built from.
+# A complex body loaded from a model file keeps its vertices, triangles, BVH
+# topology and convex hull in "<model>.<part>.collision". Later launches map
+# the arrays straight from that file with np.memmap instead of rebuilding them.
+# The file records the model's size, modification time and SHA-256, and is
+# rebuilt as soon as the model changes or the format version is bumped. It also
+# records a fingerprint of the loaded part as it is in memory, so parts changed
+# after loading (child nodes moved, scaled or removed) are rebuilt, not served
+# stale from the file.
+#
+# Layout: 8 byte magic, little endian uint64 header length, JSON header, then
+# every array's raw bytes at the 64 byte aligned offset the header lists.
+#
+
+import hashlib
+import json
+import os
+import re
+import struct
+import numpy as np
+from panda3d.core import ModelRoot, NodePath
+from .bvh import MeshBVH
+from .gjk import ConvexHullShape
+from .pandaToNumpy import mesh_fingerprint, panda_mesh_to_numpy
+
+CACHE_VERSION = 2
+_MAGIC = b"NICOLL\x00\x01"
+_ALIGN = 64
+
+
+def model_source(mesh) -> tuple:
+    """
+    Find the model file a NodePath was loaded from.
+
+    Returns:
+    tuple: (model path, path of the mesh below the model root), or (None, None)
+        for procedural meshes and models that do not come from a file on disk.
+    """
+    if not isinstance(mesh, NodePath) or mesh.is_empty():
+        return None, None
+    names = []
+    node = mesh
+    while not node.is_empty():
+        if node.node().is_of_type(ModelRoot.get_class_type()):
+            path = node.node().get_fullpath().to_os_specific()
+            if not path or not os.path.isfile(path):
+                return None, None
+            return path, "/".join(reversed(names))
+        names.append(node.get_name())
+        node = node.get_parent()
+    return None, None
+
+
+def cache_path(source: str, part: str) -> str:
+    if not part:
+        return f"{source}.collision"
+    return f"{source}.{re.sub(r'[^A-Za-z0-9_-]+', '_', part)}.collision"
+
+
+def _source_stamp(source: str, with_hash: bool) -> dict:
+    info = os.stat(source)
+    stamp = {"size": info.st_size, "mtime_ns": info.st_mtime_ns}
+    if with_hash:
+        digest = hashlib.sha256()
+        with open(source, "rb") as file:
+            for block in iter(lambda: file.read(1 << 20), b""):
+                digest.update(block)
+        stamp["sha256"] = digest.hexdigest()
+    return stamp
+
+
+def write(path: str, source: str, part: str, fingerprint: str, arrays: dict):
+    """
+    Store arrays for a model part. Written to a temporary file first and moved
+    into place, so readers never see a partial file.
+
+    Parameters:
+    fingerprint (str): mesh_fingerprint() of the part the arrays were built from.
+    """
+    # np.ascontiguousarray turns scalars into shape (1,), keep the original shapes
+    arrays = {
+        name: np.ascontiguousarray(array).reshape(np.shape(array))
+        for name, array in arrays.items()
+    }
+    table = {}
+    offset = 0
+    for name, array in arrays.items():
+        table[name] = [array.dtype.str, list(array.shape), offset]
+        offset += -(-array.nbytes // _ALIGN) * _ALIGN
+    header = json.dumps(
+        {
+            "version": CACHE_VERSION,
+            "part": part,
+            "mesh": fingerprint,
+            "source": _source_stamp(source, with_hash=True),
+            "arrays": table,
+        }
+    ).encode()
+    start = -(-(len(_MAGIC) + 8 + len(header)) // _ALIGN) * _ALIGN
+
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(_MAGIC + struct.pack("<Q", len(header)) + header)
+        for name, array in arrays.items():
+            file.seek(start + table[name][2])
+            file.write(array.tobytes())
+    os.replace(temporary, path)
+
+
+def read(path: str, source: str, part: str, fingerprint: str) -> dict:
+    """
+    Map the arrays stored for a model part.
+
+    Parameters:
+    fingerprint (str): mesh_fingerprint() of the part as it is now.
+
+    Returns:
+    dict: Read-only arrays by name, or None if the file is missing, was written
+        by another version or for another part, or the model or the loaded part
+        changed since.
+    """
+    try:
+        with open(path, "rb") as file:
+            if file.read(len(_MAGIC)) != _MAGIC:
+                return None
+            (length,) = struct.unpack("<Q", file.read(8))
+            header = json.loads(file.read(length))
+    except (OSError, ValueError, struct.error):
+        return None
+    if header.get("version") != CACHE_VERSION or header.get("part") != part:
+        return None
+    if header.get("mesh") != fingerprint:
+        return None
+
+    stored = header["source"]
+    current = _source_stamp(source, with_hash=False)
+    if current["size"] != stored["size"]:
+        return None
+    if current["mtime_ns"] != stored["mtime_ns"]:
+        # Copied or touched: only the content decides
+        if _source_stamp(source, with_hash=True)["sha256"] != stored["sha256"]:
+            return None
+
+    start = -(-(len(_MAGIC) + 8 + length) // _ALIGN) * _ALIGN
+    arrays = {}
+    for name, (dtype, shape, offset) in header["arrays"].items():
+        if int(np.prod(shape)) == 0:
+            # np.memmap refuses empty mappings
+            arrays[name] = np.zeros(shape, dtype=dtype)
+        else:
+            arrays[name] = np.memmap(
+                path, dtype=dtype, mode="r", offset=start + offset, shape=tuple(shape)
+            )
+    return arrays
+
+
+def load_mesh_data(mesh, convex: bool = False, cache: bool = True) -> tuple:
+    """
+    Vertices, triangles, BVH and (for convex bodies) convex hull of a complex body.
+
+    Meshes loaded from a model file are read from the collision file next to it,
+    or built and stored there if it is missing or stale. A part changed in memory
+    since loading is stale as well, its file is rebuilt for the changed part.
+
+    Parameters:
+    mesh (NodePath): The body's mesh.
+    convex (bool): Also return the convex hull.
+    cache (bool): Use the collision file next to the model.
+
+    Returns:
+    tuple: (vertices, indices, MeshBVH, ConvexHullShape or None).
+    """
+    source, part = model_source(mesh) if cache else (None, None)
+    if source is not None:
+        path = cache_path(source, part)
+        fingerprint = mesh_fingerprint(mesh)
+        arrays = read(path, source, part, fingerprint)
+        if arrays is not None:
+            vertices = arrays["vertices"]
+            hull = ConvexHullShape.from_vertices(arrays["hull"]) if convex else None
+            return (
+                vertices,
+                arrays["mesh_indices"],
+                MeshBVH.from_arrays(arrays, vertices),
+                hull,
+            )
+
+    vertices, indices = panda_mesh_to_numpy(mesh, with_indices=True)
+    bvh = MeshBVH(vertices, indices)
+    if source is None:
+        return vertices, indices, bvh, ConvexHullShape(vertices) if convex else None
+
+    # Stored even for concave bodies, the same model part may be added as convex later
+    hull = ConvexHullShape(vertices)
+    arrays = bvh.to_arrays()
+    arrays.update(vertices=vertices, mesh_indices=indices, hull=hull.vertices)
+    try:
+        write(path, source, part, fingerprint, arrays)
+    except OSError:
+        # Read-only install: build every launch instead
+        pass
+    return vertices, indices, bvh, hull if convex else None
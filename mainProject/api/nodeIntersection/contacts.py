@@ -0,0 +1,230 @@
+# Contact bookkeeping for the NodeIntersection manager.
+# Reports live as long as their actor/collider pair stays in contact and are
+# recycled through a pool afterwards, so a steady scene allocates nothing.
+#
+
+
+class CollisionReport:
+    __slots__ = (
+        "actor",
+        "collider",
+        "actorStr",
+        "colliderStr",
+        "actor_position",
+        "collider_position",
+        "normal",
+        "depth",
+        "time_of_impact",
+    )
+
+    def __init__(
+        self,
+        actor,
+        collider,
+        actor_position: tuple,
+        collider_position: tuple,
+        normal=None,
+        depth: float = None,
+        time_of_impact: float = None,
+    ):
+        self.reset(
+            actor,
+            collider,
+            actor_position,
+            collider_position,
+            normal,
+            depth,
+            time_of_impact,
+        )
+
+    def reset(
+        self,
+        actor,
+        collider,
+        actor_position: tuple,
+        collider_position: tuple,
+        normal=None,
+        depth: float = None,
+        time_of_impact: float = None,
+    ):
+        self.actor = actor
+        self.collider = collider
+        self.actorStr = actor.name
+        self.colliderStr = collider.name
+        self.actor_position = actor_position
+        self.collider_position = collider_position
+        # Only set for convex pairs: unit normal from actor to collider and the
+        # penetration depth along it
+        self.normal = normal
+        self.depth: float = depth
+        # Only set for pairs found by the continuous sweep (see Mgr.set_continuous):
+        # fraction of the last collision tick at which they first touched. The
+        # positions are then the ones at that moment
+        self.time_of_impact: float = time_of_impact
+
+    @property
+    def report(self) -> dict:
+        return {
+            "actor": self.actor,
+            "collider": self.collider,
+            "actor_position": self.actor_position,
+            "collider_position": self.collider_position,
+            "normal": self.normal,
+            "depth": self.depth,
+            "time_of_impact": self.time_of_impact,
+        }
+
+    def __str__(self):
+        return f"CollisionReport(actor: {self.actorStr}, collider: {self.colliderStr}, actor_position: {self.actor_position}, collider_position: {self.collider_position})"
+
+    def __repr__(self):
+        return self.__str__()
+
+    def randThingy(): ...
+
+
+class CollisionListener:
+    """
+    Enter/stay/exit callbacks, optionally restricted to one actor and/or collider.
+    Each callback receives the CollisionReport of the pair. Reports are recycled
+    once a pair separates, so copy any field needed after an on_exit callback.
+    """
+
+    __slots__ = ("on_enter", "on_stay", "on_exit", "actor", "collider")
+
+    def __init__(
+        self, on_enter=None, on_stay=None, on_exit=None, actor=None, collider=None
+    ):
+        self.on_enter = on_enter
+        self.on_stay = on_stay
+        self.on_exit = on_exit
+        self.actor = actor
+        self.collider = collider
+
+    def matches(self, report: CollisionReport) -> bool:
+        return (self.actor is None or self.actor is report.actor) and (
+            self.collider is None or self.collider is report.collider
+        )
+
+
+class ContactStore:
+    """
+    Current contacts keyed by (actor id << 32 | collider id).
+    Fill it between begin() and end(); afterwards entered, stayed and exited hold
+    this frame's changes. Call release() once the events have been dispatched.
+    """
+
+    __slots__ = ("reports", "entered", "stayed", "exited", "_seen", "_pool")
+
+    def __init__(self):
+        self.reports: dict = {}
+        self.entered: list = []
+        self.stayed: list = []
+        self.exited: list = []
+        self._seen: set = set()
+        self._pool: list = []
+
+    @staticmethod
+    def key(actor_id: int, collider_id: int) -> int:
+        return (actor_id << 32) | collider_id
+
+    def begin(self):
+        self._seen.clear()
+        del self.entered[:]
+        del self.stayed[:]
+        del self.exited[:]
+
+    def touch(
+        self,
+        key: int,
+        actor,
+        collider,
+        actor_position,
+        collider_position,
+        normal=None,
+        depth=None,
+        time_of_impact=None,
+    ):
+        """
+        Record that a pair is in contact this frame.
+        """
+        self._seen.add(key)
+        report = self.reports.get(key)
+        if report is not None:
+            report.actor_position = actor_position
+            report.collider_position = collider_position
+            report.normal = normal
+            report.depth = depth
+            report.time_of_impact = time_of_impact
+            self.stayed.append(report)
+            return report
+
+        if self._pool:
+            report = self._pool.pop()
+            report.reset(
+                actor,
+                collider,
+                actor_position,
+                collider_position,
+                normal,
+                depth,
+                time_of_impact,
+            )
+        else:
+            report = CollisionReport(
+                actor,
+                collider,
+                actor_position,
+                collider_position,
+                normal,
+                depth,
+                time_of_impact,
+            )
+        self.reports[key] = report
+        self.entered.append(report)
+        _attach(actor, report)
+        _attach(collider, report)
+        return report
+
+    def end(self):
+        """
+        Move every pair that was not touched since begin() to the exited list.
+        """
+        if len(self._seen) == len(self.reports):
+            return
+        for key in [key for key in self.reports if key not in self._seen]:
+            report = self.reports.pop(key)
+            _detach(report.actor, report)
+            _detach(report.collider, report)
+            self.exited.append(report)
+
+    def release(self):
+        """
+        Return this frame's exited reports to the pool.
+        """
+        self._pool.extend(self.exited)
+        del self.exited[:]
+
+    def clear(self):
+        """
+        End every contact. The live reports move to exited like pairs that
+        separated, so dispatch their exit events before calling release().
+        """
+        self.begin()
+        self.end()
+
+
+def _attach(body, report: CollisionReport):
+    if body.collision_report is None:
+        body.collision_report = [report]
+    else:
+        body.collision_report.append(report)
+
+
+def _detach(body, report: CollisionReport):
+    reports = body.collision_report
+    if reports is None:
+        return
+    reports.remove(report)
+    if not reports:
+        body.collision_report = None
@@ -0,0 +1,351 @@
+# Convex collision for complex bodies that are (roughly) convex.
+# Each body keeps the vertices of its convex hull. Pairs are tested with GJK on
+# the Minkowski difference, and EPA recovers the penetration depth and normal
+# of intersecting pairs. GJK can start from the last separating direction of a
+# pair, which usually ends the test within one or two iterations.
+#
+
+import numpy as np
+from scipy.spatial import ConvexHull
+
+MAX_ITERATIONS = 64
+TOLERANCE = 1e-9
+
+
+class ConvexHullShape:
+    """
+    Convex hull of a point cloud, kept in the cloud's local space.
+    """
+
+    def __init__(self, points: np.ndarray):
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        try:
+            self.vertices: np.ndarray = points[ConvexHull(points).vertices]
+        except Exception:
+            # Flat or degenerate clouds have no 3D hull, every point is kept instead
+            self.vertices = np.unique(points, axis=0)
+
+    @classmethod
+    def from_vertices(cls, vertices: np.ndarray) -> "ConvexHullShape":
+        """
+        Wrap vertices that already are a hull, e.g. ones loaded from disk.
+        """
+        hull = cls.__new__(cls)
+        hull.vertices = vertices
+        return hull
+
+    def support(self, direction: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+        """
+        Furthest hull vertex along a world direction, in world space.
+
+        Parameters:
+        direction (numpy.ndarray): World space direction.
+        matrix (numpy.ndarray): Row-vector 4x4 world matrix of the hull.
+        """
+        # (v @ R) . d == v . (R @ d), so one matrix-vector product replaces
+        # transforming every vertex
+        local = matrix[:3, :3] @ direction
+        vertex = self.vertices[np.argmax(self.vertices @ local)]
+        return vertex @ matrix[:3, :3] + matrix[3, :3]
+
+
+class ConvexContact:
+    """
+    Penetration between two convex hulls.
+    """
+
+    __slots__ = ("normal", "depth", "point_a", "point_b")
+
+    def __init__(self, normal, depth: float, point_a, point_b):
+        # Unit normal pointing from the first hull toward the second
+        self.normal: np.ndarray = normal
+        self.depth: float = depth
+        # Deepest points of each hull inside the other
+        self.point_a: np.ndarray = point_a
+        self.point_b: np.ndarray = point_b
+
+
+class _MinkowskiSupport:
+    """
+    Support function of A - B. Each point remembers A's support point for EPA.
+    """
+
+    def __init__(self, hull_a, matrix_a, hull_b, matrix_b):
+        self.hull_a = hull_a
+        self.matrix_a = matrix_a
+        self.hull_b = hull_b
+        self.matrix_b = matrix_b
+
+    def __call__(self, direction: np.ndarray) -> tuple:
+        point_a = self.hull_a.support(direction, self.matrix_a)
+        point_b = self.hull_b.support(-direction, self.matrix_b)
+        return point_a - point_b, point_a
+
+
+def _cross(a, b) -> np.ndarray:
+    # np.cross is built for batches and costs several microseconds on one pair
+    return np.array(
+        (
+            a[1] * b[2] - a[2] * b[1],
+            a[2] * b[0] - a[0] * b[2],
+            a[0] * b[1] - a[1] * b[0],
+        )
+    )
+
+
+def _triple(a, b, c):
+    """
+    (a x b) x c
+    """
+    return _cross(_cross(a, b), c)
+
+
+def _line(simplex: list):
+    (b, _), (a, _) = simplex[-2:]
+    ab = b - a
+    ao = -a
+    if ab @ ao > 0:
+        return simplex[-2:], _triple(ab, ao, ab)
+    return simplex[-1:], ao
+
+
+def _triangle(simplex: list):
+    (c, _), (b, _), (a, _) = simplex[-3:]
+    ab = b - a
+    ac = c - a
+    ao = -a
+    normal = _cross(ab, ac)
+    if _cross(normal, ac) @ ao > 0:
+        if ac @ ao > 0:
+            return [simplex[-3], simplex[-1]], _triple(ac, ao, ac)
+        return _line(simplex[-2:])
+    if _cross(ab, normal) @ ao > 0:
+        return _line(simplex[-2:])
+    return simplex[-3:], normal if normal @ ao > 0 else -normal
+
+
+def _tetrahedron(simplex: list):
+    (d, _), (c, _), (b, _), (a, _) = simplex
+    ao = -a
+    # Faces through the newest point, each with the vertex it faces away from
+    for face, opposite in (((2, 1), d), ((1, 0), b), ((0, 2), c)):
+        first, second = simplex[face[0]], simplex[face[1]]
+        normal = _cross(first[0] - a, second[0] - a)
+        if normal @ (opposite - a) > 0:
+            normal = -normal
+        if normal @ ao > 0:
+            return _triangle([first, second, simplex[3]])
+    return simplex, None
+
+
+def gjk(support, direction=None):
+    """
+    Test whether the origin lies inside the Minkowski difference.
+
+    Parameters:
+    support (callable): Support function of A - B.
+    direction (numpy.ndarray): First search direction, e.g. last frame's result.
+
+    Returns:
+    tuple: (intersecting, simplex, direction). When separated, direction is a
+        separating axis worth caching for the next test of the same pair.
+    """
+    if direction is None or not np.any(direction):
+        direction = np.array([1.0, 0.0, 0.0])
+    simplex = [support(direction)]
+    if simplex[0][0] @ direction < 0:
+        # The cached axis still separates the pair
+        return False, simplex, direction
+    direction = -simplex[0][0]
+    for _ in range(MAX_ITERATIONS):
+        length = np.linalg.norm(direction)
+        if length < TOLERANCE:
+            # The origin lies on the simplex: touching counts as intersecting
+            return True, simplex, simplex[-1][0]
+        direction = direction / length
+        point = support(direction)
+        if point[0] @ direction < 0:
+            return False, simplex, direction
+        simplex.append(point)
+        if len(simplex) == 2:
+            simplex, direction = _line(simplex)
+        elif len(simplex) == 3:
+            simplex, direction = _triangle(simplex)
+        else:
+            simplex, direction = _tetrahedron(simplex)
+            if direction is None:
+                return True, simplex, -simplex[-1][0]
+    return True, simplex, direction
+
+
+def _fill_simplex(support, simplex: list) -> list:
+    """
+    Grow a simplex that ended on a vertex, edge or face into a proper tetrahedron.
+    """
+    axes = np.vstack((np.identity(3), -np.identity(3)))
+    for axis in axes:
+        if len(simplex) == 4:
+            break
+        point = support(axis)
+        candidate = [vertex for vertex, _ in simplex] + [point[0]]
+        if len(candidate) == 2:
+            usable = np.linalg.norm(candidate[1] - candidate[0]) > TOLERANCE
+        elif len(candidate) == 3:
+            usable = (
+                np.linalg.norm(
+                    _cross(candidate[1] - candidate[0], candidate[2] - candidate[0])
+                )
+                > TOLERANCE
+            )
+        else:
+            usable = (
+                abs(
+                    np.linalg.det(
+                        np.array(candidate[1:]) - candidate[0],
+                    )
+                )
+                > TOLERANCE
+            )
+        if usable:
+            simplex.append(point)
+    return simplex
+
+
+def epa(support, simplex: list) -> ConvexContact:
+    """
+    Expand GJK's final simplex toward the Minkowski boundary nearest to the origin.
+
+    Returns:
+    ConvexContact: Penetration normal, depth and deepest points, or None if the
+        simplex could not be grown into a tetrahedron (zero volume contact) or
+        the polytope degenerated on the way.
+    """
+    simplex = _fill_simplex(support, list(simplex))
+    if len(simplex) < 4:
+        return None
+    points = [vertex for vertex, _ in simplex]
+    supports_a = [point_a for _, point_a in simplex]
+    faces, normals, distances = [], [], []
+
+    def add_face(i, j, k) -> bool:
+        # The winding decides the side, the normal is never flipped afterwards
+        normal = _cross(points[j] - points[i], points[k] - points[i])
+        length = np.linalg.norm(normal)
+        if length < TOLERANCE:
+            return False
+        normal = normal / length
+        faces.append((i, j, k))
+        normals.append(normal)
+        distances.append(normal @ points[i])
+        return True
+
+    # Wind the tetrahedron outward, measured from its centroid: the origin may
+    # lie on its boundary
+    centroid = np.mean(points[:4], axis=0)
+    for i, j, k, opposite in ((0, 1, 2, 3), (0, 3, 1, 2), (0, 2, 3, 1), (1, 3, 2, 0)):
+        if (
+            _cross(points[j] - points[i], points[k] - points[i])
+            @ (points[i] - centroid)
+            < 0
+        ):
+            i, j = j, i
+        if not add_face(i, j, k):
+            return None
+
+    for _ in range(MAX_ITERATIONS):
+        nearest = int(np.argmin(distances))
+        normal = normals[nearest]
+        vertex, point_a = support(normal)
+        if vertex @ normal - distances[nearest] < 1e-7:
+            break
+        points.append(vertex)
+        supports_a.append(point_a)
+        new = len(points) - 1
+
+        # Remove every face the new point can see and keep their boundary
+        edges = {}
+        kept = [[], [], []]
+        for face, face_normal, distance in zip(faces, normals, distances):
+            if face_normal @ (vertex - points[face[0]]) > TOLERANCE:
+                for edge in (
+                    (face[0], face[1]),
+                    (face[1], face[2]),
+                    (face[2], face[0]),
+                ):
+                    if (edge[1], edge[0]) in edges:
+                        del edges[(edge[1], edge[0])]
+                    else:
+                        edges[edge] = True
+            else:
+                kept[0].append(face)
+                kept[1].append(face_normal)
+                kept[2].append(distance)
+        faces, normals, distances = kept
+        # Horizon edges keep the winding of the removed faces, so every new
+        # face is wound outward. A face that cannot be built would leave a hole.
+        for first, second in edges:
+            if not add_face(first, second, new):
+                return None
+        if not faces:
+            return None
+
+    nearest = int(np.argmin(distances))
+    normal = normals[nearest]
+    depth = float(distances[nearest])
+    i, j, k = faces[nearest]
+    weights = _barycentric(normal * depth, points[i], points[j], points[k])
+    point_a = weights @ np.array([supports_a[i], supports_a[j], supports_a[k]])
+    return ConvexContact(normal, depth, point_a, point_a - normal * depth)
+
+
+def _barycentric(point, a, b, c) -> np.ndarray:
+    v0 = b - a
+    v1 = c - a
+    v2 = point - a
+    d00 = v0 @ v0
+    d01 = v0 @ v1
+    d11 = v1 @ v1
+    d20 = v2 @ v0
+    d21 = v2 @ v1
+    denominator = d00 * d11 - d01 * d01
+    if abs(denominator) < TOLERANCE:
+        return np.array([1.0, 0.0, 0.0])
+    v = (d11 * d20 - d01 * d21) / denominator
+    w = (d00 * d21 - d01 * d20) / denominator
+    return np.array([1.0 - v - w, v, w])
+
+
+def collide(hull_a, matrix_a, hull_b, matrix_b, direction=None):
+    """
+    Test two convex hulls.
+
+    Parameters:
+    hull_a (ConvexHullShape): First hull.
+    matrix_a (numpy.ndarray): Row-vector 4x4 world matrix of the first hull.
+    hull_b (ConvexHullShape): Second hull.
+    matrix_b (numpy.ndarray): Row-vector 4x4 world matrix of the second hull.
+    direction (numpy.ndarray): Cached search direction for this pair, or None.
+
+    Returns:
+    tuple: (ConvexContact or None, direction to cache for the next test).
+    """
+    support = _MinkowskiSupport(hull_a, matrix_a, hull_b, matrix_b)
+    warm = direction is not None
+    intersecting, simplex, direction = gjk(support, direction)
+    if not intersecting:
+        return None, direction
+    contact = epa(support, simplex)
+    if contact is None and warm:
+        # A cached direction can leave GJK with a sliver simplex EPA cannot
+        # expand cleanly, start over from scratch
+        intersecting, simplex, direction = gjk(support)
+        contact = epa(support, simplex) if intersecting else None
+        if not intersecting:
+            return None, direction
+    if contact is None:
+        # Touching with zero volume, report it without a meaningful depth
+        point_a = simplex[-1][1]
+        normal = direction / max(np.linalg.norm(direction), TOLERANCE)
+        contact = ConvexContact(normal, 0.0, point_a, point_a)
+    # Once the pair separates, the penetration normal is the likeliest separating axis
+    return contact, contact.normal
@@ -1,39 +1,57 @@
 # This is a module designed to detect intersections between basic meshes in 3D space.
 # It provides a function to check if two meshes intersect and another function to compute the intersection points.
+# Both run on the meshes' real triangles through a batched separating-axis kernel.
 #
 
 # Import necessary libraries
 import numpy as np
-from scipy.spatial import Delaunay
 from .pandaToNumpy import panda_mesh_to_numpy
 
+# Number of triangle pairs evaluated per vectorized batch
+CHUNK_SIZE = 4096
+# Pairs in the first separating-axis batch when only one hit is needed
+FIRST_HIT_BATCH = 32
+
+
+def as_triangles(mesh, indices=None):
+    """
+    Normalise the accepted mesh representations to a triangle array.
+
+    Parameters:
+    mesh (numpy.ndarray): Triangles of shape (t, 3, 3), or vertices of shape (n, 3).
+    indices (numpy.ndarray): Optional triangle indices of shape (t, 3) into the vertices.
+        Without indices, consecutive vertex triples form a triangle, as in numpy_array_to_mesh.
+
+    Returns:
+    numpy.ndarray: Triangles of shape (t, 3, 3).
+    """
+    mesh = np.asarray(mesh, dtype=np.float64)
+    if indices is not None:
+        return mesh.reshape(-1, 3)[np.asarray(indices).reshape(-1, 3)]
+    if mesh.ndim == 3:
+        return mesh
+    vertices = mesh.reshape(-1, 3)
+    return vertices[: len(vertices) // 3 * 3].reshape(-1, 3, 3)
+
 
 # Function to check if two meshes intersect
-def do_meshes_intersect(mesh1, mesh2):
+def do_meshes_intersect(mesh1, mesh2, indices1=None, indices2=None):
     """
     Check if two meshes intersect.
 
     Parameters:
-    mesh1 (numpy.ndarray): First mesh represented as a 3D numpy array of shape (n, 3).
-    mesh2 (numpy.ndarray): Second mesh represented as a 3D numpy array of shape (m, 3).
+    mesh1 (numpy.ndarray): First mesh, see as_triangles for the accepted shapes.
+    mesh2 (numpy.ndarray): Second mesh, see as_triangles for the accepted shapes.
+    indices1 (numpy.ndarray): Optional triangle indices of the first mesh.
+    indices2 (numpy.ndarray): Optional triangle indices of the second mesh.
 
     Returns:
     bool: True if the meshes intersect, False otherwise.
     """
-    # Check if there are enough points to create Delaunay triangulations
-    if len(mesh1) < 5 or len(mesh2) < 5:
-        raise ValueError("Not enough points to create Delaunay triangulations")
-
-    # Create Delaunay triangulations for both meshes
-    tri1 = Delaunay(mesh1, qhull_options='QJ')
-    tri2 = Delaunay(mesh2, qhull_options='QJ')
-
-    # Check if any triangle from mesh1 intersects with any triangle from mesh2
-    for simplex1 in tri1.simplices:
-        for simplex2 in tri2.simplices:
-            if do_triangles_intersect(mesh1[simplex1], mesh2[simplex2]):
-                return True
-    return False
+    hits = intersecting_triangle_pairs(
+        as_triangles(mesh1, indices1), as_triangles(mesh2, indices2), first_hit=True
+    )
+    return len(hits) != 0
 
 
 # Function to check if two triangles intersect
@@ -48,135 +66,214 @@ def do_triangles_intersect(triangle1, triangle2):
     Returns:
     bool: True if the triangles intersect, False otherwise.
     """
-    # Compute the normal vectors of the triangles
-    normal1 = np.cross(triangle1[1] - triangle1[0], triangle1[2] - triangle1[0])
-    normal2 = np.cross(triangle2[1] - triangle2[0], triangle2[2] - triangle2[0])
-
-    # Check if the planes of the triangles are parallel
-    if np.abs(np.dot(normal1, normal2)) < 1e-6:
-        return False
-
-    # Compute the intersection line of the planes
-    line_direction = np.cross(normal1, normal2)
-
-    # Compute the intersection points
-    intersection_points = []
-
-    for i in range(3):
-        for j in range(3):
-            point = line_intersection(
-                triangle1[i],
-                triangle1[(i + 1) % 3],
-                triangle2[j],
-                triangle2[(j + 1) % 3],
-            )
-            if point is not None:
-                intersection_points.append(point)
-
-    # Check if any of the intersection points are inside both triangles
-    for point in intersection_points:
-        if is_point_in_triangle(point, triangle1) and is_point_in_triangle(
-            point, triangle2
-        ):
-            return True
+    triangle1 = np.asarray(triangle1, dtype=np.float64).reshape(1, 3, 3)
+    triangle2 = np.asarray(triangle2, dtype=np.float64).reshape(1, 3, 3)
+    return not _separated(triangle1, triangle2)[0]
 
-    return False
 
-
-# Function to compute the intersection point of two line segments
-def line_intersection(p1, p2, q1, q2):
+def intersecting_triangle_pairs(
+    triangles1, triangles2, pairs=None, first_hit=False, chunk_size=CHUNK_SIZE
+):
     """
-    Compute the intersection point of two line segments.
+    Find intersecting triangle pairs between two triangle arrays.
 
     Parameters:
-    p1 (numpy.ndarray): First point of the first line segment.
-    p2 (numpy.ndarray): Second point of the first line segment.
-    q1 (numpy.ndarray): First point of the second line segment.
-    q2 (numpy.ndarray): Second point of the second line segment.
+    triangles1 (numpy.ndarray): Triangles of shape (n, 3, 3).
+    triangles2 (numpy.ndarray): Triangles of shape (m, 3, 3).
+    pairs (numpy.ndarray): Optional candidate pairs of shape (p, 2), e.g. from a BVH.
+        Without it every pair of triangles that overlap the other mesh's
+        bounding box is a candidate.
+    first_hit (bool): Stop at the first batch that contains an intersection.
+    chunk_size (int): Number of candidate pairs tested per vectorized batch.
 
     Returns:
-    numpy.ndarray: Intersection point if it exists, None otherwise.
+    numpy.ndarray: Intersecting pairs of shape (k, 2) indexing triangles1 and triangles2.
+    """
+    triangles1 = np.asarray(triangles1, dtype=np.float64)
+    triangles2 = np.asarray(triangles2, dtype=np.float64)
+    if pairs is not None:
+        pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+        total = len(pairs)
+    else:
+        total = len(triangles1) * len(triangles2)
+    if total == 0:
+        return np.zeros((0, 2), dtype=np.int64)
+
+    min1, max1 = triangles1.min(axis=1), triangles1.max(axis=1)
+    min2, max2 = triangles2.min(axis=1), triangles2.max(axis=1)
+    if pairs is None:
+        # Only triangles inside the other mesh's box can touch it, meshes whose
+        # boxes are apart are rejected here without pairing any triangles
+        rows1 = np.nonzero(
+            np.all((min1 <= max2.max(axis=0)) & (max1 >= min2.min(axis=0)), axis=1)
+        )[0]
+        rows2 = np.nonzero(
+            np.all((min2 <= max1.max(axis=0)) & (max2 >= min1.min(axis=0)), axis=1)
+        )[0]
+        total = len(rows1) * len(rows2)
+
+    hits = []
+    for start in range(0, total, chunk_size):
+        if pairs is not None:
+            index1, index2 = pairs[start : start + chunk_size].T
+        else:
+            flat = np.arange(start, min(start + chunk_size, total))
+            index1, index2 = np.divmod(flat, len(rows2))
+            index1, index2 = rows1[index1], rows2[index2]
+
+        # Cheap box rejection before the full separating-axis test
+        boxes = np.all(
+            (min1[index1] <= max2[index2]) & (min2[index2] <= max1[index1]), axis=1
+        )
+        index1, index2 = index1[boxes], index2[boxes]
+        if len(index1) == 0:
+            continue
+
+        if not first_hit:
+            touching = ~_separated(triangles1[index1], triangles2[index2])
+            if np.any(touching):
+                hits.append(np.stack((index1[touching], index2[touching]), axis=1))
+            continue
+        # Slices that start small and double, so an early hit stops the test
+        # after a few pairs and a miss costs only a few extra calls
+        begin, size = 0, FIRST_HIT_BATCH
+        while begin < len(index1):
+            slice1 = index1[begin : begin + size]
+            slice2 = index2[begin : begin + size]
+            touching = ~_separated(triangles1[slice1], triangles2[slice2])
+            if np.any(touching):
+                return np.stack((slice1[touching], slice2[touching]), axis=1)
+            begin += size
+            size *= 2
+    if not hits:
+        return np.zeros((0, 2), dtype=np.int64)
+    return np.concatenate(hits)
+
+
+def _separated(triangles1, triangles2):
     """
-    # Compute the direction vectors
-    d1 = p2 - p1
-    d2 = q2 - q1
+    Separating-axis test for batches of triangle pairs.
 
-    # Compute the cross product
-    cross = np.cross(d1, d2)
+    Parameters:
+    triangles1 (numpy.ndarray): Triangles of shape (k, 3, 3).
+    triangles2 (numpy.ndarray): Triangles of shape (k, 3, 3), paired row by row with triangles1.
 
-    # Check if the lines are parallel
-    if np.linalg.norm(cross) < 1e-6:
-        return None
+    Returns:
+    numpy.ndarray: Boolean array of shape (k,), True where a separating axis exists.
+    """
+    edges1 = triangles1[:, [1, 2, 0]] - triangles1
+    edges2 = triangles2[:, [1, 2, 0]] - triangles2
+    normal1 = np.cross(edges1[:, 0], edges1[:, 1])
+    normal2 = np.cross(edges2[:, 0], edges2[:, 1])
+
+    # Face normals, the nine edge/edge directions and the in-plane edge normals.
+    # The in-plane axes only matter for coplanar pairs but are cheap to include.
+    axes = np.concatenate(
+        (
+            normal1[:, None],
+            normal2[:, None],
+            np.cross(edges1[:, :, None], edges2[:, None, :]).reshape(-1, 9, 3),
+            np.cross(normal1[:, None], edges1),
+            np.cross(normal2[:, None], edges2),
+        ),
+        axis=1,
+    )
+
+    # Each axis is a cross product, so compare its length against the product of
+    # the input lengths. Near-parallel inputs give a meaningless direction.
+    length1 = np.linalg.norm(edges1, axis=2)
+    length2 = np.linalg.norm(edges2, axis=2)
+    normal_length1 = np.linalg.norm(normal1, axis=1)[:, None]
+    normal_length2 = np.linalg.norm(normal2, axis=1)[:, None]
+    reference = np.concatenate(
+        (
+            length1[:, :1] * length1[:, 1:2],
+            length2[:, :1] * length2[:, 1:2],
+            (length1[:, :, None] * length2[:, None, :]).reshape(-1, 9),
+            normal_length1 * length1,
+            normal_length2 * length2,
+        ),
+        axis=1,
+    )
+    axis_length = np.linalg.norm(axes, axis=2)
+    usable = axis_length > 1e-9 * reference
+    axes = axes / np.where(usable, axis_length, 1.0)[:, :, None]
+
+    projection1 = np.einsum("kvd,kad->kav", triangles1, axes)
+    projection2 = np.einsum("kvd,kad->kav", triangles2, axes)
+    min1, max1 = projection1.min(axis=2), projection1.max(axis=2)
+    min2, max2 = projection2.min(axis=2), projection2.max(axis=2)
+
+    tolerance = 1e-9 * (np.maximum(max1, max2) - np.minimum(min1, min2))
+    separated = ((max1 + tolerance < min2) | (max2 + tolerance < min1)) & usable
+    return np.any(separated, axis=1)
+
+
+def _segment_triangle_points(starts, ends, triangles):
+    """
+    Intersect line segments with triangles (Moller-Trumbore), row by row.
 
-    # Compute the intersection point
-    denominator = np.dot(d1, cross)
-    if denominator == 0:
-        return None
-    t = np.dot(q1 - p1, cross) / denominator
+    Returns:
+    tuple: Points of shape (k, 3) and a boolean mask of shape (k,) marking real hits.
+    """
+    direction = ends - starts
+    edge1 = triangles[:, 1] - triangles[:, 0]
+    edge2 = triangles[:, 2] - triangles[:, 0]
+    p = np.cross(direction, edge2)
+    determinant = np.einsum("kd,kd->k", edge1, p)
+    valid = np.abs(determinant) > 1e-12
+    inverse = np.divide(1.0, determinant, out=np.zeros_like(determinant), where=valid)
 
-    if 0 <= t <= 1:
-        return p1 + t * d1
+    s = starts - triangles[:, 0]
+    u = np.einsum("kd,kd->k", s, p) * inverse
+    q = np.cross(s, edge1)
+    v = np.einsum("kd,kd->k", direction, q) * inverse
+    t = np.einsum("kd,kd->k", edge2, q) * inverse
 
-    return None
+    hit = valid & (u >= 0) & (v >= 0) & (u + v <= 1) & (t >= 0) & (t <= 1)
+    return starts + t[:, None] * direction, hit
 
 
-# Function to check if a point is inside a triangle
-def is_point_in_triangle(point, triangle):
+def triangle_intersection_points(triangles1, triangles2, pairs):
     """
-    Check if a point is inside a triangle.
+    Compute where the edges of intersecting triangle pairs pierce each other.
 
     Parameters:
-    point (numpy.ndarray): Point to check.
-    triangle (numpy.ndarray): Triangle represented as a 3D numpy array of shape (3, 3).
+    triangles1 (numpy.ndarray): Triangles of shape (n, 3, 3).
+    triangles2 (numpy.ndarray): Triangles of shape (m, 3, 3).
+    pairs (numpy.ndarray): Intersecting pairs of shape (k, 2).
 
     Returns:
-    bool: True if the point is inside the triangle, False otherwise.
+    numpy.ndarray: Intersection points of shape (p, 3).
     """
-    # Compute the barycentric coordinates
-    v0 = triangle[1] - triangle[0]
-    v1 = triangle[2] - triangle[0]
-    v2 = point - triangle[0]
-
-    d00 = np.dot(v0, v0)
-    d01 = np.dot(v0, v1)
-    d11 = np.dot(v1, v1)
-    d20 = np.dot(v2, v0)
-    d21 = np.dot(v2, v1)
-
-    denom = d00 * d11 - d01 * d01
-    if denom == 0:
-        return False
-
-    v = (d11 * d20 - d01 * d21) / denom
-    w = (d00 * d21 - d01 * d20) / denom
-
-    return (v >= 0) and (w >= 0) and (v + w <= 1)
+    pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+    first = triangles1[pairs[:, 0]]
+    second = triangles2[pairs[:, 1]]
+    points = []
+    for edges_of, against in ((first, second), (second, first)):
+        for edge in range(3):
+            point, hit = _segment_triangle_points(
+                edges_of[:, edge], edges_of[:, (edge + 1) % 3], against
+            )
+            points.append(point[hit])
+    return np.concatenate(points) if points else np.zeros((0, 3))
 
 
 # Function to compute the intersection points of two meshes
-def compute_intersection_points(mesh1, mesh2):
+def compute_intersection_points(mesh1, mesh2, indices1=None, indices2=None):
     """
     Compute the intersection points of two meshes.
 
     Parameters:
-    mesh1 (numpy.ndarray): First mesh represented as a 3D numpy array of shape (n, 3).
-    mesh2 (numpy.ndarray): Second mesh represented as a 3D numpy array of shape (m, 3).
+    mesh1 (numpy.ndarray): First mesh, see as_triangles for the accepted shapes.
+    mesh2 (numpy.ndarray): Second mesh, see as_triangles for the accepted shapes.
+    indices1 (numpy.ndarray): Optional triangle indices of the first mesh.
+    indices2 (numpy.ndarray): Optional triangle indices of the second mesh.
 
     Returns:
-    list: List of intersection points.
+    numpy.ndarray: Intersection points of shape (p, 3).
     """
-    # Create Delaunay triangulations for both meshes
-    tri1 = Delaunay(mesh1)
-    tri2 = Delaunay(mesh2)
-
-    # Initialize an empty list to store the intersection points
-    intersection_points = []
-
-    # Check if any triangle from mesh1 intersects with any triangle from mesh2
-    for simplex1 in tri1.simplices:
-        for simplex2 in tri2.simplices:
-            point = do_triangles_intersect(mesh1[simplex1], mesh2[simplex2])
-            if point is not None:
-                intersection_points.append(point)
-
-    return intersection_points
+    triangles1 = as_triangles(mesh1, indices1)
+    triangles2 = as_triangles(mesh2, indices2)
+    pairs = intersecting_triangle_pairs(triangles1, triangles2)
+    return triangle_intersection_points(triangles1, triangles2, pairs)
@@ -0,0 +1,100 @@
+# Collision layers for the NodeIntersection manager.
+# Every body has a category (the layers it belongs to) and a mask (the
+# layers it collides with), both bitfields. A pair is only tested when each
+# side's mask accepts the other side's category, both sides belong to an
+# enabled layer, and the pair is not in the ignore table.
+#
+
+import numpy as np
+
+DEFAULT_LAYER = 1
+# Every bit that fits a non-negative int64, so categories and masks can live in numpy arrays
+ALL_LAYERS = (1 << 63) - 1
+
+
+class LayerRegistry:
+    """
+    Named layer bits and the set of currently enabled layers.
+    """
+
+    def __init__(self):
+        self.bits: dict = {"default": DEFAULT_LAYER}
+        self.enabled: int = ALL_LAYERS
+
+    def bit(self, name: str) -> int:
+        """
+        Get the bit of a named layer, allocating the next free one on first use.
+        """
+        bit = self.bits.get(name)
+        if bit is None:
+            if len(self.bits) >= 63:
+                raise ValueError("No collision layers left, at most 63 are supported")
+            bit = 1 << len(self.bits)
+            self.bits[name] = bit
+        return bit
+
+    def bits_of(self, layers) -> int:
+        """
+        Combine layer names, bitfields or an iterable of either into one bitfield.
+        """
+        if isinstance(layers, str):
+            return self.bit(layers)
+        if isinstance(layers, (int, np.integer)):
+            return int(layers) & ALL_LAYERS
+        bits = 0
+        for layer in layers:
+            bits |= self.bits_of(layer)
+        return bits
+
+
+def allowed_pairs(layout, enabled: int):
+    """
+    Every actor/collider row pair that passes the layer filter, without touching positions.
+
+    Returns:
+    tuple: Index arrays (actor_indices, collider_indices).
+    """
+    actor_rows = np.nonzero(layout.actor_categories & enabled)[0]
+    collider_rows = np.nonzero(layout.collider_categories & enabled)[0]
+    # Whole disabled layers drop out above, the masks are then one broadcast
+    allowed = (
+        layout.actor_masks[actor_rows, None]
+        & layout.collider_categories[None, collider_rows]
+    ) != 0
+    allowed &= (
+        layout.actor_categories[actor_rows, None]
+        & layout.collider_masks[None, collider_rows]
+    ) != 0
+
+    if len(layout.ignored_actor_rows):
+        actor_slot = np.full(len(layout.actor_categories), -1)
+        collider_slot = np.full(len(layout.collider_categories), -1)
+        actor_slot[actor_rows] = np.arange(len(actor_rows))
+        collider_slot[collider_rows] = np.arange(len(collider_rows))
+        ignored_actors = actor_slot[layout.ignored_actor_rows]
+        ignored_colliders = collider_slot[layout.ignored_collider_rows]
+        active = (ignored_actors >= 0) & (ignored_colliders >= 0)
+        allowed[ignored_actors[active], ignored_colliders[active]] = False
+
+    actor_indices, collider_indices = np.nonzero(allowed)
+    return actor_rows[actor_indices], collider_rows[collider_indices]
+
+
+def filter_pairs(layout, enabled: int, actor_indices, collider_indices):
+    """
+    Keep only the candidate pairs that pass the layer filter.
+
+    Returns:
+    numpy.ndarray: Boolean array marking the pairs to keep.
+    """
+    actor_categories = layout.actor_categories[actor_indices]
+    collider_categories = layout.collider_categories[collider_indices]
+    keep = ((actor_categories & enabled) != 0) & ((collider_categories & enabled) != 0)
+    keep &= (layout.actor_masks[actor_indices] & collider_categories) != 0
+    keep &= (actor_categories & layout.collider_masks[collider_indices]) != 0
+    if len(layout.ignored_keys):
+        keys = (layout.actor_ids[actor_indices] << 32) | layout.collider_ids[
+            collider_indices
+        ]
+        keep &= ~np.isin(keys, layout.ignored_keys)
+    return keep
@@ -0,0 +1,215 @@
+# Process pool narrow phase for complex actor/collider pairs.
+# Each mesh is copied into shared memory once, when its body is registered.
+# Every tick only the pairs' buffer names and world matrices cross the process
+# boundary, and results are collected on a later tick instead of waited for.
+#
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
+import numpy as np
+from .bvh import MeshBVH
+from .intersection import intersecting_triangle_pairs, triangle_intersection_points
+
+
+def _views(buffer, vertex_count: int, triangle_count: int):
+    """
+    Lay out a shared block as float64 vertices followed by int64 triangle indices.
+    """
+    vertices = np.ndarray((vertex_count, 3), dtype=np.float64, buffer=buffer)
+    indices = np.ndarray(
+        (triangle_count, 3), dtype=np.int64, buffer=buffer, offset=vertices.nbytes
+    )
+    return vertices, indices
+
+
+class SharedMesh:
+    """
+    A complex body's local vertices and triangle indices in one shared memory block.
+    """
+
+    def __init__(self, vertices: np.ndarray, indices: np.ndarray):
+        vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1, 3)
+        self.memory = shared_memory.SharedMemory(
+            create=True, size=max(1, vertices.nbytes + indices.nbytes)
+        )
+        # Everything a worker needs to attach: (block name, vertex count, triangle count)
+        self.handle: tuple = (self.memory.name, len(vertices), len(indices))
+        shared_vertices, shared_indices = _views(
+            self.memory.buf, len(vertices), len(indices)
+        )
+        shared_vertices[:] = vertices
+        shared_indices[:] = indices
+        del shared_vertices, shared_indices
+
+    def close(self):
+        if self.memory is None:
+            return
+        self.memory.close()
+        self.memory.unlink()
+        self.memory = None
+
+
+# Worker side: attached blocks and the BVH built over them, by block name
+_attached: dict = {}
+
+
+def _attach(handle: tuple) -> list:
+    name, vertex_count, triangle_count = handle
+    entry = _attached.get(name)
+    if entry is None:
+        # Pool workers share the registering process's resource tracker, so the
+        # block is still unlinked exactly once, by SharedMesh.close()
+        memory = shared_memory.SharedMemory(name=name)
+        vertices, indices = _views(memory.buf, vertex_count, triangle_count)
+        entry = [memory, vertices, MeshBVH(vertices, indices), None]
+        _attached[name] = entry
+    return entry
+
+
+def _refit(entry: list, matrix: np.ndarray) -> MeshBVH:
+    _, vertices, bvh, last_matrix = entry
+    if last_matrix is None or not np.array_equal(matrix, last_matrix):
+        bvh.refit(vertices @ matrix[:3, :3] + matrix[3, :3])
+        entry[3] = matrix
+    return bvh
+
+
+def _detach_stale(live: frozenset):
+    for name in [name for name in _attached if name not in live]:
+        entry = _attached.pop(name)
+        # Drop the numpy views before closing, they export the shared buffer
+        entry[1] = entry[2] = None
+        entry[0].close()
+
+
+def solve_pairs(live: frozenset, pairs: list) -> list:
+    """
+    Test complex pairs inside a worker process.
+
+    Parameters:
+    live (frozenset): Names of every registered block. Others are detached.
+    pairs (list): (actor handle, actor matrix, collider handle, collider matrix) tuples.
+
+    Returns:
+    list: Intersection points of shape (p, 3) per pair, or None where there is no hit.
+    """
+    _detach_stale(live)
+    results = []
+    for actor_handle, actor_matrix, collider_handle, collider_matrix in pairs:
+        try:
+            actor = _refit(_attach(actor_handle), actor_matrix)
+            collider = _refit(_attach(collider_handle), collider_matrix)
+        except FileNotFoundError:
+            # The body was removed after this batch was submitted
+            results.append(None)
+            continue
+        candidates = actor.overlapping_triangle_pairs(collider)
+        hits = intersecting_triangle_pairs(
+            actor.triangles, collider.triangles, pairs=candidates
+        )
+        if len(hits) == 0:
+            results.append(None)
+        else:
+            results.append(
+                triangle_intersection_points(actor.triangles, collider.triangles, hits)
+            )
+    return results
+
+
+class NarrowPhasePool:
+    """
+    Runs complex pair tests on a process pool, one tick behind the caller.
+
+    Workers are started with "spawn" so the render process is never forked.
+    On spawn the entry script is imported again in every worker, so it must keep
+    its startup code under an if __name__ == "__main__" guard.
+    """
+
+    def __init__(self, max_workers: int = None):
+        self.executor = ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=get_context("spawn")
+        )
+        self.max_workers: int = self.executor._max_workers
+        self.meshes: dict = {}
+        self.hits: list = []
+        self._pending: list = []
+
+    def register(self, body):
+        """
+        Copy a complex body's mesh into shared memory, once.
+        """
+        if body not in self.meshes:
+            self.meshes[body] = SharedMesh(body.array, body.indices)
+
+    def unregister(self, body):
+        mesh = self.meshes.pop(body, None)
+        if mesh is not None:
+            mesh.close()
+
+    def retain(self, bodies):
+        """
+        Unregister every body that is not in bodies.
+        """
+        keep = set(bodies)
+        for body in [body for body in self.meshes if body not in keep]:
+            self.unregister(body)
+
+    def busy(self) -> bool:
+        return any(not future.done() for future, _ in self._pending)
+
+    def collect(self) -> list:
+        """
+        Gather the finished batches into (actor, collider, intersection_points, None)
+        hits, the same shape as the serial path's triangle hits.
+        Only call this once busy() is False.
+        """
+        if not self._pending:
+            return self.hits
+        hits = []
+        for future, pairs in self._pending:
+            for (actor, collider), points in zip(pairs, future.result()):
+                if points is not None:
+                    hits.append((actor, collider, points, None))
+        self._pending = []
+        self.hits = hits
+        return hits
+
+    def submit(self, pairs: list):
+        """
+        Start testing (actor, collider, actor_matrix, collider_matrix) pairs,
+        split into one batch per worker.
+        """
+        meshes = self.meshes
+        jobs = []
+        for actor, collider, actor_matrix, collider_matrix in pairs:
+            actor_mesh = meshes.get(actor)
+            collider_mesh = meshes.get(collider)
+            if actor_mesh is None or collider_mesh is None:
+                continue
+            jobs.append(
+                (
+                    (actor, collider),
+                    (
+                        actor_mesh.handle,
+                        actor_matrix,
+                        collider_mesh.handle,
+                        collider_matrix,
+                    ),
+                )
+            )
+        if not jobs:
+            return
+        live = frozenset(mesh.handle[0] for mesh in list(meshes.values()))
+        batch_size = -(-len(jobs) // self.max_workers)
+        for start in range(0, len(jobs), batch_size):
+            batch = jobs[start : start + batch_size]
+            future = self.executor.submit(solve_pairs, live, [job for _, job in batch])
+            self._pending.append((future, [bodies for bodies, _ in batch]))
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self._pending = []
+        self.hits = []
+        for body in list(self.meshes):
+            self.unregister(body)
@@ -0,0 +1,120 @@
+# Panda3D CollisionTraverser backend for the NodeIntersection manager.
+# Base actors and colliders are mirrored as CollisionSphere nodes under a
+# private root that is never rendered, actors as from nodes and colliders as
+# into nodes. One traverser pass per solve then finds every overlapping pair
+# of bounding spheres in native code. Capsules, boxes and the exact layer
+# filter are applied by the manager afterwards, as for the other broadphases.
+#
+# Only the solving thread touches the private root, so the pass is as safe
+# off the main thread as the NumPy broadphases.
+#
+# Panda compares a from node's from mask with an into node's into mask, both
+# 32 bit. Layer bitfields are folded into 32 bits, which never drops a pair the
+# layers allow; the manager's layer filter removes the extra ones.
+#
+
+import numpy as np
+from panda3d.core import (
+    BitMask32,
+    CollisionHandlerQueue,
+    CollisionNode,
+    CollisionSphere,
+    CollisionTraverser,
+    NodePath,
+)
+
+
+def fold_mask(bits: int) -> BitMask32:
+    """
+    Fold a layer bitfield into Panda's 32 bit collide mask.
+    """
+    return BitMask32((bits | bits >> 32) & 0xFFFFFFFF)
+
+
+class TraverserBackend:
+    """
+    Panda collision solids mirroring the base bodies of the current Layout.
+    """
+
+    def __init__(self):
+        self.root: NodePath = NodePath("NodeIntersection-traverser")
+        self.traverser: CollisionTraverser = CollisionTraverser("NodeIntersection")
+        self.queue: CollisionHandlerQueue = CollisionHandlerQueue()
+        self.layout = None
+        self._actor_paths: list = []
+        self._collider_paths: list = []
+        # Collision node pointer -> row of its body in the layout
+        self._actor_rows: dict = {}
+        self._collider_rows: dict = {}
+        # Positions the solids were last placed at, only moved ones are placed again
+        self._actor_positions: np.ndarray = np.zeros((0, 3))
+        self._collider_positions: np.ndarray = np.zeros((0, 3))
+
+    def _mirror(self, body, from_mask: BitMask32, into_mask: BitMask32) -> NodePath:
+        node = CollisionNode(body.name)
+        node.add_solid(CollisionSphere(0, 0, 0, body.radius))
+        node.set_from_collide_mask(from_mask)
+        node.set_into_collide_mask(into_mask)
+        return self.root.attach_new_node(node)
+
+    def build(self, layout):
+        """
+        Replace the mirrored solids with the bodies of a new layout.
+        """
+        self.traverser.clear_colliders()
+        self.root.get_children().detach()
+        self._actor_paths = [
+            self._mirror(actor, fold_mask(actor.mask), BitMask32.all_off())
+            for actor in layout.base_actors
+        ]
+        self._collider_paths = [
+            self._mirror(collider, BitMask32.all_off(), fold_mask(collider.category))
+            for collider in layout.base_colliders
+        ]
+        for path in self._actor_paths:
+            self.traverser.add_collider(path, self.queue)
+        self._actor_rows = {
+            path.node().this: row for row, path in enumerate(self._actor_paths)
+        }
+        self._collider_rows = {
+            path.node().this: row for row, path in enumerate(self._collider_paths)
+        }
+        # NaN never equals a position, so every solid is placed on the first pass
+        self._actor_positions = np.full((len(self._actor_paths), 3), np.nan)
+        self._collider_positions = np.full((len(self._collider_paths), 3), np.nan)
+        self.layout = layout
+
+    @staticmethod
+    def _place(paths: list, placed: np.ndarray, positions: np.ndarray):
+        moved = np.nonzero(np.any(positions != placed, axis=1))[0]
+        for row, position in zip(moved.tolist(), positions[moved].tolist()):
+            paths[row].set_pos(*position)
+        placed[moved] = positions[moved]
+
+    def overlaps(self, snapshot):
+        """
+        Move the solids to a snapshot's positions and run one traverser pass.
+
+        Returns:
+        tuple: Index arrays (actor_indices, collider_indices) of overlapping
+            bounding spheres, not yet filtered by layer.
+        """
+        if snapshot.layout is not self.layout:
+            self.build(snapshot.layout)
+        self._place(self._actor_paths, self._actor_positions, snapshot.actor_positions)
+        self._place(
+            self._collider_paths,
+            self._collider_positions,
+            snapshot.collider_positions,
+        )
+        self.traverser.traverse(self.root)
+
+        count = self.queue.get_num_entries()
+        actor_indices = np.empty(count, dtype=np.int64)
+        collider_indices = np.empty(count, dtype=np.int64)
+        actor_rows = self._actor_rows
+        collider_rows = self._collider_rows
+        for index, entry in enumerate(self.queue.entries):
+            actor_indices[index] = actor_rows[entry.get_from_node().this]
+            collider_indices[index] = collider_rows[entry.get_into_node().this]
+        return actor_indices, collider_indices
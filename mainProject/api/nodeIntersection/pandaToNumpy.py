@@ -1,70 +1,224 @@
 from panda3d.core import (
     GeomVertexReader,
-    GeomVertexWriter,
     Geom,
+    GeomEnums,
     GeomNode,
     GeomTriangles,
     GeomVertexFormat,
     GeomVertexData,
+    NodePath,
 )
+import hashlib
 import numpy as np
 
+# Panda3D numeric types that can be viewed directly as numpy arrays
+_NUMERIC_DTYPES = {
+    GeomEnums.NT_uint8: np.uint8,
+    GeomEnums.NT_uint16: np.uint16,
+    GeomEnums.NT_uint32: np.uint32,
+    GeomEnums.NT_float32: np.float32,
+    GeomEnums.NT_float64: np.float64,
+    GeomEnums.NT_int8: np.int8,
+    GeomEnums.NT_int16: np.int16,
+    GeomEnums.NT_int32: np.int32,
+}
 
-def panda_mesh_to_numpy(geom_node):
+
+def _geom_nodes(mesh, relative_to=None):
+    """
+    Yield (GeomNode, matrix) for every GeomNode in a GeomNode or NodePath.
+    The matrix maps the GeomNode's vertices into the space of relative_to,
+    or of the given mesh itself when relative_to is None.
     """
-    Convert a Panda3D GeomNode to a numpy array.
+    if isinstance(mesh, NodePath):
+        paths = [mesh] if mesh.node().is_of_type(GeomNode) else []
+        paths += list(mesh.find_all_matches("**/+GeomNode"))
+        other = mesh if relative_to is None else relative_to
+        for path in paths:
+            yield path.node(), np.array(path.get_mat(other), dtype=np.float64)
+    else:
+        yield mesh, None
 
-    Parameters:
-    geom_node (GeomNode): The Panda3D GeomNode to convert.
 
-    Returns:
-    numpy.ndarray: The mesh represented as a 3D numpy array of shape (n, 3).
+def column_view(vdata, name="vertex", writable=False):
     """
-    vertices = []
+    View one column of a GeomVertexData as a numpy array without copying.
+    The view is only valid while vdata is alive and its row count is unchanged.
 
-    for geom in geom_node.get_geoms():
-        vdata = geom.get_vertex_data()
-        reader = GeomVertexReader(vdata, "vertex")
+    Parameters:
+    vdata (GeomVertexData): The vertex data to read.
+    name (str): Column name, e.g. "vertex" or "normal".
+    writable (bool): Return a view that writes straight into vdata.
 
-        while not reader.is_at_end():
-            vertex = reader.get_data3f()
-            vertices.append([vertex[0], vertex[1], vertex[2]])
+    Returns:
+    numpy.ndarray: Array of shape (rows, components), or None if the column is
+        missing or stored in a packed format numpy cannot describe.
+    """
+    vertex_format = vdata.get_format()
+    array_index = vertex_format.get_array_with(name)
+    if array_index < 0:
+        return None
+    array_format = vertex_format.get_array(array_index)
+    column = array_format.get_column(name)
+    dtype = _NUMERIC_DTYPES.get(column.get_numeric_type())
+    if dtype is None or column.get_num_values() != column.get_num_components():
+        return None
+
+    if writable:
+        array_data = vdata.modify_array(array_index)
+    else:
+        array_data = vdata.get_array(array_index)
+    raw = np.frombuffer(memoryview(array_data).cast("B"), np.uint8)
+    itemsize = np.dtype(dtype).itemsize
+    return np.ndarray(
+        shape=(vdata.get_num_rows(), column.get_num_components()),
+        dtype=dtype,
+        buffer=raw,
+        offset=column.get_start(),
+        strides=(array_format.get_stride(), itemsize),
+    )
+
+
+def _read_vertices(vdata):
+    vertices = column_view(vdata, "vertex")
+    if vertices is not None:
+        return vertices[:, :3]
+
+    # Packed formats fall back to Panda's reader, one row at a time
+    reader = GeomVertexReader(vdata, "vertex")
+    rows = []
+    while not reader.is_at_end():
+        vertex = reader.get_data3f()
+        rows.append([vertex[0], vertex[1], vertex[2]])
+    return np.array(rows, dtype=np.float64).reshape(-1, 3)
+
+
+def _read_triangles(geom):
+    triangles = []
+    for primitive in geom.get_primitives():
+        primitive = primitive.decompose()
+        if not isinstance(primitive, GeomTriangles):
+            continue
+        if primitive.is_indexed():
+            dtype = _NUMERIC_DTYPES[primitive.get_index_type()]
+            indices = np.frombuffer(
+                memoryview(primitive.get_vertices()).cast("B"), dtype
+            )
+        else:
+            first = primitive.get_first_vertex()
+            indices = np.arange(first, first + primitive.get_num_vertices())
+        triangles.append(indices.reshape(-1, 3))
+    return triangles
+
+
+def panda_mesh_to_numpy(geom_node, with_indices=False, relative_to=None):
+    """
+    Convert a Panda3D GeomNode (or every GeomNode below a NodePath) to a numpy array.
+    Vertex and index buffers are read through their memoryviews, not row by row.
 
-    return np.array(vertices)
+    Parameters:
+    geom_node (GeomNode or NodePath): The Panda3D mesh to convert.
+    with_indices (bool): Also return the triangle index buffer.
+    relative_to (NodePath): Space to return the vertices in, e.g. render for world
+        space. Only used when a NodePath is given. Defaults to the NodePath itself.
 
+    Returns:
+    numpy.ndarray: The mesh represented as a 3D numpy array of shape (n, 3).
+    numpy.ndarray: Only if with_indices is set, the triangles as an index array of shape (t, 3).
+    """
+    vertices = []
+    triangles = []
+    offset = 0
+
+    for node, matrix in _geom_nodes(geom_node, relative_to):
+        for geom in node.get_geoms():
+            vdata = geom.get_vertex_data()
+            node_vertices = _read_vertices(vdata)
+            if matrix is not None:
+                # A single multiply moves the whole array into the target space
+                node_vertices = node_vertices @ matrix[:3, :3] + matrix[3, :3]
+            vertices.append(np.asarray(node_vertices, dtype=np.float64))
+
+            if with_indices:
+                for indices in _read_triangles(geom):
+                    triangles.append(indices.astype(np.int64) + offset)
+            offset += len(node_vertices)
+
+    vertices = np.concatenate(vertices) if vertices else np.zeros((0, 3))
+    if with_indices:
+        if triangles:
+            return vertices, np.concatenate(triangles)
+        return vertices, np.zeros((0, 3), dtype=np.int64)
+    return vertices
+
+
+def mesh_fingerprint(geom_node) -> str:
+    """
+    Hash of everything panda_mesh_to_numpy reads from a mesh: the matrix of every
+    GeomNode relative to the mesh, and the vertices and triangles of its Geoms.
+    Changes made after loading, e.g. scaling or removing a child node, change it.
 
-def numpy_array_to_mesh(numpy_array):
+    Returns:
+    str: Hex SHA-256 digest.
+    """
+    digest = hashlib.sha256()
+    for node, matrix in _geom_nodes(geom_node):
+        digest.update(b"node")
+        if matrix is not None:
+            digest.update(matrix.tobytes())
+        for geom in node.get_geoms():
+            vertices = np.ascontiguousarray(_read_vertices(geom.get_vertex_data()))
+            digest.update(f"geom {vertices.dtype.str} {vertices.shape}".encode())
+            digest.update(vertices.tobytes())
+            for indices in _read_triangles(geom):
+                indices = np.ascontiguousarray(indices)
+                digest.update(f"triangles {indices.dtype.str} {indices.shape}".encode())
+                digest.update(indices.tobytes())
+    return digest.hexdigest()
+
+
+def numpy_array_to_mesh(numpy_array, indices=None):
     """
     Convert a numpy array to a Panda3D GeomNode.
+    The vertex and index buffers are sized once and filled with a bulk copy.
 
     Parameters:
-    numpy_array (numpy.ndarray): The numpy array to convert.
+    numpy_array (numpy.ndarray): The vertices to convert, of shape (n, 3).
+    indices (numpy.ndarray): Optional triangle indices of shape (t, 3). Without
+        them, consecutive vertex triples form a triangle.
 
     Returns:
     GeomNode: The converted Panda3D GeomNode.
     """
+    vertices = np.asarray(numpy_array, dtype=np.float32).reshape(-1, 3)
 
     # Create a vertex format
     format = GeomVertexFormat.get_v3()
     vdata = GeomVertexData("vertices", format, Geom.UH_static)
 
-    # Create a vertex writer
-    vertex_writer = GeomVertexWriter(vdata, "vertex")
-
     # Write the vertices to the vertex data
-    for vertex in numpy_array:
-        vertex_writer.add_data3f(vertex[0], vertex[1], vertex[2])
+    vdata.set_num_rows(len(vertices))
+    if len(vertices):
+        target = memoryview(vdata.modify_array(0)).cast("B")
+        np.frombuffer(target, np.float32)[:] = vertices.reshape(-1)
 
     # Create a geom
     geom = Geom(vdata)
 
     # Create triangles
     triangles = GeomTriangles(Geom.UH_static)
-
-    # Add triangles (assuming the numpy array is structured as triangles)
-    for i in range(0, len(numpy_array), 3):
-        if i + 2 < len(numpy_array):
-            triangles.add_vertices(i, i + 1, i + 2)
+    if indices is None:
+        # Consecutive vertex triples, no index buffer needed
+        if len(vertices) >= 3:
+            triangles.add_consecutive_vertices(0, len(vertices) // 3 * 3)
+            triangles.close_primitive()
+    else:
+        indices = np.asarray(indices, dtype=np.uint32).reshape(-1)
+        triangles.set_index_type(GeomEnums.NT_uint32)
+        handle = triangles.modify_vertices()
+        handle.set_num_rows(len(indices))
+        if len(indices):
+            np.frombuffer(memoryview(handle).cast("B"), np.uint32)[:] = indices
 
     geom.add_primitive(triangles)
 
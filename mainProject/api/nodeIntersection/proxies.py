@@ -0,0 +1,233 @@
+# Simplified collision proxies for dense render meshes.
+# A mesh is decimated by vertex clustering, then split into convex pieces
+# until every piece's hull stays close to the surface it replaces. The pieces
+# are cached on disk under the hash of the source geometry and the settings,
+# and registered together as one compound collider.
+#
+
+import hashlib
+import os
+import numpy as np
+from scipy.spatial import ConvexHull, QhullError, cKDTree
+from .gjk import ConvexHullShape
+from .sdf import SDF_CACHE_DIR
+
+# Bump whenever the proxy generation changes, old cache files are then ignored
+PROXY_VERSION = 1
+
+
+def decimate(vertices: np.ndarray, indices: np.ndarray, max_vertices: int):
+    """
+    Merge vertices that share a grid cell, growing the cells until at most
+    max_vertices remain. Triangles that collapse are dropped.
+
+    Returns:
+    tuple: Decimated vertices (n, 3) and triangle indices (t, 3).
+    """
+    vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+    indices = np.asarray(indices, dtype=np.int64).reshape(-1, 3)
+    low = vertices.min(axis=0)
+    size = max(float((vertices.max(axis=0) - low).max()), 1e-9)
+    # A surface mesh has about (size / cell)^2 vertices
+    cell = size / max(np.sqrt(max_vertices), 1.0)
+    while True:
+        keys = np.floor((vertices - low) / cell).astype(np.int64)
+        _, cluster, counts = np.unique(
+            keys, axis=0, return_inverse=True, return_counts=True
+        )
+        cluster = cluster.reshape(-1)
+        if len(counts) <= max_vertices:
+            break
+        cell *= 1.25
+
+    merged = np.zeros((len(counts), 3))
+    np.add.at(merged, cluster, vertices)
+    merged /= counts[:, None]
+    triangles = cluster[indices]
+    kept = (
+        (triangles[:, 0] != triangles[:, 1])
+        & (triangles[:, 1] != triangles[:, 2])
+        & (triangles[:, 0] != triangles[:, 2])
+    )
+    triangles = triangles[kept]
+    if len(triangles):
+        # Triangles that collapsed onto the same three clusters
+        triangles = triangles[
+            np.unique(np.sort(triangles, axis=1), axis=0, return_index=True)[1]
+        ]
+    return merged, triangles
+
+
+def _hull_triangles(points: np.ndarray) -> np.ndarray:
+    """
+    Triangles of a point cloud's hull. Joggled, so flat clouds get one too.
+    """
+    try:
+        return ConvexHull(points, qhull_options="QJ").simplices
+    except (QhullError, ValueError):
+        return np.zeros((0, 3), dtype=np.int64)
+
+
+def concavity(vertices: np.ndarray, triangles: np.ndarray) -> float:
+    """
+    How far a piece's convex hull bulges away from the piece: the largest distance
+    from a hull face center to the nearest sample of the piece's surface.
+    """
+    points = vertices[np.unique(triangles)]
+    hull = _hull_triangles(points)
+    if len(hull) == 0:
+        return 0.0
+    corners = vertices[triangles]
+    samples = np.concatenate(
+        (
+            points,
+            corners.mean(axis=1),
+            (corners + np.roll(corners, 1, axis=1)).reshape(-1, 3) / 2,
+        )
+    )
+    distance, _ = cKDTree(samples).query(points[hull].mean(axis=1))
+    return float(distance.max())
+
+
+def _split(vertices: np.ndarray, triangles: np.ndarray):
+    """
+    Split triangles in two by the plane through their centroid, across the
+    direction they spread the most along.
+    """
+    centroids = vertices[triangles].mean(axis=1)
+    center = centroids.mean(axis=0)
+    _, _, axes = np.linalg.svd(centroids - center, full_matrices=False)
+    side = (centroids - center) @ axes[0] > 0
+    return triangles[side], triangles[~side]
+
+
+def _farthest_points(points: np.ndarray, count: int) -> np.ndarray:
+    """
+    Spread out subset of points, starting from the one furthest from their center.
+    """
+    if len(points) <= count:
+        return points
+    chosen = [int(np.argmax(np.linalg.norm(points - points.mean(axis=0), axis=1)))]
+    distance = np.linalg.norm(points - points[chosen[0]], axis=1)
+    for _ in range(count - 1):
+        chosen.append(int(np.argmax(distance)))
+        distance = np.minimum(
+            distance, np.linalg.norm(points - points[chosen[-1]], axis=1)
+        )
+    return points[chosen]
+
+
+def build_proxy(
+    vertices: np.ndarray,
+    indices: np.ndarray,
+    vertex_budget: int = 256,
+    max_pieces: int = 16,
+    tolerance: float = 0.05,
+) -> list:
+    """
+    Decimate a mesh and split it into convex pieces.
+
+    Parameters:
+    vertices (numpy.ndarray): Vertex positions of shape (n, 3).
+    indices (numpy.ndarray): Triangle indices of shape (t, 3).
+    vertex_budget (int): Hull vertices of all pieces together, at most.
+    max_pieces (int): Number of convex pieces, at most.
+    tolerance (float): Allowed concavity of a piece, as a fraction of the mesh's
+        longest side. Pieces are split until they are within it or max_pieces is hit.
+
+    Returns:
+    list: Hull vertices (k, 3) of every piece.
+    """
+    vertices, triangles = decimate(vertices, indices, vertex_budget * 4)
+    if len(triangles) == 0:
+        return [vertices] if len(vertices) else []
+    size = float((vertices.max(axis=0) - vertices.min(axis=0)).max())
+    limit = tolerance * size
+
+    pieces = [(concavity(vertices, triangles), triangles)]
+    while len(pieces) < max_pieces:
+        worst = max(range(len(pieces)), key=lambda index: pieces[index][0])
+        score, piece = pieces[worst]
+        if score <= limit:
+            break
+        first, second = _split(vertices, piece)
+        if len(first) == 0 or len(second) == 0:
+            # Cannot be split further, stop considering it
+            pieces[worst] = (0.0, piece)
+            continue
+        pieces[worst : worst + 1] = [
+            (concavity(vertices, first), first),
+            (concavity(vertices, second), second),
+        ]
+
+    per_piece = max(4, vertex_budget // len(pieces))
+    hulls = []
+    for _, piece in pieces:
+        points = vertices[np.unique(piece)]
+        hull = ConvexHullShape(points).vertices
+        hulls.append(_farthest_points(hull, per_piece))
+    return hulls
+
+
+def load_or_build(
+    vertices: np.ndarray,
+    indices: np.ndarray,
+    vertex_budget: int = 256,
+    max_pieces: int = 16,
+    tolerance: float = 0.05,
+    cache_dir: str = SDF_CACHE_DIR,
+) -> list:
+    """
+    build_proxy through a cache keyed by the source geometry and the settings.
+
+    Parameters:
+    cache_dir (str): Directory of the cache files, None to always build.
+    """
+    settings = (vertex_budget, max_pieces, tolerance)
+    if cache_dir is None:
+        return build_proxy(vertices, indices, *settings)
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(vertices, dtype=np.float64).tobytes())
+    digest.update(np.ascontiguousarray(indices, dtype=np.int64).tobytes())
+    digest.update(repr((PROXY_VERSION,) + settings).encode())
+    path = os.path.join(cache_dir, f"proxy-{digest.hexdigest()}.npz")
+    if os.path.exists(path):
+        try:
+            with np.load(path) as data:
+                counts = data["counts"]
+                if len(counts) == 0:
+                    return []
+                return np.split(data["vertices"], np.cumsum(counts)[:-1])
+        except (OSError, ValueError, KeyError):
+            # Truncated or foreign file, build it again
+            pass
+
+    hulls = build_proxy(vertices, indices, *settings)
+    os.makedirs(cache_dir, exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as file:
+        np.savez(
+            file,
+            vertices=np.concatenate(hulls) if hulls else np.zeros((0, 3)),
+            counts=np.array([len(hull) for hull in hulls], dtype=np.int64),
+        )
+    os.replace(temporary, path)
+    return hulls
+
+
+def pieces_mesh(hulls: list):
+    """
+    One triangle mesh holding the hull of every piece, for the BVH narrow phase.
+
+    Returns:
+    tuple: Vertices (n, 3) and triangle indices (t, 3).
+    """
+    vertices, triangles = [], []
+    offset = 0
+    for hull in hulls:
+        vertices.append(hull)
+        triangles.append(_hull_triangles(hull) + offset)
+        offset += len(hull)
+    if not vertices:
+        return np.zeros((0, 3)), np.zeros((0, 3), dtype=np.int64)
+    return np.concatenate(vertices), np.concatenate(triangles).astype(np.int64)
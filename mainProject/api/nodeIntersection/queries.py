@@ -0,0 +1,205 @@
+# Ray and swept-sphere queries against the NodeIntersection world.
+# Every function works on paired rows: row k of the rays is tested against
+# row k of the spheres or triangles, so the caller decides which pairs to test.
+# Rays that start inside a sphere, or a swept sphere that starts overlapping
+# a triangle feature, do not report it.
+#
+
+import numpy as np
+
+
+class RaycastHit:
+    """
+    Nearest hit of a ray, segment or sphere cast.
+    """
+
+    __slots__ = ("body", "distance", "point", "normal")
+
+    def __init__(self, body, distance: float, point: tuple, normal: tuple):
+        self.body = body
+        self.distance: float = distance
+        # For sphere casts this is the contact point, not the swept sphere's center
+        self.point: tuple = point
+        self.normal: tuple = normal
+
+    def __str__(self):
+        return f"RaycastHit(body: {self.body.name}, distance: {self.distance}, point: {self.point}, normal: {self.normal})"
+
+    def __repr__(self):
+        return self.__str__()
+
+
+def normalize_rays(rays: np.ndarray, max_dist):
+    """
+    Split an (N, 6) origin/direction array and normalise the directions.
+
+    Returns:
+    tuple: Origins (N, 3), unit directions (N, 3) and max distances (N,).
+        Rays with a zero direction get a max distance of -1 so they never hit.
+    """
+    rays = np.asarray(rays, dtype=np.float64).reshape(-1, 6)
+    origins = rays[:, :3]
+    directions = rays[:, 3:]
+    length = np.linalg.norm(directions, axis=1)
+    usable = length > 0
+    directions = directions / np.where(usable, length, 1.0)[:, None]
+    max_dist = np.broadcast_to(np.asarray(max_dist, dtype=np.float64), len(rays))
+    return origins, directions, np.where(usable, max_dist, -1.0)
+
+
+def ray_spheres(origins, directions, centers, radii) -> np.ndarray:
+    """
+    Distance along each unit ray to its paired sphere.
+
+    Returns:
+    numpy.ndarray: Distances of shape (k,), inf where the ray misses or starts inside.
+    """
+    offset = origins - centers
+    b = np.einsum("kd,kd->k", offset, directions)
+    c = np.einsum("kd,kd->k", offset, offset) - radii * radii
+    discriminant = b * b - c
+    t = -b - np.sqrt(np.maximum(discriminant, 0.0))
+    hit = (discriminant >= 0) & (c > 0) & (t >= 0)
+    return np.where(hit, t, np.inf)
+
+
+def _ray_cylinders(origins, directions, starts, ends, radius):
+    """
+    Distance along each unit ray to the side of a finite cylinder around an edge.
+    radius is one float or one per row.
+
+    Returns:
+    tuple: Distances (k,), inf on a miss, and the outward normals at the hits (k, 3).
+    """
+    axis = ends - starts
+    axis_sq = np.einsum("kd,kd->k", axis, axis)
+    inverse_sq = np.divide(1.0, axis_sq, out=np.zeros_like(axis_sq), where=axis_sq > 0)
+    offset = origins - starts
+    direction_axis = np.einsum("kd,kd->k", directions, axis)
+    offset_axis = np.einsum("kd,kd->k", offset, axis)
+    a = 1.0 - direction_axis * direction_axis * inverse_sq
+    b = np.einsum("kd,kd->k", offset, directions) - offset_axis * direction_axis * (
+        inverse_sq
+    )
+    c = (
+        np.einsum("kd,kd->k", offset, offset)
+        - offset_axis * offset_axis * inverse_sq
+        - radius * radius
+    )
+    discriminant = b * b - a * c
+    usable = (a > 1e-12) & (discriminant >= 0) & (c > 0)
+    t = np.divide(
+        -b - np.sqrt(np.maximum(discriminant, 0.0)),
+        a,
+        out=np.full_like(a, np.inf),
+        where=usable,
+    )
+    # Misses are inf, keep them out of the products below
+    finite = np.where(usable, t, 0.0)
+    along = (offset_axis + finite * direction_axis) * inverse_sq
+    hit = usable & (t >= 0) & (along >= 0) & (along <= 1)
+    t = np.where(hit, t, np.inf)
+
+    finite = np.where(hit, t, 0.0)
+    relative = offset + finite[:, None] * directions
+    normal = (
+        relative - (np.einsum("kd,kd->k", relative, axis) * inverse_sq)[:, None] * axis
+    )
+    return t, normal / np.reshape(radius, (-1, 1))
+
+
+def _ray_faces(origins, directions, triangles):
+    """
+    Moller-Trumbore for unit rays against their paired triangles.
+
+    Returns:
+    tuple: Distances (k,), inf on a miss, and unit face normals (k, 3).
+    """
+    edge1 = triangles[:, 1] - triangles[:, 0]
+    edge2 = triangles[:, 2] - triangles[:, 0]
+    p = np.cross(directions, edge2)
+    determinant = np.einsum("kd,kd->k", edge1, p)
+    valid = np.abs(determinant) > 1e-12
+    inverse = np.divide(1.0, determinant, out=np.zeros_like(determinant), where=valid)
+    s = origins - triangles[:, 0]
+    u = np.einsum("kd,kd->k", s, p) * inverse
+    q = np.cross(s, edge1)
+    v = np.einsum("kd,kd->k", directions, q) * inverse
+    t = np.einsum("kd,kd->k", edge2, q) * inverse
+    hit = valid & (u >= 0) & (v >= 0) & (u + v <= 1) & (t >= 0)
+
+    normal = np.cross(edge1, edge2)
+    length = np.linalg.norm(normal, axis=1)
+    normal = normal / np.where(length > 0, length, 1.0)[:, None]
+    return np.where(hit, t, np.inf), normal
+
+
+def ray_triangles(origins, directions, triangles, radius: float = 0.0):
+    """
+    Distance along each unit ray to its paired triangle, optionally sweeping a sphere.
+
+    A swept sphere hits the triangle when its center path hits the triangle grown
+    by radius: the face moved out along its normal, a cylinder around each edge and
+    a sphere around each corner.
+
+    Parameters:
+    origins (numpy.ndarray): Ray origins of shape (k, 3).
+    directions (numpy.ndarray): Unit ray directions of shape (k, 3).
+    triangles (numpy.ndarray): Triangles of shape (k, 3, 3).
+    radius (float): Radius of the swept sphere, 0 for a plain ray. Also takes
+        one radius per row.
+
+    Returns:
+    tuple: Distances (k,), inf on a miss, and unit normals (k, 3) facing the ray.
+    """
+    if len(triangles) == 0:
+        return np.zeros(0), np.zeros((0, 3))
+    t, face_normal = _ray_faces(origins, directions, triangles)
+    side = np.sign(np.einsum("kd,kd->k", origins - triangles[:, 0], face_normal))
+    side = np.where(side == 0, 1.0, side)
+    face_normal = face_normal * side[:, None]
+    radius = np.broadcast_to(np.asarray(radius, dtype=np.float64), len(triangles))
+    if not np.any(radius > 0):
+        return t, face_normal
+
+    # Face moved toward the ray's side, only entered while moving toward it
+    shifted = triangles + (face_normal * radius[:, None])[:, None, :]
+    t, _ = _ray_faces(origins, directions, shifted)
+    approaching = np.einsum("kd,kd->k", directions, face_normal) < 0
+    best = np.where(approaching, t, np.inf)
+    normal = face_normal.copy()
+
+    for corner in range(3):
+        start = triangles[:, corner]
+        end = triangles[:, (corner + 1) % 3]
+        edge_t, edge_normal = _ray_cylinders(origins, directions, start, end, radius)
+        closer = edge_t < best
+        best = np.where(closer, edge_t, best)
+        normal[closer] = edge_normal[closer]
+
+        vertex_t = ray_spheres(origins, directions, start, radius)
+        closer = vertex_t < best
+        best = np.where(closer, vertex_t, best)
+        finite = np.where(closer, vertex_t, 0.0)
+        vertex_normal = (origins + finite[:, None] * directions - start) / radius[
+            :, None
+        ]
+        normal[closer] = vertex_normal[closer]
+    return best, normal
+
+
+def nearest_per_ray(ray_count: int, ray_indices, distances):
+    """
+    Pick the nearest candidate of each ray.
+
+    Returns:
+    numpy.ndarray: Index into the candidates per ray, -1 where a ray has none.
+    """
+    nearest = np.full(ray_count, -1, dtype=np.int64)
+    finite = np.nonzero(np.isfinite(distances))[0]
+    if len(finite) == 0:
+        return nearest
+    order = finite[np.lexsort((distances[finite], ray_indices[finite]))]
+    rays, first = np.unique(ray_indices[order], return_index=True)
+    nearest[rays] = order[first]
+    return nearest
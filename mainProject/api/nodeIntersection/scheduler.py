@@ -0,0 +1,357 @@
+# Plumbing that lets the NodeIntersection manager solve collisions off the main
+# thread. The render thread is the only one that touches the scene graph: it
+# publishes transform snapshots, and the collision thread hands back results
+# through a mailbox that the render task drains.
+#
+
+from collections import deque
+from time import perf_counter, sleep
+import numpy as np
+from .layers import ALL_LAYERS
+from .shapes import SPHERE
+
+
+class Layout:
+    """
+    Immutable description of the registered bodies.
+    A new Layout is built whenever bodies are added or removed, so a thread still
+    holding the previous one keeps a consistent view.
+    """
+
+    def __init__(
+        self,
+        base_actors,
+        base_colliders,
+        complex_actors,
+        complex_colliders,
+        ignored_pairs=(),
+    ):
+        self.base_actors: tuple = tuple(base_actors)
+        self.base_colliders: tuple = tuple(base_colliders)
+        self.complex_actors: tuple = tuple(complex_actors)
+        self.complex_colliders: tuple = tuple(complex_colliders)
+
+        self.actor_radii = np.array(
+            [actor.radius for actor in self.base_actors], dtype=np.float64
+        )
+        self.collider_radii = np.array(
+            [collider.radius for collider in self.base_colliders], dtype=np.float64
+        )
+        self.actor_ids = np.array([actor.id for actor in self.base_actors], np.int64)
+        self.collider_ids = np.array(
+            [collider.id for collider in self.base_colliders], np.int64
+        )
+        self.actor_rows: dict = {
+            actor: row for row, actor in enumerate(self.base_actors)
+        }
+        self.collider_rows: dict = {
+            collider: row for row, collider in enumerate(self.base_colliders)
+        }
+
+        # Layer bitfields, see layers.py
+        self.actor_categories = np.array(
+            [actor.category for actor in self.base_actors], np.int64
+        )
+        self.actor_masks = np.array(
+            [actor.mask for actor in self.base_actors], np.int64
+        )
+        self.collider_categories = np.array(
+            [collider.category for collider in self.base_colliders], np.int64
+        )
+        self.collider_masks = np.array(
+            [collider.mask for collider in self.base_colliders], np.int64
+        )
+        (
+            self.ignored_actor_rows,
+            self.ignored_collider_rows,
+            self.ignored_keys,
+        ) = _ignored_rows(self.base_actors, self.base_colliders, ignored_pairs)
+        # The same filter for complex pairs
+        self.complex_layers: ComplexLayers = ComplexLayers(
+            self.complex_actors, self.complex_colliders, ignored_pairs
+        )
+        # Capsules and boxes, see shapes.py. Spheres are (radius, 0, 0)
+        self.actor_shapes = np.array(
+            [actor.shape for actor in self.base_actors], np.int64
+        )
+        self.collider_shapes = np.array(
+            [collider.shape for collider in self.base_colliders], np.int64
+        )
+        self.actor_extents = np.array(
+            [actor.extents for actor in self.base_actors], np.float64
+        ).reshape(-1, 3)
+        self.collider_extents = np.array(
+            [collider.extents for collider in self.base_colliders], np.float64
+        ).reshape(-1, 3)
+        self.actor_shaped_rows = np.nonzero(self.actor_shapes != SPHERE)[0]
+        self.collider_shaped_rows = np.nonzero(self.collider_shapes != SPHERE)[0]
+        # False when every base body is a sphere, so the shape pass can be skipped
+        self.shaped: bool = bool(
+            len(self.actor_shaped_rows) or len(self.collider_shaped_rows)
+        )
+        # False when every pair passes the masks, so the filter can be skipped
+        self.filtered: bool = bool(
+            len(self.ignored_keys)
+            or np.any(self.actor_masks != ALL_LAYERS)
+            or np.any(self.collider_masks != ALL_LAYERS)
+        )
+
+
+class ComplexLayers:
+    """
+    Ids and layer bitfields of the complex bodies, named like the base rows of a
+    Layout so allowed_pairs() and filter_pairs() work on complex pairs as well.
+    """
+
+    def __init__(self, complex_actors, complex_colliders, ignored_pairs=()):
+        self.actor_ids = np.array([actor.id for actor in complex_actors], np.int64)
+        self.collider_ids = np.array(
+            [collider.id for collider in complex_colliders], np.int64
+        )
+        self.actor_categories = np.array(
+            [actor.category for actor in complex_actors], np.int64
+        )
+        self.actor_masks = np.array([actor.mask for actor in complex_actors], np.int64)
+        self.collider_categories = np.array(
+            [collider.category for collider in complex_colliders], np.int64
+        )
+        self.collider_masks = np.array(
+            [collider.mask for collider in complex_colliders], np.int64
+        )
+        (
+            self.ignored_actor_rows,
+            self.ignored_collider_rows,
+            self.ignored_keys,
+        ) = _ignored_rows(complex_actors, complex_colliders, ignored_pairs)
+
+
+def _ignored_rows(actors, colliders, ignored_pairs) -> tuple:
+    """
+    Rows of the ignored pairs among the given bodies.
+
+    Returns:
+    tuple: Arrays (actor_rows, collider_rows, keys), one entry per ignored pair.
+    """
+    actor_id_rows = {actor.id: row for row, actor in enumerate(actors)}
+    collider_id_rows = {collider.id: row for row, collider in enumerate(colliders)}
+    ignored = [
+        (actor_id_rows[key >> 32], collider_id_rows[key & 0xFFFFFFFF], key)
+        for key in ignored_pairs
+        if key >> 32 in actor_id_rows and key & 0xFFFFFFFF in collider_id_rows
+    ]
+    return (
+        np.array([row for row, _, _ in ignored], np.int64),
+        np.array([row for _, row, _ in ignored], np.int64),
+        np.array([key for _, _, key in ignored], np.int64),
+    )
+
+
+class Snapshot:
+    """
+    World transforms of every body at one render frame.
+    """
+
+    __slots__ = (
+        "frame",
+        "layout",
+        "actor_positions",
+        "collider_positions",
+        "actor_rotations",
+        "collider_rotations",
+        "complex_matrices",
+        "enabled_layers",
+    )
+
+    def __init__(self):
+        self.frame: int = -1
+        self.layout: Layout = None
+        self.enabled_layers: int = ALL_LAYERS
+        self.actor_positions: np.ndarray = np.zeros((0, 3))
+        self.collider_positions: np.ndarray = np.zeros((0, 3))
+        # World rotation of every base body, only kept current for capsules and boxes
+        self.actor_rotations: np.ndarray = np.zeros((0, 3, 3))
+        self.collider_rotations: np.ndarray = np.zeros((0, 3, 3))
+        self.complex_matrices: list = []
+
+    def fit(self, layout: Layout):
+        """
+        Point the snapshot at a layout, reallocating only when the body counts change.
+        """
+        self.layout = layout
+        if len(self.actor_positions) != len(layout.base_actors):
+            self.actor_positions = np.zeros((len(layout.base_actors), 3))
+            self.actor_rotations = np.tile(
+                np.identity(3), (len(layout.base_actors), 1, 1)
+            )
+        if len(self.collider_positions) != len(layout.base_colliders):
+            self.collider_positions = np.zeros((len(layout.base_colliders), 3))
+            self.collider_rotations = np.tile(
+                np.identity(3), (len(layout.base_colliders), 1, 1)
+            )
+
+
+class SnapshotBuffer:
+    """
+    Lock-free snapshot handoff from one writer thread to one reader thread.
+
+    Two slots would be enough if the reader always kept up. A third one lets the
+    writer keep publishing while the reader is still busy with an older slot, so
+    neither side ever waits and the reader never sees a half written snapshot.
+    Only reference assignments are shared, which are atomic in CPython.
+    """
+
+    def __init__(self):
+        self._slots: tuple = (Snapshot(), Snapshot(), Snapshot())
+        self._published: Snapshot = None
+        self._reading: Snapshot = None
+
+    def back(self) -> Snapshot:
+        """
+        Writer side: a slot that is neither published nor being read.
+        """
+        published = self._published
+        reading = self._reading
+        for slot in self._slots:
+            if slot is not published and slot is not reading:
+                return slot
+
+    def publish(self, snapshot: Snapshot):
+        self._published = snapshot
+
+    def acquire(self) -> Snapshot:
+        """
+        Reader side: claim the latest published snapshot. The claim is re-checked so
+        the writer can never pick the slot between reading it and claiming it.
+        """
+        while True:
+            snapshot = self._published
+            self._reading = snapshot
+            if self._published is snapshot:
+                return snapshot
+
+    def latest(self) -> Snapshot:
+        return self._published
+
+
+class SolveResult:
+    """
+    Collisions found for one snapshot.
+    """
+
+    __slots__ = (
+        "frame",
+        "layout",
+        "actor_indices",
+        "collider_indices",
+        "complex_hits",
+        "swept_hits",
+    )
+
+    def __init__(
+        self,
+        frame,
+        layout,
+        actor_indices,
+        collider_indices,
+        complex_hits,
+        swept_hits=(),
+    ):
+        self.frame: int = frame
+        self.layout: Layout = layout
+        self.actor_indices: np.ndarray = actor_indices
+        self.collider_indices: np.ndarray = collider_indices
+        # (actor, collider, intersection_points, contact) per intersecting complex
+        # pair, contact is the ConvexContact of convex pairs and None otherwise
+        self.complex_hits: list = complex_hits
+        # (actor_row, collider_row, time_of_impact, actor_position, collider_position,
+        # normal) per base pair that only touched between the last solve and this one
+        self.swept_hits: list = swept_hits
+
+
+class RestingState:
+    """
+    What the solver saw last time, so the next solve only retests pairs where one
+    side moved. Bodies that did not move since then are asleep.
+    """
+
+    __slots__ = (
+        "layout",
+        "enabled_layers",
+        "actor_positions",
+        "collider_positions",
+        "actor_indices",
+        "collider_indices",
+    )
+
+    def __init__(self, snapshot, actor_indices, collider_indices):
+        self.layout: Layout = snapshot.layout
+        self.enabled_layers: int = snapshot.enabled_layers
+        self.actor_positions: np.ndarray = snapshot.actor_positions.copy()
+        self.collider_positions: np.ndarray = snapshot.collider_positions.copy()
+        self.actor_indices: np.ndarray = actor_indices
+        self.collider_indices: np.ndarray = collider_indices
+
+    def matches(self, snapshot) -> bool:
+        return (
+            self.layout is snapshot.layout
+            and self.enabled_layers == snapshot.enabled_layers
+        )
+
+
+class Mailbox:
+    """
+    Single slot, latest-wins handoff. Posting replaces any result that has not
+    been taken yet; deque append and popleft are atomic, so no lock is needed.
+    """
+
+    def __init__(self):
+        self._slot: deque = deque(maxlen=1)
+
+    def post(self, item):
+        self._slot.append(item)
+
+    def take(self):
+        try:
+            return self._slot.popleft()
+        except IndexError:
+            return None
+
+    def clear(self):
+        self._slot.clear()
+
+
+class FixedStepClock:
+    """
+    Drift-compensated fixed-timestep scheduler.
+    Tick deadlines are absolute, so time spent working is subtracted from the next
+    sleep instead of accumulating. After falling more than max_lag_steps behind,
+    the schedule is reset rather than running a burst of catch-up ticks.
+    """
+
+    def __init__(self, frame_rate: float = 60, max_lag_steps: int = 4):
+        self.step: float = 1.0 / frame_rate
+        self.max_lag: float = self.step * max_lag_steps
+        self.next_tick: float = perf_counter()
+        self.ticks: int = 0
+        self.skipped: int = 0
+
+    def wait(self, stop_event=None) -> bool:
+        """
+        Block until the next tick.
+
+        Returns:
+        bool: False if stop_event was set while waiting.
+        """
+        self.next_tick += self.step
+        delay = self.next_tick - perf_counter()
+        if delay > 0:
+            if stop_event is not None:
+                if stop_event.wait(delay):
+                    return False
+            else:
+                sleep(delay)
+        elif -delay > self.max_lag:
+            self.skipped += int(-delay / self.step)
+            self.next_tick = perf_counter()
+        self.ticks += 1
+        return stop_event is None or not stop_event.is_set()
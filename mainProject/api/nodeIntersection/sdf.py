@@ -0,0 +1,294 @@
+# Baked signed distance fields for static colliders.
+# A mesh is baked once into a regular grid of signed distances in its local
+# space (negative behind the surface) and cached on disk under the hash of its
+# vertices, triangles and bake settings, so later launches only load the file.
+# Distance and contact normal queries are trilinear lookups into the grid.
+#
+
+import hashlib
+import os
+import numpy as np
+from scipy.ndimage import distance_transform_edt
+
+# Bump whenever the bake changes, old cache files are then ignored
+SDF_VERSION = 1
+SDF_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "nodeIntersection")
+
+
+def closest_points_on_triangles(points: np.ndarray, triangles: np.ndarray):
+    """
+    Closest point of each triangle to its paired point.
+
+    Parameters:
+    points (numpy.ndarray): Points of shape (k, 3).
+    triangles (numpy.ndarray): Triangles of shape (k, 3, 3).
+
+    Returns:
+    tuple: Closest points (k, 3) and unit face normals (k, 3).
+    """
+    a, b, c = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+    normal = np.cross(b - a, c - a)
+    length = np.linalg.norm(normal, axis=1)
+    normal = normal / np.where(length > 0, length, 1.0)[:, None]
+
+    offset = np.einsum("kd,kd->k", points - a, normal)
+    projected = points - offset[:, None] * normal
+    inside = length > 1e-12
+    best = np.full(len(points), np.inf)
+    closest = np.zeros_like(points)
+    for start, end in ((a, b), (b, c), (c, a)):
+        edge = end - start
+        # normal x edge points into the triangle
+        inside &= np.einsum("kd,kd->k", np.cross(normal, edge), projected - start) >= 0
+        edge_sq = np.einsum("kd,kd->k", edge, edge)
+        t = np.einsum("kd,kd->k", points - start, edge) / np.where(
+            edge_sq > 0, edge_sq, 1.0
+        )
+        on_edge = start + np.clip(t, 0.0, 1.0)[:, None] * edge
+        distance = np.einsum("kd,kd->k", points - on_edge, points - on_edge)
+        closer = distance < best
+        best = np.where(closer, distance, best)
+        closest[closer] = on_edge[closer]
+    return np.where(inside[:, None], projected, closest), normal
+
+
+def _band_pairs(triangles: np.ndarray, origin, spacing: float, shape):
+    """
+    Every (triangle, cell) pair whose cell lies within one cell of the triangle's box.
+    """
+    low = np.floor((triangles.min(axis=1) - origin) / spacing).astype(np.int64) - 1
+    high = np.ceil((triangles.max(axis=1) - origin) / spacing).astype(np.int64) + 1
+    low = np.clip(low, 0, np.array(shape) - 1)
+    high = np.clip(high, 0, np.array(shape) - 1)
+    extent = high - low + 1
+    counts = extent.prod(axis=1)
+
+    triangle_ids = np.repeat(np.arange(len(triangles)), counts)
+    # Position of every pair inside its triangle's block of cells
+    local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    extent = extent[triangle_ids]
+    z = local % extent[:, 2]
+    y = (local // extent[:, 2]) % extent[:, 1]
+    x = local // (extent[:, 2] * extent[:, 1])
+    cells = low[triangle_ids] + np.stack((x, y, z), axis=1)
+    return triangle_ids, np.ravel_multi_index(cells.T, shape)
+
+
+def bake(
+    vertices: np.ndarray,
+    indices: np.ndarray,
+    resolution: int = 64,
+    padding: float = 0.1,
+    chunk: int = 1 << 20,
+):
+    """
+    Bake a signed distance grid around a triangle mesh.
+
+    Cells next to the surface find their closest triangle exactly. Every other cell
+    measures against the closest triangle of its nearest surface cell, found with
+    a Euclidean distance transform. The sign comes from the face normal of the closest
+    triangle, so open meshes work and their front side stays positive.
+
+    Parameters:
+    vertices (numpy.ndarray): Vertex positions of shape (n, 3).
+    indices (numpy.ndarray): Triangle indices of shape (t, 3).
+    resolution (int): Number of cells along the longest side of the grid.
+    padding (float): Margin around the mesh, as a fraction of its longest side.
+    chunk (int): Maximum number of (triangle, cell) pairs evaluated at once.
+
+    Returns:
+    SignedDistanceField: The baked field.
+    """
+    vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+    indices = np.asarray(indices, dtype=np.int64).reshape(-1, 3)
+    triangles = vertices[indices]
+    low = vertices.min(axis=0)
+    high = vertices.max(axis=0)
+    margin = max(float((high - low).max()), 1e-6) * padding
+    low = low - margin
+    high = high + margin
+    spacing = float((high - low).max()) / max(1, resolution - 1)
+    shape = tuple(int(n) for n in np.ceil((high - low) / spacing).astype(int) + 1)
+
+    cell_count = int(np.prod(shape))
+    grid = (
+        np.stack(
+            np.meshgrid(*(np.arange(n) for n in shape), indexing="ij"), axis=-1
+        ).reshape(-1, 3)
+        * spacing
+        + low
+    )
+
+    band_distance = np.full(cell_count, np.inf)
+    band_triangle = np.zeros(cell_count, dtype=np.int64)
+    triangle_ids, cells = _band_pairs(triangles, low, spacing, shape)
+    for start in range(0, len(cells), chunk):
+        ids = triangle_ids[start : start + chunk]
+        where = cells[start : start + chunk]
+        points, face_normals = closest_points_on_triangles(grid[where], triangles[ids])
+        offset = grid[where] - points
+        distance = np.linalg.norm(offset, axis=1)
+        # Faces sharing the closest edge tie on distance, the one the cell lies
+        # most squarely in front of (or behind) gives the reliable sign
+        facing = np.abs(np.einsum("kd,kd->k", offset, face_normals)) / np.where(
+            distance > 0, distance, 1.0
+        )
+        order = np.lexsort((-facing, np.round(distance, 9), where))
+        first = np.unique(where[order], return_index=True)[1]
+        chosen = order[first]
+        cell = where[chosen]
+        better = distance[chosen] < band_distance[cell]
+        cell = cell[better]
+        chosen = chosen[better]
+        band_distance[cell] = distance[chosen]
+        band_triangle[cell] = ids[chosen]
+
+    # Only cells within a cell of the surface seed the transform, a thicker band
+    # hands far cells the closest triangle of a cell off to the side
+    band = (band_distance <= spacing).reshape(shape)
+    if not band.any():
+        raise ValueError("Cannot bake a signed distance field for an empty mesh")
+    nearest = distance_transform_edt(~band, return_distances=False, return_indices=True)
+    nearest = band_triangle[np.ravel_multi_index(tuple(nearest.reshape(3, -1)), shape)]
+    values = np.empty(cell_count)
+    for start in range(0, cell_count, chunk):
+        cells = slice(start, start + chunk)
+        points, face_normals = closest_points_on_triangles(
+            grid[cells], triangles[nearest[cells]]
+        )
+        offset = grid[cells] - points
+        distance = np.linalg.norm(offset, axis=1)
+        sign = np.einsum("kd,kd->k", offset, face_normals)
+        values[cells] = np.where(sign < 0, -distance, distance)
+    return SignedDistanceField(low, spacing, values.reshape(shape).astype(np.float32))
+
+
+def content_hash(vertices: np.ndarray, indices: np.ndarray, *settings) -> str:
+    """
+    Hash of a mesh and the settings it is baked with, used as its cache key.
+    """
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(vertices, dtype=np.float64).tobytes())
+    digest.update(np.ascontiguousarray(indices, dtype=np.int64).tobytes())
+    digest.update(repr((SDF_VERSION,) + settings).encode())
+    return digest.hexdigest()
+
+
+def load_or_bake(
+    vertices: np.ndarray,
+    indices: np.ndarray,
+    resolution: int = 64,
+    padding: float = 0.1,
+    cache_dir: str = SDF_CACHE_DIR,
+):
+    """
+    Load a mesh's field from the cache, baking and storing it on a miss.
+
+    Parameters:
+    cache_dir (str): Directory of the cache files, None to always bake.
+
+    Returns:
+    SignedDistanceField: The field.
+    """
+    if cache_dir is None:
+        return bake(vertices, indices, resolution, padding)
+    key = content_hash(vertices, indices, resolution, padding)
+    path = os.path.join(cache_dir, f"sdf-{key}.npz")
+    if os.path.exists(path):
+        try:
+            return SignedDistanceField.load(path)
+        except (OSError, ValueError, KeyError):
+            # Truncated or foreign file, bake it again
+            pass
+    field = bake(vertices, indices, resolution, padding)
+    os.makedirs(cache_dir, exist_ok=True)
+    # Written under a temporary name first, a crash never leaves a half written file
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as file:
+        field.save(file)
+    os.replace(temporary, path)
+    return field
+
+
+class SignedDistanceField:
+    """
+    Signed distances sampled on a regular grid, in the baked mesh's local space.
+    """
+
+    def __init__(self, origin, spacing: float, values: np.ndarray):
+        self.origin: np.ndarray = np.asarray(origin, dtype=np.float64)
+        self.spacing: float = float(spacing)
+        self.values: np.ndarray = values
+        self.shape: tuple = values.shape
+        self.upper: np.ndarray = self.origin + (np.array(self.shape) - 1) * spacing
+        # Central difference gradients, interpolated like the distances for smooth normals
+        self.gradients: np.ndarray = np.stack(
+            np.gradient(values.astype(np.float32), self.spacing), axis=-1
+        )
+
+    def save(self, file):
+        np.savez(
+            file,
+            version=SDF_VERSION,
+            origin=self.origin,
+            spacing=self.spacing,
+            values=self.values,
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "SignedDistanceField":
+        with np.load(path) as data:
+            if int(data["version"]) != SDF_VERSION:
+                raise ValueError(f"{path} was baked by another version")
+            return cls(data["origin"], float(data["spacing"]), data["values"])
+
+    def _trilinear(self, grid: np.ndarray, cells: np.ndarray, weights: np.ndarray):
+        x, y, z = cells.T
+        wx, wy, wz = (weights[:, axis] for axis in range(3))
+        if grid.ndim == 4:
+            wx, wy, wz = wx[:, None], wy[:, None], wz[:, None]
+        c00 = grid[x, y, z] * (1 - wx) + grid[x + 1, y, z] * wx
+        c10 = grid[x, y + 1, z] * (1 - wx) + grid[x + 1, y + 1, z] * wx
+        c01 = grid[x, y, z + 1] * (1 - wx) + grid[x + 1, y, z + 1] * wx
+        c11 = grid[x, y + 1, z + 1] * (1 - wx) + grid[x + 1, y + 1, z + 1] * wx
+        return (c00 * (1 - wy) + c10 * wy) * (1 - wz) + (c01 * (1 - wy) + c11 * wy) * wz
+
+    def sample(self, points: np.ndarray):
+        """
+        Signed distance and outward unit normal at local space points.
+
+        Points outside the grid measure from the surface point estimated at the
+        nearest point of the grid, which gets less exact the further out they are.
+
+        Parameters:
+        points (numpy.ndarray): Points of shape (k, 3).
+
+        Returns:
+        tuple: Distances (k,) and unit normals (k, 3).
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        clamped = np.clip(points, self.origin, self.upper)
+        position = (clamped - self.origin) / self.spacing
+        cells = np.minimum(
+            np.floor(position).astype(np.int64), np.array(self.shape) - 2
+        )
+        cells = np.maximum(cells, 0)
+        weights = position - cells
+        distances = self._trilinear(self.values, cells, weights)
+        normals = self._trilinear(self.gradients, cells, weights)
+        length = np.linalg.norm(normals, axis=1)
+        normals = normals / np.where(length > 0, length, 1.0)[:, None]
+
+        outside = np.nonzero(np.any(points != clamped, axis=1))[0]
+        if len(outside):
+            # Estimate the surface point from the grid's edge and measure from there
+            surface = clamped[outside] - normals[outside] * distances[outside, None]
+            offset = points[outside] - surface
+            distance = np.linalg.norm(offset, axis=1)
+            # Behind an open surface stays behind it
+            sign = np.where(distances[outside] < 0, -1.0, 1.0)
+            distances[outside] = sign * distance
+            normals[outside] = (
+                offset * (sign / np.where(distance > 0, distance, 1.0))[:, None]
+            )
+        return distances, normals
@@ -0,0 +1,257 @@
+# Capsule and oriented box primitives for base bodies.
+# Every base body keeps a bounding sphere, so the sphere pass (all pairs or
+# grid) still finds the candidate pairs. Pairs where either side is a capsule
+# or a box are then refined here with exact tests, one vectorized batch per
+# combination of shapes.
+#
+# A capsule is a segment along its local Z axis with a radius. A box is given
+# by its half extents along its local axes. Rotations are row-vector 3x3
+# matrices as Panda uses them: row i is local axis i in world space.
+#
+
+import numpy as np
+
+SPHERE = 0
+CAPSULE = 1
+BOX = 2
+
+# Sides of the four box edges parallel to one axis
+_EDGE_SIGNS = ((-1.0, -1.0), (-1.0, 1.0), (1.0, -1.0), (1.0, 1.0))
+
+
+def _dot(a, b) -> np.ndarray:
+    return np.einsum("kd,kd->k", a, b)
+
+
+def capsule_segments(positions, rotations, half_heights):
+    """
+    End points of capsule segments.
+
+    Returns:
+    tuple: Start points (k, 3) and end points (k, 3).
+    """
+    axis = rotations[:, 2, :] * half_heights[:, None]
+    return positions - axis, positions + axis
+
+
+def closest_on_segments(points, starts, ends) -> np.ndarray:
+    """
+    Closest point of each segment to its paired point.
+    """
+    edge = ends - starts
+    length_sq = _dot(edge, edge)
+    t = _dot(points - starts, edge) / np.where(length_sq > 0, length_sq, 1.0)
+    return starts + np.clip(t, 0.0, 1.0)[:, None] * edge
+
+
+def segment_distance_sq(p1, q1, p2, q2) -> np.ndarray:
+    """
+    Squared distance between paired segments p1-q1 and p2-q2.
+    """
+    d1 = q1 - p1
+    d2 = q2 - p2
+    r = p1 - p2
+    a = _dot(d1, d1)
+    e = _dot(d2, d2)
+    f = _dot(d2, r)
+    c = _dot(d1, r)
+    b = _dot(d1, d2)
+    denominator = a * e - b * b
+    # Parallel (or degenerate) segments: any s works, 0 is as good as any
+    s = np.where(
+        denominator > 1e-12,
+        np.clip(
+            (b * f - c * e) / np.where(denominator > 1e-12, denominator, 1.0), 0, 1
+        ),
+        0.0,
+    )
+    t = (b * s + f) / np.where(e > 1e-12, e, 1.0)
+    # t outside the segment: clamp it and recompute s for the clamped t
+    t_clamped = np.clip(t, 0.0, 1.0)
+    s = np.where(
+        t != t_clamped,
+        np.clip((t_clamped * b - c) / np.where(a > 1e-12, a, 1.0), 0.0, 1.0),
+        s,
+    )
+    # A point for the second segment: closest point of the first to it
+    s = np.where(e > 1e-12, s, np.clip(-c / np.where(a > 1e-12, a, 1.0), 0.0, 1.0))
+    t = np.where(e > 1e-12, t_clamped, 0.0)
+    s = np.where(a > 1e-12, s, 0.0)
+    offset = (p1 + d1 * s[:, None]) - (p2 + d2 * t[:, None])
+    return _dot(offset, offset)
+
+
+def point_box_distance_sq(points, centers, rotations, half_extents) -> np.ndarray:
+    """
+    Squared distance from each point to its paired box, 0 inside.
+    """
+    local = np.einsum("kd,kjd->kj", points - centers, rotations)
+    outside = local - np.clip(local, -half_extents, half_extents)
+    return _dot(outside, outside)
+
+
+def _segments_cross_boxes(starts, ends, centers, rotations, half_extents):
+    """
+    Slab test of each segment against its paired box.
+    """
+    origin = np.einsum("kd,kjd->kj", starts - centers, rotations)
+    direction = np.einsum("kd,kjd->kj", ends - starts, rotations)
+    usable = np.abs(direction) > 1e-12
+    safe = np.where(usable, direction, 1.0)
+    near = (-half_extents - origin) / safe
+    far = (half_extents - origin) / safe
+    entry = np.where(usable, np.minimum(near, far), -np.inf)
+    exit = np.where(usable, np.maximum(near, far), np.inf)
+    # Parallel to a slab: inside it or never
+    inside_slab = usable | (np.abs(origin) <= half_extents)
+    entry = entry.max(axis=1)
+    exit = exit.min(axis=1)
+    return inside_slab.all(axis=1) & (entry <= exit) & (exit >= 0) & (entry <= 1)
+
+
+def segment_box_distance_sq(starts, ends, centers, rotations, half_extents):
+    """
+    Squared distance between each segment and its paired box, 0 if they cross.
+
+    A segment that misses the box is closest to it either at one of its end
+    points or against one of the box's 12 edges, so those are all measured.
+    """
+    crossing = _segments_cross_boxes(starts, ends, centers, rotations, half_extents)
+    best = np.minimum(
+        point_box_distance_sq(starts, centers, rotations, half_extents),
+        point_box_distance_sq(ends, centers, rotations, half_extents),
+    )
+    for axis in range(3):
+        other, last = (axis + 1) % 3, (axis + 2) % 3
+        direction = rotations[:, axis, :] * half_extents[:, axis, None]
+        for sign_other, sign_last in _EDGE_SIGNS:
+            middle = (
+                centers
+                + rotations[:, other, :] * (sign_other * half_extents[:, other, None])
+                + rotations[:, last, :] * (sign_last * half_extents[:, last, None])
+            )
+            best = np.minimum(
+                best,
+                segment_distance_sq(
+                    starts, ends, middle - direction, middle + direction
+                ),
+            )
+    return np.where(crossing, 0.0, best)
+
+
+def boxes_overlap(centers_a, rotations_a, half_a, centers_b, rotations_b, half_b):
+    """
+    Separating axis test of paired oriented boxes, 15 axes each.
+    """
+    # rotation[k, i, j]: axis i of A against axis j of B
+    rotation = np.einsum("kid,kjd->kij", rotations_a, rotations_b)
+    # Small epsilon against false separation when edges are parallel
+    absolute = np.abs(rotation) + 1e-9
+    offset = np.einsum("kd,kid->ki", centers_b - centers_a, rotations_a)
+
+    separated = np.zeros(len(centers_a), dtype=bool)
+    # Face axes of A
+    reach_b = np.einsum("kij,kj->ki", absolute, half_b)
+    separated |= np.any(np.abs(offset) > half_a + reach_b, axis=1)
+    # Face axes of B
+    offset_b = np.einsum("ki,kij->kj", offset, rotation)
+    reach_a = np.einsum("kij,ki->kj", absolute, half_a)
+    separated |= np.any(np.abs(offset_b) > reach_a + half_b, axis=1)
+    # Edge cross products A_i x B_j
+    for i in range(3):
+        i1, i2 = (i + 1) % 3, (i + 2) % 3
+        for j in range(3):
+            j1, j2 = (j + 1) % 3, (j + 2) % 3
+            distance = np.abs(
+                offset[:, i2] * rotation[:, i1, j] - offset[:, i1] * rotation[:, i2, j]
+            )
+            radius_a = (
+                half_a[:, i1] * absolute[:, i2, j] + half_a[:, i2] * absolute[:, i1, j]
+            )
+            radius_b = (
+                half_b[:, j1] * absolute[:, i, j2] + half_b[:, j2] * absolute[:, i, j1]
+            )
+            separated |= distance > radius_a + radius_b
+    return ~separated
+
+
+def _overlap(shape_a, shape_b, a, b) -> np.ndarray:
+    """
+    Exact test of paired bodies of one shape combination, shape_a <= shape_b.
+    a and b are (positions, rotations, extents) of the paired rows.
+    """
+    position_a, rotation_a, extent_a = a
+    position_b, rotation_b, extent_b = b
+    if shape_a == SPHERE and shape_b == CAPSULE:
+        starts, ends = capsule_segments(position_b, rotation_b, extent_b[:, 1])
+        closest = closest_on_segments(position_a, starts, ends)
+        reach = extent_a[:, 0] + extent_b[:, 0]
+        offset = position_a - closest
+        return _dot(offset, offset) <= reach * reach
+    if shape_a == SPHERE and shape_b == BOX:
+        distance_sq = point_box_distance_sq(
+            position_a, position_b, rotation_b, extent_b
+        )
+        return distance_sq <= extent_a[:, 0] * extent_a[:, 0]
+    if shape_a == CAPSULE and shape_b == CAPSULE:
+        start_a, end_a = capsule_segments(position_a, rotation_a, extent_a[:, 1])
+        start_b, end_b = capsule_segments(position_b, rotation_b, extent_b[:, 1])
+        reach = extent_a[:, 0] + extent_b[:, 0]
+        return segment_distance_sq(start_a, end_a, start_b, end_b) <= reach * reach
+    if shape_a == CAPSULE and shape_b == BOX:
+        starts, ends = capsule_segments(position_a, rotation_a, extent_a[:, 1])
+        distance_sq = segment_box_distance_sq(
+            starts, ends, position_b, rotation_b, extent_b
+        )
+        return distance_sq <= extent_a[:, 0] * extent_a[:, 0]
+    if shape_a == BOX and shape_b == BOX:
+        return boxes_overlap(
+            position_a, rotation_a, extent_a, position_b, rotation_b, extent_b
+        )
+    # Sphere against sphere, the bounding sphere test was already exact
+    return np.ones(len(position_a), dtype=bool)
+
+
+def refine_pairs(actors: tuple, colliders: tuple, actor_indices, collider_indices):
+    """
+    Keep only the candidate pairs whose actual shapes overlap.
+
+    Parameters:
+    actors (tuple): (shapes, positions, rotations, extents) arrays of every actor row.
+    colliders (tuple): The same for every collider row.
+    actor_indices (numpy.ndarray): Actor row of each candidate pair.
+    collider_indices (numpy.ndarray): Collider row of each candidate pair.
+
+    Returns:
+    numpy.ndarray: Boolean array marking the pairs to keep.
+    """
+    actor_shapes, actor_positions, actor_rotations, actor_extents = actors
+    collider_shapes, collider_positions, collider_rotations, collider_extents = (
+        colliders
+    )
+    keep = np.ones(len(actor_indices), dtype=bool)
+    pair_actor_shapes = actor_shapes[actor_indices]
+    pair_collider_shapes = collider_shapes[collider_indices]
+    shaped = np.nonzero(
+        (pair_actor_shapes != SPHERE) | (pair_collider_shapes != SPHERE)
+    )[0]
+    if len(shaped) == 0:
+        return keep
+    combination = pair_actor_shapes[shaped] * 3 + pair_collider_shapes[shaped]
+    for code in np.unique(combination).tolist():
+        pairs = shaped[combination == code]
+        rows_a = actor_indices[pairs]
+        rows_b = collider_indices[pairs]
+        a = (actor_positions[rows_a], actor_rotations[rows_a], actor_extents[rows_a])
+        b = (
+            collider_positions[rows_b],
+            collider_rotations[rows_b],
+            collider_extents[rows_b],
+        )
+        shape_a, shape_b = divmod(code, 3)
+        if shape_a > shape_b:
+            # Every test is written for the simpler shape first
+            keep[pairs] = _overlap(shape_b, shape_a, b, a)
+        else:
+            keep[pairs] = _overlap(shape_a, shape_b, a, b)
+    return keep
@@ -0,0 +1,374 @@
+"""
+Eye frames streamed through pixel buffer objects instead of synchronous copies.
+
+Readback: PackReadback reads an eye texture into a ring of persistently mapped
+pixel-pack buffers from a draw callback on Panda's window. The read only queues a
+transfer, and the buffer filled on the previous frame is published on the next
+one, so Panda only waits if the GPU fell a whole frame behind. This adds one frame
+of latency. Each consumer claims the buffer it reads, and reads never target the
+published buffer or a claimed one, so consumers never see a torn frame.
+
+Upload: StreamingTexture allocates immutable texture storage once and feeds it
+from a ring of persistently mapped pixel-unpack buffers with glTexSubImage2D.
+The copy into the mapped buffer is the only CPU work, and the GPU pulls the
+pixels while the next frame is prepared.
+
+FrameLatency records how many Panda frames and milliseconds lie between
+rendering an eye frame and uploading it to the compositor.
+
+Needs GL 4.4 (glBufferStorage) in both contexts.
+"""
+
+import ctypes
+from collections import deque
+from time import perf_counter, sleep
+import numpy as np
+from OpenGL import GL
+from panda3d.core import Camera, ClockObject, NodePath
+from .frameTransport import FrameTransport
+
+_PERSISTENT = GL.GL_MAP_PERSISTENT_BIT | GL.GL_MAP_COHERENT_BIT
+
+
+def _mapped_buffer(target, shape, access) -> tuple:
+    """
+    A buffer with immutable storage, mapped for as long as it exists.
+
+    Returns:
+    tuple: (GL buffer name, uint8 array of the given shape over the mapping).
+    """
+    size = int(np.prod(shape))
+    buffer = int(GL.glGenBuffers(1))
+    GL.glBindBuffer(target, buffer)
+    GL.glBufferStorage(target, size, None, access | _PERSISTENT)
+    address = GL.glMapBufferRange(target, 0, size, access | _PERSISTENT)
+    GL.glBindBuffer(target, 0)
+    memory = (ctypes.c_ubyte * size).from_address(address)
+    return buffer, np.ctypeslib.as_array(memory).reshape(shape)
+
+
+def _delete_buffers(target, buffers: list):
+    for buffer, _ in buffers:
+        GL.glBindBuffer(target, buffer)
+        GL.glUnmapBuffer(target)
+    GL.glBindBuffer(target, 0)
+    if buffers:
+        GL.glDeleteBuffers(len(buffers), [buffer for buffer, _ in buffers])
+
+
+def _finished(fence, timeout=0) -> bool:
+    """
+    Whether the GPU is done with the commands before a fence, waiting up to timeout ns.
+    """
+    if fence is None:
+        return True
+    result = GL.glClientWaitSync(fence, GL.GL_SYNC_FLUSH_COMMANDS_BIT, timeout)
+    return result in (GL.GL_ALREADY_SIGNALED, GL.GL_CONDITION_SATISFIED)
+
+
+def _retire(fence):
+    """
+    Block until the GPU passed a fence, then delete it.
+    """
+    if fence is None:
+        return
+    while not _finished(fence, 1000000):
+        pass
+    GL.glDeleteSync(fence)
+
+
+class FrameLatency:
+    """
+    Delay between rendering eye frames and uploading them, over the last frames.
+
+    Parameters:
+    window (int): Number of recent frames the averages cover.
+    """
+
+    def __init__(self, window=120):
+        self.frames: deque = deque(maxlen=window)
+        self.seconds: deque = deque(maxlen=window)
+
+    def record(self, frame_number: int, frame_time: float):
+        """
+        Parameters:
+        frame_number (int): Panda frame count when the frame was rendered.
+        frame_time (float): perf_counter() when the frame was rendered.
+        """
+        self.frames.append(
+            ClockObject.get_global_clock().get_frame_count() - frame_number
+        )
+        self.seconds.append(perf_counter() - frame_time)
+
+    def summary(self) -> dict:
+        if not self.frames:
+            return {"frames": None, "max_frames": None, "ms": None}
+        return {
+            "frames": sum(self.frames) / len(self.frames),
+            "max_frames": max(self.frames),
+            "ms": 1000 * sum(self.seconds) / len(self.seconds),
+        }
+
+
+class PackReadback:
+    """
+    Asynchronous readback of one eye texture into a ring of pixel-pack buffers.
+    The ring starts with three buffers (one written, one published, one read)
+    and grows when more consumers hold on to older frames.
+
+    Parameters:
+    window (GraphicsOutput): Output drawn after the eye buffer, e.g. base.win.
+    texture (Texture): Eye texture, rendered with RTMBindOrCopy.
+    """
+
+    def __init__(self, window, texture):
+        self.window = window
+        self.texture = texture
+        self.buffers: list = []
+        self.shape: tuple = None
+        # (buffer index, Panda frame count, perf_counter) of the newest finished read
+        self.ready: tuple = None
+        # One single item list per consumer, holding the buffer index it reads
+        self._claims: list = []
+        # (buffer index, fence, Panda frame count, perf_counter) of the read in flight
+        self._pending: tuple = None
+        self._framebuffer = None
+        camera = NodePath("pack-readback").attach_new_node(Camera("pack-readback"))
+        self.region = window.make_display_region()
+        self.region.set_sort(1000)
+        self.region.set_camera(camera)
+        self.region.set_draw_callback(self._draw)
+
+    def remove(self):
+        self.window.remove_display_region(self.region)
+
+    def register(self) -> list:
+        """
+        A claim for one consumer, to pass to view(). Consumers on different
+        threads, or holding frames at different times, need a claim each.
+        """
+        claim = [None]
+        self._claims.append(claim)
+        return claim
+
+    def _allocate(self, shape):
+        if self._pending is not None:
+            GL.glDeleteSync(self._pending[1])
+        _delete_buffers(GL.GL_PIXEL_PACK_BUFFER, self.buffers)
+        self.buffers = [
+            _mapped_buffer(GL.GL_PIXEL_PACK_BUFFER, shape, GL.GL_MAP_READ_BIT)
+            for _ in range(3)
+        ]
+        self.shape = shape
+        self.ready = None
+        self._pending = None
+
+    def _target(self) -> int:
+        """
+        A buffer that is neither published nor claimed, added if there is none.
+        Runs after publishing, so a consumer claiming the old frame meanwhile
+        sees the new one when it re-checks and moves its claim there.
+        """
+        busy = {claim[0] for claim in list(self._claims)}
+        if self.ready is not None:
+            busy.add(self.ready[0])
+        for index in range(len(self.buffers)):
+            if index not in busy:
+                return index
+        self.buffers.append(
+            _mapped_buffer(GL.GL_PIXEL_PACK_BUFFER, self.shape, GL.GL_MAP_READ_BIT)
+        )
+        return len(self.buffers) - 1
+
+    def _draw(self, cbdata):
+        texture = self.texture
+        gsg = self.window.get_gsg()
+        # Padding for power of 2 sizes sits above and right of the image
+        shape = (
+            texture.get_y_size() - texture.get_pad_y_size(),
+            texture.get_x_size() - texture.get_pad_x_size(),
+            4,
+        )
+        if shape != self.shape:
+            self._allocate(shape)
+        if self._framebuffer is None:
+            self._framebuffer = int(GL.glGenFramebuffers(1))
+
+        # The read queued on the previous frame has normally landed by now,
+        # it is only waited for if the GPU fell a whole frame behind
+        if self._pending is not None:
+            index, fence, frame_number, frame_time = self._pending
+            _retire(fence)
+            self._pending = None
+            self.ready = (index, frame_number, frame_time)
+
+        index = self._target()
+        source = texture.prepare_now(0, gsg.get_prepared_objects(), gsg)
+        previous_read = GL.glGetIntegerv(GL.GL_READ_FRAMEBUFFER_BINDING)
+        previous_pack = GL.glGetIntegerv(GL.GL_PIXEL_PACK_BUFFER_BINDING)
+        GL.glBindFramebuffer(GL.GL_READ_FRAMEBUFFER, self._framebuffer)
+        GL.glFramebufferTexture2D(
+            GL.GL_READ_FRAMEBUFFER,
+            GL.GL_COLOR_ATTACHMENT0,
+            GL.GL_TEXTURE_2D,
+            source.get_native_id(),
+            0,
+        )
+        GL.glBindBuffer(GL.GL_PIXEL_PACK_BUFFER, self.buffers[index][0])
+        # Same layout as Panda's RAM images: BGRA, rows bottom to top
+        GL.glReadPixels(
+            0,
+            0,
+            shape[1],
+            shape[0],
+            GL.GL_BGRA,
+            GL.GL_UNSIGNED_BYTE,
+            ctypes.c_void_p(0),
+        )
+        self._pending = (
+            index,
+            GL.glFenceSync(GL.GL_SYNC_GPU_COMMANDS_COMPLETE, 0),
+            ClockObject.get_global_clock().get_frame_count(),
+            perf_counter(),
+        )
+        GL.glBindBuffer(GL.GL_PIXEL_PACK_BUFFER, previous_pack)
+        GL.glBindFramebuffer(GL.GL_READ_FRAMEBUFFER, previous_read)
+        cbdata.upcall()
+
+    def wait(self, delay=0.01):
+        """
+        Block until a first frame has been read back.
+        """
+        while self.ready is None:
+            sleep(delay)
+
+    def view(self, claim: list) -> tuple:
+        """
+        Claim the newest finished frame as a (height, width, 4) BGRA view of the
+        mapped buffer. Panda does not read into it again until the same claim
+        is passed to view() once more, whichever thread that happens on.
+
+        Parameters:
+        claim (list): The consumer's claim, see register().
+
+        Returns:
+        tuple: (view, Panda frame count, perf_counter) when it was rendered,
+            or None before the first frame.
+        """
+        # Claimed, then re-checked, so _draw cannot pick the buffer in between
+        while True:
+            ready = self.ready
+            claim[0] = None if ready is None else ready[0]
+            if self.ready is ready:
+                break
+        if ready is None:
+            return None
+        index, frame_number, frame_time = ready
+        return self.buffers[index][1], frame_number, frame_time
+
+
+class PackedFrameTransport(FrameTransport):
+    """
+    FrameTransport over a PackReadback instead of the texture's RAM image.
+
+    Parameters:
+    readback (PackReadback): Readback of the eye texture.
+    size (tuple): (width, height) frames are handed out at, None for the texture size.
+    slots (int): Number of ring slots read() cycles through.
+    columns (tuple): (first, last) fraction of the texture width the frames
+        cover, None for the whole width.
+    """
+
+    def __init__(self, readback, size=None, slots=3, columns=None):
+        super().__init__(readback.texture, size, slots, columns)
+        self.readback = readback
+        self._claim: list = readback.register()
+
+    def wait(self, delay=0.01):
+        self.readback.wait(delay)
+
+    def view(self) -> np.ndarray:
+        """
+        The newest finished frame, without copying. Unlike a RAM image view it
+        stays untouched until this transport's next view(), frame() or read().
+        """
+        ready = self.readback.view(self._claim)
+        if ready is None:
+            return None
+        image, self.frame_number, self.frame_time = ready
+        return self._crop(image)
+
+
+class StreamingTexture:
+    """
+    A texture fed with CPU frames through persistently mapped pixel-unpack buffers.
+    Must be used on one thread, with the same GL context current every call.
+
+    Parameters:
+    slots (int): Unpack buffers in the ring, i.e. uploads in flight at once.
+    """
+
+    def __init__(self, slots=3):
+        self.slot_count: int = slots
+        self.texture: int = None
+        self.shape: tuple = None
+        self.buffers: list = []
+        # Uploads that had to wait for the GPU to release their buffer
+        self.stalls: int = 0
+        self._fences: list = []
+        self._next: int = 0
+
+    def _allocate(self, shape):
+        for fence in self._fences:
+            if fence is not None:
+                GL.glDeleteSync(fence)
+        _delete_buffers(GL.GL_PIXEL_UNPACK_BUFFER, self.buffers)
+        if self.texture is not None:
+            GL.glDeleteTextures(1, [self.texture])
+        self.texture = int(GL.glGenTextures(1))
+        GL.glBindTexture(GL.GL_TEXTURE_2D, self.texture)
+        GL.glTexStorage2D(GL.GL_TEXTURE_2D, 1, GL.GL_RGBA8, shape[1], shape[0])
+        GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MIN_FILTER, GL.GL_LINEAR)
+        GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MAG_FILTER, GL.GL_LINEAR)
+        self.buffers = [
+            _mapped_buffer(GL.GL_PIXEL_UNPACK_BUFFER, shape, GL.GL_MAP_WRITE_BIT)
+            for _ in range(self.slot_count)
+        ]
+        self._fences = [None] * self.slot_count
+        self._next = 0
+        self.shape = shape
+
+    def upload(self, frame: np.ndarray) -> int:
+        """
+        Copy a (height, width, 4) BGRA frame into the next buffer and queue its upload.
+        The storage is only reallocated when the frame size changes.
+
+        Returns:
+        int: GL name of the texture, left bound to GL_TEXTURE_2D.
+        """
+        if frame.shape != self.shape:
+            self._allocate(frame.shape)
+        index = self._next
+        if not _finished(self._fences[index]):
+            self.stalls += 1
+        _retire(self._fences[index])
+        buffer, memory = self.buffers[index]
+        np.copyto(memory, frame)
+
+        GL.glBindBuffer(GL.GL_PIXEL_UNPACK_BUFFER, buffer)
+        GL.glBindTexture(GL.GL_TEXTURE_2D, self.texture)
+        GL.glTexSubImage2D(
+            GL.GL_TEXTURE_2D,
+            0,
+            0,
+            0,
+            frame.shape[1],
+            frame.shape[0],
+            GL.GL_BGRA,
+            GL.GL_UNSIGNED_BYTE,
+            ctypes.c_void_p(0),
+        )
+        GL.glBindBuffer(GL.GL_PIXEL_UNPACK_BUFFER, 0)
+        self._fences[index] = GL.glFenceSync(GL.GL_SYNC_GPU_COMMANDS_COMPLETE, 0)
+        self._next = (index + 1) % self.slot_count
+        return self.texture
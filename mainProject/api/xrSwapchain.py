@@ -0,0 +1,441 @@
+"""
+GPU-resident eye frames for the XR compositor.
+
+Panda renders each eye into a texture that never leaves the GPU (RTMBindOrCopy).
+A draw callback on the main window runs after the eye buffers, on Panda's draw
+thread with its GL context current, and blits the eye textures straight into
+the images of the runtime's swapchains with glBlitFramebuffer, scaling them to
+the swapchain size on the way. The OpenXR session is created on that same
+context, so no pixels go through CPU memory.
+
+The runtime hands out the swapchain images. OpenXrRuntime talks to the headset
+through pyopenxr. StandInRuntime allocates plain GL textures instead, so the
+path runs on any GL 3.3 driver (e.g. Mesa llvmpipe) without a headset.
+"""
+
+import ctypes
+import sys
+from OpenGL import GL
+from panda3d.core import Camera, NodePath
+
+PRIMARY_STEREO = 2
+
+
+def shifted_rects(source_width: int, target_width: int, offset: float) -> tuple:
+    """
+    Horizontal blit ranges that shift an eye image by a fraction of its width,
+    the way the CPU path's shader offset its texture coordinates. Parts that
+    would be read from outside the source are left out.
+
+    Returns:
+    tuple: (source x0, source x1, target x0, target x1).
+    """
+    shift = offset * source_width
+    source_x0 = max(0.0, shift)
+    source_x1 = min(float(source_width), source_width + shift)
+    scale = target_width / source_width
+    return (
+        int(round(source_x0)),
+        int(round(source_x1)),
+        int(round((source_x0 - shift) * scale)),
+        int(round((source_x1 - shift) * scale)),
+    )
+
+
+def _storage_texture(width: int, height: int, internal_format=GL.GL_RGBA8) -> int:
+    texture = int(GL.glGenTextures(1))
+    GL.glBindTexture(GL.GL_TEXTURE_2D, texture)
+    GL.glTexStorage2D(GL.GL_TEXTURE_2D, 1, internal_format, width, height)
+    GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+    return texture
+
+
+class StandInRuntime:
+    """
+    Swapchains without a headset: rings of GL textures in Panda's context.
+    Lets the GPU path run and be checked on any desktop or CI machine.
+
+    Parameters:
+    size (tuple): (width, height) of every eye image.
+    images (int): Images per eye swapchain.
+    """
+
+    def __init__(self, size=(2064, 2208), images=3):
+        self.size: tuple = size
+        self.image_count: int = images
+        # GL texture names per eye, created once Panda's context is current
+        self.images: list = None
+        # Image each eye last released, i.e. the newest finished frame
+        self.released: list = [None, None]
+        self.frames: int = 0
+        self._index: list = [0, 0]
+
+    def begin_frame(self) -> bool:
+        if self.images is None:
+            self.images = [
+                [_storage_texture(*self.size) for _ in range(self.image_count)]
+                for _ in range(2)
+            ]
+        return True
+
+    def acquire(self, eye: int) -> int:
+        return self.images[eye][self._index[eye]]
+
+    def release(self, eye: int):
+        self.released[eye] = self.images[eye][self._index[eye]]
+        self._index[eye] = (self._index[eye] + 1) % self.image_count
+
+    def end_frame(self):
+        self.frames += 1
+
+
+class OpenXrRuntime:
+    """
+    OpenXR session on Panda's GL context, driven from the compositor's draw callback.
+
+    Headset and controller poses are written to the VrApi state object as the
+    threaded compositor loop did, so BaseVrApp.UpdateHeadsetTracking keeps working.
+
+    Parameters:
+    state: The VrApi object (api.core.main), holding poses, input and haptics.
+    """
+
+    def __init__(self, state):
+        import xr
+
+        self.xr = xr
+        self.state = state
+        state.init_state()
+        self.session = None
+        self.running: bool = False
+        self.size: tuple = None
+        self.swapchains: list = []
+        self.images: list = []
+        self.views = None
+        self._frame_state = None
+        self._rendered: bool = False
+        self._projection_views = None
+
+    def _graphics_binding(self):
+        xr = self.xr
+        if sys.platform == "win32":
+            from OpenGL import WGL
+
+            return xr.GraphicsBindingOpenGLWin32KHR(
+                h_dc=WGL.wglGetCurrentDC(), h_glrc=WGL.wglGetCurrentContext()
+            )
+        from OpenGL import GLX
+
+        context = GLX.glXGetCurrentContext()
+        if not context:
+            raise RuntimeError("OpenXR needs Panda to render through WGL or GLX")
+        return xr.GraphicsBindingOpenGLXlibKHR(
+            x_display=GLX.glXGetCurrentDisplay(),
+            glx_drawable=GLX.glXGetCurrentDrawable(),
+            glx_context=context,
+        )
+
+    def _create(self):
+        """
+        Create the instance, the session on the current GL context and one
+        swapchain per eye. Must run with Panda's context current.
+        """
+        xr = self.xr
+        state = self.state
+        instance = xr.create_instance(
+            xr.InstanceCreateInfo(
+                enabled_extension_names=[xr.KHR_OPENGL_ENABLE_EXTENSION_NAME]
+            )
+        )
+        system_id = xr.get_system(
+            instance, xr.SystemGetInfo(form_factor=xr.FormFactor.HEAD_MOUNTED_DISPLAY)
+        )
+        # The runtime refuses to create a GL session before this was queried
+        get_requirements = ctypes.cast(
+            xr.get_instance_proc_addr(instance, "xrGetOpenGLGraphicsRequirementsKHR"),
+            xr.PFN_xrGetOpenGLGraphicsRequirementsKHR,
+        )
+        requirements = xr.GraphicsRequirementsOpenGLKHR()
+        xr.check_result(
+            xr.Result(get_requirements(instance, system_id, ctypes.byref(requirements)))
+        )
+        self._binding = self._graphics_binding()
+        self.session = xr.create_session(
+            instance,
+            xr.SessionCreateInfo(
+                system_id=system_id,
+                next=ctypes.cast(ctypes.pointer(self._binding), ctypes.c_void_p),
+            ),
+        )
+        self.instance = instance
+        self.space = xr.create_reference_space(
+            self.session,
+            xr.ReferenceSpaceCreateInfo(
+                reference_space_type=xr.ReferenceSpaceType.STAGE
+            ),
+        )
+        state.instance = instance
+        state.session = self.session
+        state.initialize_actions()
+
+        views = xr.enumerate_view_configuration_views(
+            instance, system_id, xr.ViewConfigurationType.PRIMARY_STEREO
+        )
+        self.size = (
+            views[0].recommended_image_rect_width,
+            views[0].recommended_image_rect_height,
+        )
+        formats = xr.enumerate_swapchain_formats(self.session)
+        # Panda's output is already gamma encoded, sRGB storage displays it as is
+        image_format = (
+            GL.GL_SRGB8_ALPHA8 if GL.GL_SRGB8_ALPHA8 in formats else GL.GL_RGBA8
+        )
+        for _ in range(2):
+            swapchain = xr.create_swapchain(
+                self.session,
+                xr.SwapchainCreateInfo(
+                    usage_flags=xr.SwapchainUsageFlags.COLOR_ATTACHMENT_BIT
+                    | xr.SwapchainUsageFlags.TRANSFER_DST_BIT,
+                    format=image_format,
+                    sample_count=1,
+                    width=self.size[0],
+                    height=self.size[1],
+                    face_count=1,
+                    array_size=1,
+                    mip_count=1,
+                ),
+            )
+            self.swapchains.append(swapchain)
+            self.images.append(
+                [
+                    image.image
+                    for image in xr.enumerate_swapchain_images(
+                        swapchain, xr.SwapchainImageOpenGLKHR
+                    )
+                ]
+            )
+        self._projection_views = (xr.CompositionLayerProjectionView * 2)()
+        for eye, view in enumerate(self._projection_views):
+            view.sub_image.swapchain = self.swapchains[eye]
+            view.sub_image.image_rect.extent = xr.Extent2Di(*self.size)
+
+    def _poll_events(self):
+        xr = self.xr
+        while True:
+            try:
+                event = xr.poll_event(self.instance)
+            except xr.EventUnavailable:
+                return
+            if xr.StructureType(event.type) != (
+                xr.StructureType.EVENT_DATA_SESSION_STATE_CHANGED
+            ):
+                continue
+            changed = ctypes.cast(
+                ctypes.byref(event), ctypes.POINTER(xr.EventDataSessionStateChanged)
+            ).contents
+            self.session_state = xr.SessionState(changed.state)
+            if self.session_state == xr.SessionState.READY:
+                xr.begin_session(
+                    self.session,
+                    xr.SessionBeginInfo(
+                        primary_view_configuration_type=xr.ViewConfigurationType.PRIMARY_STEREO
+                    ),
+                )
+                self.running = True
+            elif self.session_state == xr.SessionState.STOPPING:
+                xr.end_session(self.session)
+                self.running = False
+
+    def begin_frame(self) -> bool:
+        """
+        Wait for the runtime's frame slot and locate the views.
+
+        Returns:
+        bool: True if the eyes should be drawn this frame.
+        """
+        xr = self.xr
+        if self.session is None:
+            self._create()
+        self._poll_events()
+        self._frame_state = None
+        self._rendered = False
+        if not self.running:
+            return False
+        frame_state = xr.wait_frame(self.session, xr.FrameWaitInfo())
+        xr.begin_frame(self.session, xr.FrameBeginInfo())
+        self._frame_state = frame_state
+        display_time = frame_state.predicted_display_time
+        view_state, self.views = xr.locate_views(
+            self.session,
+            xr.ViewLocateInfo(
+                view_configuration_type=xr.ViewConfigurationType.PRIMARY_STEREO,
+                display_time=display_time,
+                space=self.space,
+            ),
+        )
+        if xr.ViewStateFlags(view_state.view_state_flags) & (
+            xr.ViewStateFlags.ORIENTATION_VALID_BIT
+        ):
+            self.state.pose_quat = self.views[0].pose
+        if self.session_state == xr.SessionState.FOCUSED:
+            self.state.poll_actions()
+            self.state.locate_hands(self.space, display_time)
+        self._rendered = bool(frame_state.should_render)
+        return self._rendered
+
+    def acquire(self, eye: int) -> int:
+        xr = self.xr
+        swapchain = self.swapchains[eye]
+        index = xr.acquire_swapchain_image(swapchain, xr.SwapchainImageAcquireInfo())
+        xr.wait_swapchain_image(
+            swapchain, xr.SwapchainImageWaitInfo(timeout=xr.INFINITE_DURATION)
+        )
+        return self.images[eye][index]
+
+    def release(self, eye: int):
+        self.xr.release_swapchain_image(
+            self.swapchains[eye], self.xr.SwapchainImageReleaseInfo()
+        )
+
+    def end_frame(self):
+        xr = self.xr
+        if self._frame_state is None:
+            return
+        layers = []
+        if self._rendered:
+            for view, located in zip(self._projection_views, self.views):
+                view.pose = located.pose
+                view.fov = located.fov
+            self._layer = xr.CompositionLayerProjection(
+                space=self.space, views=self._projection_views
+            )
+            layers.append(ctypes.byref(self._layer))
+        xr.end_frame(
+            self.session,
+            xr.FrameEndInfo(
+                display_time=self._frame_state.predicted_display_time,
+                environment_blend_mode=xr.EnvironmentBlendMode.OPAQUE,
+                layers=layers,
+            ),
+        )
+
+
+class GpuEyeCompositor:
+    """
+    Blits the eye textures into the runtime's swapchain images once per frame.
+
+    Parameters:
+    window (GraphicsOutput): Output drawn after the eye buffers, e.g. base.win.
+    textures (tuple): Left and right eye textures, rendered with RTMBindOrCopy.
+    runtime: StandInRuntime or OpenXrRuntime.
+    offsets (callable): Returns the (left, right) horizontal image shift as a
+        fraction of the width, None for no shift.
+    columns (tuple): (first, last) fraction of its texture's width each eye
+        covers, None if every eye fills its texture.
+    """
+
+    def __init__(self, window, textures, runtime, offsets=None, columns=None):
+        self.window = window
+        self.textures: tuple = tuple(textures)
+        self.runtime = runtime
+        self.offsets = offsets
+        self.columns: tuple = (
+            ((0.0, 1.0),) * len(self.textures) if columns is None else columns
+        )
+        self._framebuffers = None
+        # An empty scene: the region only exists for its draw callback, which runs
+        # after every eye buffer because buffers with a lower sort render first
+        camera = NodePath("xr-compositor").attach_new_node(Camera("xr-compositor"))
+        self.region = window.make_display_region()
+        self.region.set_sort(1000)
+        self.region.set_camera(camera)
+        self.region.set_draw_callback(self._draw)
+
+    def remove(self):
+        self.window.remove_display_region(self.region)
+
+    def _draw(self, cbdata):
+        runtime = self.runtime
+        if runtime.begin_frame():
+            gsg = self.window.get_gsg()
+            offsets = (0.0, 0.0) if self.offsets is None else self.offsets()
+            for eye, texture in enumerate(self.textures):
+                source = texture.prepare_now(0, gsg.get_prepared_objects(), gsg)
+                target = runtime.acquire(eye)
+                width = texture.get_x_size() - texture.get_pad_x_size()
+                first, last = self.columns[eye]
+                self.blit(
+                    source.get_native_id(),
+                    (
+                        int(round((last - first) * width)),
+                        texture.get_y_size() - texture.get_pad_y_size(),
+                    ),
+                    target,
+                    runtime.size,
+                    offsets[eye],
+                    int(round(first * width)),
+                )
+                runtime.release(eye)
+        runtime.end_frame()
+        cbdata.upcall()
+
+    def blit(
+        self, source: int, source_size, target: int, target_size, offset=0.0, source_x=0
+    ):
+        """
+        Copy one GL texture, or the source_size columns from source_x on, into
+        another, scaled and shifted. Panda caches GL state, so every binding
+        touched here is put back afterwards.
+        """
+        if self._framebuffers is None:
+            self._framebuffers = [int(name) for name in GL.glGenFramebuffers(2)]
+        read, draw = self._framebuffers
+        previous_read = GL.glGetIntegerv(GL.GL_READ_FRAMEBUFFER_BINDING)
+        previous_draw = GL.glGetIntegerv(GL.GL_DRAW_FRAMEBUFFER_BINDING)
+        scissor = GL.glIsEnabled(GL.GL_SCISSOR_TEST)
+        srgb = GL.glIsEnabled(GL.GL_FRAMEBUFFER_SRGB)
+        GL.glDisable(GL.GL_SCISSOR_TEST)
+        # Copy the bytes as they are, see OpenXrRuntime's swapchain format
+        GL.glDisable(GL.GL_FRAMEBUFFER_SRGB)
+
+        GL.glBindFramebuffer(GL.GL_READ_FRAMEBUFFER, read)
+        GL.glFramebufferTexture2D(
+            GL.GL_READ_FRAMEBUFFER,
+            GL.GL_COLOR_ATTACHMENT0,
+            GL.GL_TEXTURE_2D,
+            source,
+            0,
+        )
+        GL.glBindFramebuffer(GL.GL_DRAW_FRAMEBUFFER, draw)
+        GL.glFramebufferTexture2D(
+            GL.GL_DRAW_FRAMEBUFFER,
+            GL.GL_COLOR_ATTACHMENT0,
+            GL.GL_TEXTURE_2D,
+            target,
+            0,
+        )
+        source_x0, source_x1, target_x0, target_x1 = shifted_rects(
+            source_size[0], target_size[0], offset
+        )
+        if offset:
+            # The strip the shift uncovered stays black
+            GL.glClearBufferfv(GL.GL_COLOR, 0, (0.0, 0.0, 0.0, 1.0))
+        GL.glBlitFramebuffer(
+            source_x + source_x0,
+            0,
+            source_x + source_x1,
+            source_size[1],
+            target_x0,
+            0,
+            target_x1,
+            target_size[1],
+            GL.GL_COLOR_BUFFER_BIT,
+            GL.GL_LINEAR,
+        )
+
+        GL.glBindFramebuffer(GL.GL_READ_FRAMEBUFFER, previous_read)
+        GL.glBindFramebuffer(GL.GL_DRAW_FRAMEBUFFER, previous_draw)
+        if scissor:
+            GL.glEnable(GL.GL_SCISSOR_TEST)
+        if srgb:
+            GL.glEnable(GL.GL_FRAMEBUFFER_SRGB)
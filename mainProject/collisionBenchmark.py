@@ -0,0 +1,298 @@
+"""
+Headless micro-benchmarks for api.nodeIntersection.
+Runs without a window and writes a JSON report (ops/sec, p50/p99 latency and
+peak traced memory per case) that can be kept as a baseline and compared
+against later runs:
+
+  python collisionBenchmark.py --output baseline.json
+  python collisionBenchmark.py --baseline baseline.json
+"""
+
+from panda3d.core import loadPrcFileData
+
+loadPrcFileData("", "window-type none\naudio-library-name null")
+
+from direct.showbase.ShowBase import ShowBase
+from time import perf_counter_ns, perf_counter
+import argparse
+import json
+import platform
+import sys
+import tracemalloc
+import numpy as np
+
+# 90 Hz headset frame
+FRAME_BUDGET_MS = 1000 / 90
+
+
+def measure(operation, setup=None, min_time=1.0, min_runs=20, max_runs=2000, warmup=3):
+    """
+    Time an operation and trace its peak memory.
+
+    Parameters:
+    operation (callable): The operation to time.
+    setup (callable): Called untimed before every run, e.g. to move bodies.
+    min_time (float): Keep running until this many seconds were spent timing.
+    min_runs (int): Minimum number of timed runs.
+    max_runs (int): Maximum number of timed runs.
+    warmup (int): Untimed runs first, so caches and lazy setup are not measured.
+
+    Returns:
+    dict: ops_per_sec, p50_ms, p99_ms, mean_ms, runs and peak_memory_bytes.
+    """
+    for _ in range(warmup):
+        if setup is not None:
+            setup()
+        operation()
+
+    samples = []
+    started = perf_counter()
+    while len(samples) < max_runs and (
+        len(samples) < min_runs or perf_counter() - started < min_time
+    ):
+        if setup is not None:
+            setup()
+        start = perf_counter_ns()
+        operation()
+        samples.append(perf_counter_ns() - start)
+
+    # Traced separately, tracemalloc slows every allocation down
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    operation()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    samples = np.array(samples, dtype=np.float64) / 1e6
+    return {
+        "runs": len(samples),
+        "ops_per_sec": 1000 / samples.mean(),
+        "mean_ms": samples.mean(),
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p99_ms": float(np.percentile(samples, 99)),
+        "peak_memory_bytes": peak,
+    }
+
+
+def bench_update(NodeIntersection, scales, broadphases, min_time):
+    """
+    Mgr.update() with N actors and M colliders, every actor moving each tick.
+    """
+    results = []
+    for actors, colliders in scales:
+        for broadphase in broadphases:
+            rng = np.random.default_rng(0)
+            extent = max(10.0, (actors + colliders) ** (1 / 3) * 2)
+            manager = type(NodeIntersection)()
+            manager.set_broadphase(broadphase)
+            actor_bodies = [
+                manager.add_base_actor(0.5, tuple(position), f"actor{index}")
+                for index, position in enumerate(rng.uniform(0, extent, (actors, 3)))
+            ]
+            for index, position in enumerate(rng.uniform(0, extent, (colliders, 3))):
+                manager.add_base_collider(0.5, tuple(position), f"collider{index}")
+
+            def move():
+                for body, position in zip(
+                    actor_bodies, rng.uniform(0, extent, (actors, 3)).tolist()
+                ):
+                    body.position = position
+
+            result = measure(manager.update, move, min_time)
+            result.update(
+                name=f"update/{broadphase}/{actors}x{colliders}",
+                actors=actors,
+                colliders=colliders,
+                contacts=len(manager.reportedCollisions),
+                within_frame_budget=result["p99_ms"] <= FRAME_BUDGET_MS,
+            )
+            results.append(result)
+    return results
+
+
+def bench_meshes(Sphere, panda_mesh_to_numpy, resolutions, min_time):
+    """
+    Mesh-level intersection and conversion on procedural UV spheres.
+    """
+    from api.nodeIntersection import do_meshes_intersect, compute_intersection_points
+
+    results = []
+    for resolution in resolutions:
+        mesh = Sphere(1.0, resolution, resolution)
+        vertices, indices = panda_mesh_to_numpy(mesh, with_indices=True)
+        triangles = len(indices)
+        moved = vertices + (1.5, 0.2, 0.1)
+        apart = vertices + (5.0, 0.0, 0.0)
+
+        cases = (
+            (
+                "panda_mesh_to_numpy",
+                lambda: panda_mesh_to_numpy(mesh, with_indices=True),
+            ),
+            (
+                "do_meshes_intersect/hit",
+                lambda: do_meshes_intersect(vertices, moved, indices, indices),
+            ),
+            (
+                "do_meshes_intersect/miss",
+                lambda: do_meshes_intersect(vertices, apart, indices, indices),
+            ),
+            (
+                "compute_intersection_points",
+                lambda: compute_intersection_points(vertices, moved, indices, indices),
+            ),
+        )
+        for name, operation in cases:
+            result = measure(
+                operation, min_time=min_time, min_runs=5, max_runs=500, warmup=1
+            )
+            result.update(
+                name=f"{name}/{triangles}",
+                triangles=triangles,
+                vertices=len(vertices),
+            )
+            if name == "panda_mesh_to_numpy":
+                result["vertices_per_sec"] = len(vertices) * result["ops_per_sec"]
+            results.append(result)
+    return results
+
+
+def check_convex(Sphere, panda_mesh_to_numpy, warm_starts=100):
+    """
+    Check GJK/EPA contacts against the exact Minkowski difference hull.
+    Two 12x12 UV spheres are moved through poses where warm starts from the
+    cached direction used to settle on the wrong face, then tested cold and
+    from random cached directions.
+
+    Returns:
+    list: Description of every contact that differs from the exact one.
+    """
+    from scipy.spatial import ConvexHull
+    from api.nodeIntersection.gjk import ConvexHullShape, collide
+
+    vertices, _ = panda_mesh_to_numpy(Sphere(1.0, 12, 12), with_indices=True)
+    hull = ConvexHullShape(vertices)
+    matrix_a = np.identity(4)
+    rng = np.random.default_rng(0)
+    failures = []
+    cached = None
+    for x in (1.5, 3.0, 1.9):
+        matrix_b = np.identity(4)
+        matrix_b[3, 0] = x
+        difference = (hull.vertices[:, None] - (hull.vertices + (x, 0, 0))).reshape(
+            -1, 3
+        )
+        equations = ConvexHull(difference).equations
+        distances = -equations[:, 3]
+        depth = distances.min()
+        directions = rng.normal(size=(warm_starts, 3))
+        for name, direction in [("sequence", cached), ("cold", None)] + [
+            ("random", direction) for direction in directions
+        ]:
+            contact, found = collide(hull, matrix_a, hull, matrix_b, direction)
+            if name == "sequence":
+                cached = found
+            if depth < 0:
+                if contact is not None:
+                    failures.append(f"x={x} {name}: contact between separated hulls")
+                continue
+            if contact is None:
+                failures.append(f"x={x} {name} start: no contact")
+                continue
+            on_nearest = np.abs(distances - depth) < 1e-6
+            along = np.linalg.norm(equations[:, :3] - contact.normal, axis=1) < 1e-6
+            if not np.any(on_nearest & along) or abs(contact.depth - depth) > 1e-6:
+                failures.append(
+                    f"x={x} {name} start: normal {contact.normal.round(3)} depth "
+                    f"{contact.depth:.4f}, exact depth {depth:.4f}"
+                )
+    return failures
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare p50 latencies with a baseline report.
+
+    Returns:
+    list: (name, baseline p50, current p50, ratio) for every case slower than tolerance allows.
+    """
+    previous = {case["name"]: case for case in baseline["cases"]}
+    regressions = []
+    for case in results:
+        old = previous.get(case["name"])
+        if old is None:
+            continue
+        ratio = case["p50_ms"] / old["p50_ms"]
+        print(
+            f"{case['name']:<48} {old['p50_ms']:9.3f} ms -> {case['p50_ms']:9.3f} ms  x{ratio:.2f}"
+        )
+        if ratio > 1 + tolerance:
+            regressions.append((case["name"], old["p50_ms"], case["p50_ms"], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Allowed p50 slowdown against the baseline before failing (default 0.2)",
+    )
+    parser.add_argument(
+        "--quick", action="store_true", help="Smaller scales and shorter runs"
+    )
+    args = parser.parse_args(argv)
+
+    ShowBase()
+    from api.nodeIntersection import Mgr as NodeIntersection, Sphere
+    from api.nodeIntersection import panda_mesh_to_numpy
+
+    if args.quick:
+        scales = ((10, 100), (50, 1000))
+        resolutions = (10, 30)
+        min_time = 0.2
+    else:
+        scales = ((2, 10), (10, 100), (50, 1000), (100, 5000))
+        resolutions = (10, 20, 30, 45)
+        min_time = 1.0
+
+    failures = check_convex(Sphere, panda_mesh_to_numpy)
+    for failure in failures:
+        print(f"WRONG CONTACT {failure}", file=sys.stderr)
+
+    cases = bench_update(
+        NodeIntersection, scales, ("all_pairs", "grid", "panda"), min_time
+    )
+    cases += bench_meshes(Sphere, panda_mesh_to_numpy, resolutions, min_time)
+    report = {
+        "frame_budget_ms": FRAME_BUDGET_MS,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cases": cases,
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text)
+    elif not args.baseline:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(cases, json.load(file), args.tolerance)
+        for name, old, new, ratio in regressions:
+            print(f"REGRESSION {name}: {old:.3f} ms -> {new:.3f} ms (x{ratio:.2f})")
+        return 1 if regressions or failures else 0
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
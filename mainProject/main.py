@@ -252,27 +252,35 @@ class VrApp(BaseVrApp):
         self.baseRightThrottlePos = self.rightThrottle.getPos()
         self.baseRightThrottleHpr = self.rightThrottle.getHpr()
 
-        self.controlBoardCollider: BaseCollider = NodeIntersection.add_base_collider(
-            radius=2.5,
+        # Sized from the models' bounds, so they follow the actual board and levers
+        self.controlBoardCollider: BaseCollider = NodeIntersection.add_box_collider(
+            half_extents=None,
             position=self.controlBoard.getPos(self.render),
             name="texCard",
-            mesh=None,
             nodePath=self.controlBoard,
+            category="controlBoard",
+            mask="hands",
         )
 
-        self.leftThrottleCollider: BaseCollider = NodeIntersection.add_base_collider(
-            radius=1.75,
+        self.leftThrottleCollider: BaseCollider = NodeIntersection.add_capsule_collider(
+            radius=None,
+            half_height=None,
             position=self.leftThrottle.getPos(self.render),
             name="leftThrottle",
-            mesh=None,
             nodePath=self.leftThrottle,
+            category="throttles",
+            mask="hands",
         )
-        self.rightThrottleCollider: BaseCollider = NodeIntersection.add_base_collider(
-            radius=1.75,
-            position=self.rightThrottle.getPos(self.render),
-            name="rightThrottle",
-            mesh=None,
-            nodePath=self.rightThrottle,
+        self.rightThrottleCollider: BaseCollider = (
+            NodeIntersection.add_capsule_collider(
+                radius=None,
+                half_height=None,
+                position=self.rightThrottle.getPos(self.render),
+                name="rightThrottle",
+                nodePath=self.rightThrottle,
+                category="throttles",
+                mask="hands",
+            )
         )
 
         self.hand_left_actor: BaseActor = NodeIntersection.add_base_actor(
@@ -281,6 +289,8 @@ class VrApp(BaseVrApp):
             name="hand_left",
             mesh=None,
             nodePath=self.hand_left,
+            category="hands",
+            mask=["controlBoard", "throttles"],
         )
         self.hand_right_actor: BaseActor = NodeIntersection.add_base_actor(
             radius=0.35,
@@ -288,14 +298,20 @@ class VrApp(BaseVrApp):
             name="hand_right",
             mesh=None,
             nodePath=self.hand_right,
+            category="hands",
+            mask=["controlBoard", "throttles"],
         )
-        self.hand_left_actor.sphere.reparentTo(self.render)
-        self.hand_right_actor.sphere.reparentTo(self.render)
 
-        self.leftThrottleCollider.sphere.reparentTo(self.render)
-        self.rightThrottleCollider.sphere.reparentTo(self.render)
-        self.controlBoardCollider.sphere.reparentTo(self.render)
-        NodeIntersection.hideCollisions()
+        # Fast hand swipes must not pass through the thin controls between two ticks
+        NodeIntersection.set_continuous()
+
+        # Hands currently touching the control board, kept up to date by events
+        self.controlBoardHands: set = set()
+        NodeIntersection.add_collision_listener(
+            on_enter=lambda report: self.controlBoardHands.add(report.actor),
+            on_exit=lambda report: self.controlBoardHands.discard(report.actor),
+            collider=self.controlBoardCollider,
+        )
         self.UpdateHeadsetTracking()
         self.handLeftLastPos = self.hand_left.getPos()
         self.handRightLastPos = self.hand_right.getPos()
@@ -441,16 +457,10 @@ class VrApp(BaseVrApp):
         else:
             self.rightThrottle.setColorScale(1, 1, 1, 1)
 
-        if self.controlBoardCollider.collision_report is not None:
+        if self.controlBoardHands:
             # self.texCard.setColorScale(0.2, 0.4, 1.7, 0.8)
-            report: CollisionReport
-            handLeftActive = False
-            handRightActive = False
-            for report in self.controlBoardCollider.collision_report:
-                if report.actor.name == "hand_left":
-                    handLeftActive = True
-                if report.actor.name == "hand_right":
-                    handRightActive = True
+            handLeftActive = self.hand_left_actor in self.controlBoardHands
+            handRightActive = self.hand_right_actor in self.controlBoardHands
             if handLeftActive and handRightActive:
                 if (
                     self.HandState[0].trigger_value > self.HandState[0].haptic_threshold
@@ -568,4 +578,5 @@ class VrApp(BaseVrApp):
         self.keyMap[key] = value
 
 
-VrApp().run()
+if __name__ == "__main__":
+    VrApp().run()